@@ -2,6 +2,7 @@
 """
 从Google Sheets导出房产数据到本地文件
 支持多种格式：JSON、CSV、Excel
+加 --from-store 时从本地房源库（data/suumo.db）读取，不访问Google Sheets
 """
 
 import os
@@ -92,40 +93,7 @@ def export_from_gsheets(sheet_id, worksheet_name, output_dir, credentials_file,
         print(f"   数据行数: {len(data_rows)}")
         print(f"   总记录数: {len(data_rows)}")
         
-        # 创建输出目录
-        os.makedirs(output_dir, exist_ok=True)
-        
-        # 生成时间戳
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        
-        # 导出JSON格式
-        if 'json' in formats:
-            json_file = os.path.join(output_dir, f"real_estate_data_{timestamp}.json")
-            export_to_json(headers, data_rows, json_file)
-            print(f"✅ JSON文件已保存: {json_file}")
-        
-        # 导出CSV格式
-        if 'csv' in formats:
-            csv_file = os.path.join(output_dir, f"real_estate_data_{timestamp}.csv")
-            export_to_csv(headers, data_rows, csv_file)
-            print(f"✅ CSV文件已保存: {csv_file}")
-        
-        # 导出Excel格式
-        if 'excel' in formats:
-            excel_file = os.path.join(output_dir, f"real_estate_data_{timestamp}.xlsx")
-            export_to_excel(headers, data_rows, excel_file)
-            print(f"✅ Excel文件已保存: {excel_file}")
-        
-        # 创建数据摘要
-        summary_file = os.path.join(output_dir, f"data_summary_{timestamp}.txt")
-        create_summary(headers, data_rows, summary_file)
-        print(f"✅ 数据摘要已保存: {summary_file}")
-        
-        print(f"\n🎉 导出完成！")
-        print(f"📁 输出目录: {output_dir}")
-        print(f"📊 总记录数: {len(data_rows)}")
-        
-        return True
+        return write_exports(headers, data_rows, output_dir, formats)
         
     except Exception as e:
         print(f"❌ 导出失败: {e}", file=sys.stderr)
@@ -133,6 +101,65 @@ def export_from_gsheets(sheet_id, worksheet_name, output_dir, credentials_file,
         traceback.print_exc(file=sys.stderr)
         return False
 
+def export_from_store(db_path, output_dir, formats=['json', 'csv', 'excel']):
+    """从本地房源库导出（列与表格投影一致）"""
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'scrapers', 'real_estate', 'suumo'))
+    from suumo_store import load_sheet_rows, DEFAULT_DB_PATH
+
+    db_path = db_path or DEFAULT_DB_PATH
+    try:
+        print(f"正在读取本地房源库: {db_path}")
+        headers, data_rows = load_sheet_rows(db_path)
+        print(f"📊 数据统计:")
+        print(f"   表头列数: {len(headers)}")
+        print(f"   数据行数: {len(data_rows)}")
+        return write_exports(headers, data_rows, output_dir, formats)
+    except FileNotFoundError as e:
+        print(f"❌ {e}", file=sys.stderr)
+        return False
+    except Exception as e:
+        print(f"❌ 导出失败: {e}", file=sys.stderr)
+        import traceback
+        traceback.print_exc(file=sys.stderr)
+        return False
+
+def write_exports(headers, data_rows, output_dir, formats):
+    """把表头和数据行写入各格式文件及数据摘要"""
+    # 创建输出目录
+    os.makedirs(output_dir, exist_ok=True)
+    
+    # 生成时间戳
+    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    
+    # 导出JSON格式
+    if 'json' in formats:
+        json_file = os.path.join(output_dir, f"real_estate_data_{timestamp}.json")
+        export_to_json(headers, data_rows, json_file)
+        print(f"✅ JSON文件已保存: {json_file}")
+    
+    # 导出CSV格式
+    if 'csv' in formats:
+        csv_file = os.path.join(output_dir, f"real_estate_data_{timestamp}.csv")
+        export_to_csv(headers, data_rows, csv_file)
+        print(f"✅ CSV文件已保存: {csv_file}")
+    
+    # 导出Excel格式
+    if 'excel' in formats:
+        excel_file = os.path.join(output_dir, f"real_estate_data_{timestamp}.xlsx")
+        export_to_excel(headers, data_rows, excel_file)
+        print(f"✅ Excel文件已保存: {excel_file}")
+    
+    # 创建数据摘要
+    summary_file = os.path.join(output_dir, f"data_summary_{timestamp}.txt")
+    create_summary(headers, data_rows, summary_file)
+    print(f"✅ 数据摘要已保存: {summary_file}")
+    
+    print(f"\n🎉 导出完成！")
+    print(f"📁 输出目录: {output_dir}")
+    print(f"📊 总记录数: {len(data_rows)}")
+    
+    return True
+
 def export_to_json(headers, data_rows, output_file):
     """导出为JSON格式"""
     data = []
@@ -238,17 +265,29 @@ def main():
     parser.add_argument('--formats', nargs='+', default=['json', 'csv', 'excel'],
                        choices=['json', 'csv', 'excel'],
                        help='导出格式（默认：json csv excel）')
+    parser.add_argument('--from-store', action='store_true',
+                       help='从本地房源库读取（代替Google Sheets）')
+    parser.add_argument('--store-db',
+                       help='本地房源库路径（默认：data/suumo.db）')
     
     args = parser.parse_args()
     
     print("🏠 房地产数据导出工具")
     print("=" * 50)
-    print(f"目标表格: {args.sheet_id}")
-    print(f"工作表: {args.worksheet}")
+    if args.from_store:
+        print(f"数据来源: 本地房源库")
+    else:
+        print(f"目标表格: {args.sheet_id}")
+        print(f"工作表: {args.worksheet}")
     print(f"输出目录: {args.output_dir}")
     print(f"导出格式: {', '.join(args.formats)}")
     print()
     
+    if args.from_store:
+        success = export_from_store(args.store_db, args.output_dir, args.formats)
+        print("\n✅ 导出成功完成！" if success else "\n❌ 导出失败")
+        return 0 if success else 1
+    
     # 检查凭证文件
     if not os.path.exists(args.credentials):
         print(f"❌ 找不到凭证文件: {args.credentials}", file=sys.stderr)
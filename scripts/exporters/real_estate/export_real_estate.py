@@ -3,11 +3,16 @@
 """
 导出房地产池数据到Markdown格式
 从Google Sheets读取数据，美化输出到指定目录
+
+用法:
+    python3 export_real_estate.py               # 从Google Sheets读取
+    python3 export_real_estate.py --from-store  # 从本地房源库（data/suumo.db）读取，不访问Google Sheets
 """
 
 import os
 import sys
 import json
+import argparse
 import gspread
 from google.oauth2.service_account import Credentials
 from datetime import datetime
@@ -66,6 +71,24 @@ def read_from_google_sheets():
         sys.exit(1)
 
 
+def read_from_store(db_path=None):
+    """从本地房源库读取数据（与表格投影相同的列，每个URL一行）"""
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'scrapers', 'real_estate', 'suumo'))
+    from suumo_store import load_sheet_rows, DEFAULT_DB_PATH
+
+    db_path = db_path or DEFAULT_DB_PATH
+    print(f"🗄️  正在读取本地房源库: {db_path}", file=sys.stderr)
+    try:
+        headers, rows = load_sheet_rows(db_path)
+    except FileNotFoundError as e:
+        print(f"❌ {e}", file=sys.stderr)
+        sys.exit(1)
+
+    data = [dict(zip(headers, row)) for row in rows]
+    print(f"✅ 成功读取 {len(data)} 条数据", file=sys.stderr)
+    return data
+
+
 def parse_price(price_str):
     """解析价格字符串，返回数值"""
     if not price_str:
@@ -419,12 +442,18 @@ def export_data(data):
 
 def main():
     """主函数"""
+    parser = argparse.ArgumentParser(description='导出房地产池数据到Markdown格式')
+    parser.add_argument('--from-store', action='store_true',
+                        help='从本地房源库读取（代替Google Sheets）')
+    parser.add_argument('--store-db', help='本地房源库路径（默认：data/suumo.db）')
+    args = parser.parse_args()
+    
     print("=" * 60, file=sys.stderr)
     print("🏘️  不动产池子导出工具", file=sys.stderr)
     print("=" * 60, file=sys.stderr)
     
     # 读取数据
-    data = read_from_google_sheets()
+    data = read_from_store(args.store_db) if args.from_store else read_from_google_sheets()
     
     if not data:
         print("❌ 没有数据可导出", file=sys.stderr)
@@ -0,0 +1,326 @@
+#!/usr/bin/env python3
+"""
+指数衍生指标计算
+从本地行情缓存（data/market_data.db）和stock_indices表读取历史，
+每个指数用一次pandas/NumPy向量化计算：
+- 日收益率、20/60日年化波动率
+- 回撤、历史最大回撤
+- 距52周高点的距离
+- VIX在过去一年中的百分位
+- 纳斯达克100 PE的一年滚动z-score
+结果写入MySQL的index_indicators表（表结构见 Documents/db_config.md）
+
+增量计算：只读取最后已计算日期之前一个窗口的数据，只写入新日期，
+峰值和最大回撤从上一行延续，每日更新的计算量与历史长度无关
+PE通常在收盘价之后才写入stock_indices（nasdaq_pe.py），写入后由 update_pe_zscore 重算受影响日期的pe_zscore
+
+用法:
+    python3 indicators.py                  # 增量更新全部指数
+    python3 indicators.py --symbols vix    # 只更新指定指数
+    python3 indicators.py --full           # 重新计算全部历史
+"""
+
+import argparse
+import datetime
+import json
+import sys
+
+import numpy as np
+import pandas as pd
+
+from market_data import INDEX_SYMBOLS, BarCache
+from stock_indices import get_db_connection
+
+TRADING_DAYS_PER_YEAR = 252
+VOLATILITY_WINDOWS = (20, 60)
+HIGH_WINDOW = 252            # 52周高点
+VIX_PERCENTILE_WINDOW = 252
+PE_ZSCORE_WINDOW = 252
+# 增量计算时向前多读取的日历天数（需覆盖最长的252个交易日窗口）
+LOOKBACK_CALENDAR_DAYS = 400
+UPSERT_CHUNK_SIZE = 1000
+PE_ZSCORE_UPDATE_CHUNK_SIZE = 500
+PE_SYMBOL = 'nasdaq_100'
+
+INDICATOR_COLUMNS = [
+    'close', 'daily_return', 'volatility_20', 'volatility_60', 'peak', 'drawdown',
+    'max_drawdown', 'high_52w_distance', 'vix_percentile', 'pe_zscore'
+]
+
+CREATE_TABLE_SQL = """
+CREATE TABLE IF NOT EXISTS `index_indicators` (
+  `symbol` varchar(16) NOT NULL,
+  `date` date NOT NULL,
+  `close` decimal(12,3) NOT NULL,
+  `daily_return` double DEFAULT NULL,
+  `volatility_20` double DEFAULT NULL,
+  `volatility_60` double DEFAULT NULL,
+  `peak` decimal(12,3) NOT NULL,
+  `drawdown` double NOT NULL,
+  `max_drawdown` double NOT NULL,
+  `high_52w_distance` double DEFAULT NULL,
+  `vix_percentile` double DEFAULT NULL,
+  `pe_zscore` double DEFAULT NULL,
+  PRIMARY KEY (`symbol`, `date`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci
+"""
+
+UPSERT_SQL = """
+INSERT INTO index_indicators (symbol, date, {columns})
+VALUES (%s, %s, {placeholders})
+ON DUPLICATE KEY UPDATE {updates}
+""".format(
+    columns=', '.join(INDICATOR_COLUMNS),
+    placeholders=', '.join(['%s'] * len(INDICATOR_COLUMNS)),
+    updates=', '.join(f"{column} = VALUES({column})" for column in INDICATOR_COLUMNS)
+)
+
+
+def load_state(cursor):
+    """
+    每个指数最后一行已计算的指标
+    返回 {名称: (date, peak, max_drawdown)}
+    """
+    cursor.execute("""
+        SELECT i.symbol, i.date, i.peak, i.max_drawdown
+        FROM index_indicators i
+        JOIN (SELECT symbol, MAX(date) AS date FROM index_indicators GROUP BY symbol) m
+          ON i.symbol = m.symbol AND i.date = m.date
+    """)
+    return {
+        row['symbol']: (row['date'], float(row['peak']), float(row['max_drawdown']))
+        for row in cursor.fetchall()
+    }
+
+
+def load_pe(cursor, since=None):
+    """
+    读取stock_indices中的纳斯达克100 PE（0表示尚未抓取，视为缺失）
+    since: 只需要该日期及之后的z-score时，额外读取它之前的 PE_ZSCORE_WINDOW-1 个有效值作为窗口
+    """
+    sql = "SELECT date, nasdaq_100_pe FROM stock_indices WHERE nasdaq_100_pe > 0"
+    if since:
+        cursor.execute(
+            sql + " AND date < %s ORDER BY date DESC LIMIT %s", (since, PE_ZSCORE_WINDOW - 1)
+        )
+        rows = list(reversed(cursor.fetchall()))
+        cursor.execute(sql + " AND date >= %s ORDER BY date", (since,))
+        rows += list(cursor.fetchall())
+    else:
+        cursor.execute(sql + " ORDER BY date")
+        rows = cursor.fetchall()
+    return pd.Series(
+        [float(row['nasdaq_100_pe']) for row in rows],
+        index=pd.to_datetime([row['date'] for row in rows]),
+        dtype=float
+    )
+
+
+def rolling_percentile(values, window):
+    """每个位置的值在过去window个值中的百分位（<=当前值的比例），不足一个窗口为NaN"""
+    result = np.full(len(values), np.nan)
+    if len(values) >= window:
+        windows = np.lib.stride_tricks.sliding_window_view(values, window)
+        result[window - 1:] = (windows <= windows[:, -1:]).mean(axis=1)
+    return result
+
+
+def rolling_zscore(values):
+    """最近 PE_ZSCORE_WINDOW 个有效值的滚动z-score（先去掉缺失值再滚动，缺失日期不占窗口）"""
+    values = values.dropna()
+    mean = values.rolling(PE_ZSCORE_WINDOW, min_periods=PE_ZSCORE_WINDOW).mean()
+    std = values.rolling(PE_ZSCORE_WINDOW, min_periods=PE_ZSCORE_WINDOW).std()
+    return (values - mean) / std.replace(0, np.nan)
+
+
+def compute_indicators(closes, state=None, pe=None, percentile=False):
+    """
+    计算一个指数的全部指标
+    closes: 收盘价Series（日期索引，升序），增量时包含最后已计算日期之前的回看窗口
+    state: (最后已计算日期, 峰值, 最大回撤)，只返回该日期之后的行；None表示全量计算
+    pe: PE Series（计算z-score时传入）
+    percentile: 是否计算收盘价的滚动百分位（VIX）
+    返回指标DataFrame
+    """
+    frame = pd.DataFrame({'close': closes})
+    returns = frame['close'].pct_change()
+    frame['daily_return'] = returns
+    for window in VOLATILITY_WINDOWS:
+        frame[f'volatility_{window}'] = returns.rolling(window, min_periods=window).std() * np.sqrt(TRADING_DAYS_PER_YEAR)
+    frame['high_52w_distance'] = frame['close'] / frame['close'].rolling(HIGH_WINDOW, min_periods=1).max() - 1
+    frame['vix_percentile'] = rolling_percentile(frame['close'].to_numpy(), VIX_PERCENTILE_WINDOW) if percentile else np.nan
+    if pe is not None and not pe.empty:
+        frame['pe_zscore'] = rolling_zscore(pe).reindex(frame.index)
+    else:
+        frame['pe_zscore'] = np.nan
+
+    # 峰值和最大回撤是全历史的累计量：从上一次的结果延续，只计算新日期
+    seed_peak, seed_drawdown = -np.inf, 0.0
+    if state:
+        last_date, seed_peak, seed_drawdown = state
+        frame = frame[frame.index > pd.Timestamp(last_date)].copy()
+    values = frame['close'].to_numpy()
+    frame['peak'] = np.maximum.accumulate(np.concatenate(([seed_peak], values)))[1:]
+    frame['drawdown'] = values / frame['peak'].to_numpy() - 1
+    frame['max_drawdown'] = np.minimum.accumulate(np.concatenate(([seed_drawdown], frame['drawdown'].to_numpy())))[1:]
+    return frame[INDICATOR_COLUMNS]
+
+
+def upsert_indicators(cursor, name, frame, chunk_size=UPSERT_CHUNK_SIZE):
+    """批量写入一个指数的指标行（NaN写为NULL），返回写入行数"""
+    values = frame.astype(object).where(frame.notna(), None)
+    params = [
+        (name, ts.date().isoformat(), *row)
+        for ts, row in zip(values.index, values.itertuples(index=False, name=None))
+    ]
+    for i in range(0, len(params), chunk_size):
+        cursor.executemany(UPSERT_SQL, params[i:i + chunk_size])
+    return len(params)
+
+
+def update_indicators(names=None, full=False):
+    """增量（或全量）计算并写入指标，返回JSON结果"""
+    names = names or list(INDEX_SYMBOLS)
+    connection = None
+    cache = BarCache()
+    try:
+        connection = get_db_connection()
+        if not connection:
+            return {
+                "success": False,
+                "error": "数据库连接失败",
+                "timestamp": datetime.datetime.now().isoformat()
+            }
+
+        summary = {}
+        with connection.cursor() as cursor:
+            cursor.execute(CREATE_TABLE_SQL)
+            states = {} if full else load_state(cursor)
+            for name in names:
+                state = states.get(name)
+                start = state[0] - datetime.timedelta(days=LOOKBACK_CALENDAR_DAYS) if state else None
+                bars = cache.closes(INDEX_SYMBOLS[name], start=start)
+                if not bars:
+                    print(f"警告: {name} 本地缓存中没有行情", file=sys.stderr)
+                    summary[name] = {"rows": 0}
+                    continue
+                closes = pd.Series(
+                    [close for _, close in bars],
+                    index=pd.to_datetime([date for date, _ in bars]),
+                    dtype=float
+                )
+                pe = load_pe(cursor, state[0] if state else None) if name == PE_SYMBOL else None
+                frame = compute_indicators(closes, state=state, pe=pe, percentile=(name == 'vix'))
+                written = upsert_indicators(cursor, name, frame)
+                summary[name] = {"rows": written}
+                if written:
+                    latest = frame.iloc[-1]
+                    summary[name]["latest"] = {
+                        "date": frame.index[-1].date().isoformat(),
+                        **{column: (None if pd.isna(latest[column]) else round(float(latest[column]), 6))
+                           for column in INDICATOR_COLUMNS}
+                    }
+                print(f"  {name}: 读取 {len(bars)} 根K线，写入 {written} 行指标", file=sys.stderr)
+        connection.commit()
+        return {
+            "success": True,
+            "data": summary,
+            "timestamp": datetime.datetime.now().isoformat()
+        }
+
+    except Exception as e:
+        print(f"计算指标时出错: {e}", file=sys.stderr)
+        if connection:
+            connection.rollback()
+        return {
+            "success": False,
+            "error": str(e),
+            "timestamp": datetime.datetime.now().isoformat()
+        }
+    finally:
+        cache.close()
+        if connection:
+            connection.close()
+
+
+def update_pe_zscore(since):
+    """
+    PE写入之后，重算 since 及之后已有指标行的pe_zscore（其他指标不变）
+    since 传入PE发生变化的最早日期，只读取它之前一个窗口的PE，计算量与历史长度无关
+    返回JSON结果
+    """
+    connection = None
+    try:
+        connection = get_db_connection()
+        if not connection:
+            return {
+                "success": False,
+                "error": "数据库连接失败",
+                "timestamp": datetime.datetime.now().isoformat()
+            }
+
+        since = pd.Timestamp(since)
+        updated = 0
+        with connection.cursor() as cursor:
+            cursor.execute(CREATE_TABLE_SQL)
+            cursor.execute(
+                "SELECT date FROM index_indicators WHERE symbol = %s AND date >= %s ORDER BY date",
+                (PE_SYMBOL, since.date())
+            )
+            dates = pd.to_datetime([row['date'] for row in cursor.fetchall()])
+            zscores = rolling_zscore(load_pe(cursor, since.date())).reindex(dates)
+            params = [
+                (ts.date().isoformat(), None if pd.isna(value) else float(value))
+                for ts, value in zscores.items()
+            ]
+            # 与nasdaq_pe.save_pe_series相同：每块一条 UPDATE ... JOIN
+            for i in range(0, len(params), PE_ZSCORE_UPDATE_CHUNK_SIZE):
+                chunk = params[i:i + PE_ZSCORE_UPDATE_CHUNK_SIZE]
+                values_sql = " UNION ALL ".join(["SELECT %s AS date, %s AS zscore"] * len(chunk))
+                updated += cursor.execute(f"""
+                    UPDATE index_indicators i
+                    JOIN ({values_sql}) v ON i.date = v.date
+                    SET i.pe_zscore = v.zscore
+                    WHERE i.symbol = %s
+                """, [value for row in chunk for value in row] + [PE_SYMBOL])
+        connection.commit()
+        print(f"  {PE_SYMBOL}: 重算 {len(params)} 个日期的pe_zscore，更新 {updated} 行", file=sys.stderr)
+        return {
+            "success": True,
+            "data": {"dates": len(params), "updated": updated},
+            "timestamp": datetime.datetime.now().isoformat()
+        }
+
+    except Exception as e:
+        print(f"重算pe_zscore时出错: {e}", file=sys.stderr)
+        if connection:
+            connection.rollback()
+        return {
+            "success": False,
+            "error": str(e),
+            "timestamp": datetime.datetime.now().isoformat()
+        }
+    finally:
+        if connection:
+            connection.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='计算指数衍生指标并写入index_indicators表')
+    parser.add_argument('--symbols', help=f"逗号分隔的指数名称（默认全部：{','.join(INDEX_SYMBOLS)}）")
+    parser.add_argument('--full', action='store_true', help='忽略已计算的结果，重新计算全部历史')
+    args = parser.parse_args()
+
+    names = None
+    if args.symbols:
+        names = [name.strip() for name in args.symbols.split(',') if name.strip()]
+        unknown = [name for name in names if name not in INDEX_SYMBOLS]
+        if unknown:
+            parser.error(f"未知的指数: {', '.join(unknown)}")
+
+    print(f"开始计算指数指标（{'全量' if args.full else '增量'}）...", file=sys.stderr)
+    print(json.dumps(update_indicators(names, full=args.full), ensure_ascii=False, indent=2))
+
+
+if __name__ == '__main__':
+    main()
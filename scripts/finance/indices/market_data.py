@@ -0,0 +1,241 @@
+#!/usr/bin/env python3
+"""
+指数行情数据层
+- 所有指数用一次批量、多线程的 yf.download 获取
+- 日线数据缓存在本地SQLite（data/market_data.db），之后只请求最后一根缓存K线之后的日期
+- 按交易日历判断：各指数所在市场自上次缓存之后没有新的交易日收盘时，不发起请求
+
+用法:
+    python3 market_data.py                 # 更新缓存并打印各指数最新收盘价
+    python3 market_data.py --start 2020-01-01   # 首次填充更长的历史
+"""
+
+import argparse
+import datetime
+import os
+import sqlite3
+import sys
+import threading
+
+from trading_calendar import CALENDARS
+
+# 指数名称 -> Yahoo Finance代码
+INDEX_SYMBOLS = {
+    'nasdaq': '^IXIC',      # 纳斯达克综合指数
+    'nasdaq_100': '^NDX',   # 纳斯达克100指数
+    'n225': '^N225',        # 日经225指数
+    'vix': '^VIX'           # VIX恐慌指数
+}
+
+# 指数名称 -> 交易日历（VIX由CBOE计算，休市日与NASDAQ相同）
+INDEX_MARKETS = {
+    'nasdaq': 'NASDAQ',
+    'nasdaq_100': 'NASDAQ',
+    'n225': 'TSE',
+    'vix': 'NASDAQ'
+}
+SYMBOL_MARKETS = {symbol: INDEX_MARKETS[name] for name, symbol in INDEX_SYMBOLS.items()}
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', '..'))
+DEFAULT_CACHE_PATH = os.path.join(PROJECT_ROOT, 'data', 'market_data.db')
+
+# 缓存中没有某个代码时，默认回溯的天数
+DEFAULT_LOOKBACK_DAYS = 10
+
+
+class BarCache:
+    """
+    日线K线缓存（SQLite）
+    每个 (代码, 日期) 一行，重复写入时覆盖
+    """
+
+    def __init__(self, db_path=DEFAULT_CACHE_PATH):
+        self.db_path = db_path
+        os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS bars (
+                symbol TEXT NOT NULL,
+                date TEXT NOT NULL,
+                open REAL,
+                high REAL,
+                low REAL,
+                close REAL,
+                adj_close REAL,
+                volume REAL,
+                PRIMARY KEY (symbol, date)
+            )
+        """)
+        self.conn.commit()
+
+    def last_dates(self, symbols):
+        """返回 {代码: 最后一根K线的日期}（没有缓存的代码不在结果中）"""
+        placeholders = ','.join('?' * len(symbols))
+        with self._lock:
+            rows = self.conn.execute(
+                f"SELECT symbol, MAX(date) FROM bars WHERE symbol IN ({placeholders}) GROUP BY symbol",
+                list(symbols)
+            ).fetchall()
+        return {symbol: datetime.date.fromisoformat(date) for symbol, date in rows}
+
+    def upsert(self, symbol, frame):
+        """写入一个代码的K线（DataFrame，索引为日期），返回写入行数"""
+        rows = []
+        for ts, row in frame.iterrows():
+            if _float(row.get('Close')) is None:
+                continue
+            rows.append((
+                symbol, ts.date().isoformat(),
+                _float(row.get('Open')), _float(row.get('High')), _float(row.get('Low')),
+                _float(row.get('Close')), _float(row.get('Adj Close')), _float(row.get('Volume'))
+            ))
+        with self._lock:
+            self.conn.executemany("""
+                INSERT INTO bars (symbol, date, open, high, low, close, adj_close, volume)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(symbol, date) DO UPDATE SET
+                    open = excluded.open, high = excluded.high, low = excluded.low,
+                    close = excluded.close, adj_close = excluded.adj_close, volume = excluded.volume
+            """, rows)
+            self.conn.commit()
+        return len(rows)
+
+    def closes(self, symbol, start=None, end=None):
+        """读取收盘价序列，返回 [(date, close), ...]，按日期升序"""
+        sql = "SELECT date, close FROM bars WHERE symbol = ?"
+        params = [symbol]
+        if start:
+            sql += " AND date >= ?"
+            params.append(str(start))
+        if end:
+            sql += " AND date <= ?"
+            params.append(str(end))
+        with self._lock:
+            rows = self.conn.execute(sql + " ORDER BY date", params).fetchall()
+        return [(datetime.date.fromisoformat(date), close) for date, close in rows]
+
+    def latest(self, symbol, count=1):
+        """最近count根K线的 (date, close)，按日期升序"""
+        with self._lock:
+            rows = self.conn.execute(
+                "SELECT date, close FROM bars WHERE symbol = ? ORDER BY date DESC LIMIT ?", (symbol, count)
+            ).fetchall()
+        return [(datetime.date.fromisoformat(date), close) for date, close in reversed(rows)]
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
+
+
+def _float(value):
+    # NaN != NaN（不依赖pandas）
+    return None if value is None or value != value else float(value)
+
+
+def download_bars(symbols, start, end=None):
+    """
+    一次批量下载多个代码的日线（yfinance内部多线程）
+    start包含，end不包含；返回 {代码: DataFrame}
+    """
+    # yfinance/pandas加载较慢，只在真正需要下载时导入（无新交易日时可以毫秒级退出）
+    import yfinance as yf
+    import pandas as pd
+
+    frame = yf.download(
+        tickers=list(symbols),
+        start=start,
+        end=end,
+        group_by='ticker',
+        threads=True,
+        auto_adjust=False,
+        progress=False,
+    )
+    result = {}
+    if frame is None or frame.empty:
+        return result
+    for symbol in symbols:
+        if isinstance(frame.columns, pd.MultiIndex):
+            if symbol not in frame.columns.get_level_values(0):
+                continue
+            symbol_frame = frame[symbol]
+        else:
+            symbol_frame = frame
+        symbol_frame = symbol_frame.dropna(how='all')
+        if not symbol_frame.empty:
+            result[symbol] = symbol_frame
+    return result
+
+
+def pending_symbols(symbols, last_dates, now=None):
+    """
+    按交易日历筛选需要更新的代码：没有缓存，或所在市场在最后缓存日期之后又有交易日收盘
+    不在 SYMBOL_MARKETS 中的代码总是需要更新
+    """
+    return [
+        symbol for symbol in symbols
+        if symbol not in SYMBOL_MARKETS
+        or CALENDARS[SYMBOL_MARKETS[symbol]].has_new_session(last_dates.get(symbol), now)
+    ]
+
+
+def update_cache(symbols, cache, start=None, end=None, lookback_days=DEFAULT_LOOKBACK_DAYS):
+    """
+    增量更新缓存：从各代码最后一根缓存K线的下一天开始，一次批量请求全部代码
+    start: 强制的起始日期（用于首次填充历史）
+    end: 结束日期（含），默认今天
+    返回 {代码: 新写入行数}
+    """
+    today = end or datetime.date.today()
+    if start is None:
+        last_dates = cache.last_dates(symbols)
+        if end is None and not pending_symbols(symbols, last_dates):
+            print("各市场自上次缓存之后没有新的交易日收盘，无需下载", file=sys.stderr)
+            return {symbol: 0 for symbol in symbols}
+        default_start = today - datetime.timedelta(days=lookback_days)
+        # 所有代码共用一次请求，取最早需要的日期
+        start = min(
+            (last_dates[symbol] + datetime.timedelta(days=1)) if symbol in last_dates else default_start
+            for symbol in symbols
+        )
+    if start > today:
+        print(f"缓存已是最新（最后日期 {start - datetime.timedelta(days=1)}），无需下载", file=sys.stderr)
+        return {symbol: 0 for symbol in symbols}
+
+    print(f"正在批量下载 {len(symbols)} 个指数（{start} 起）: {', '.join(symbols)}", file=sys.stderr)
+    frames = download_bars(symbols, start=start.isoformat(), end=(today + datetime.timedelta(days=1)).isoformat())
+
+    written = {}
+    for symbol in symbols:
+        if symbol not in frames:
+            print(f"警告: {symbol} 没有获取到新数据", file=sys.stderr)
+            written[symbol] = 0
+            continue
+        written[symbol] = cache.upsert(symbol, frames[symbol])
+        print(f"  {symbol}: 写入 {written[symbol]} 根K线", file=sys.stderr)
+    return written
+
+
+def main():
+    parser = argparse.ArgumentParser(description='更新本地指数行情缓存')
+    parser.add_argument('--start', type=datetime.date.fromisoformat, help='起始日期（YYYY-MM-DD），默认从缓存最后日期之后开始')
+    parser.add_argument('--cache', default=DEFAULT_CACHE_PATH, help='缓存数据库路径（默认：data/market_data.db）')
+    args = parser.parse_args()
+
+    cache = BarCache(args.cache)
+    try:
+        symbols = list(INDEX_SYMBOLS.values())
+        update_cache(symbols, cache, start=args.start)
+        for name, symbol in INDEX_SYMBOLS.items():
+            latest = cache.latest(symbol)
+            if latest:
+                date, close = latest[-1]
+                print(f"{name:<12} {symbol:<6} {date}  {close:,.3f}")
+            else:
+                print(f"{name:<12} {symbol:<6} 无数据")
+    finally:
+        cache.close()
+
+
+if __name__ == '__main__':
+    main()
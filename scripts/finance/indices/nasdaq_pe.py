@@ -1,14 +1,12 @@
 #!/usr/bin/env python3
 """
 从GuruFocus获取纳斯达克100 PE比率 - n8n版本
-使用Selenium模拟真实浏览器行为，绕过反爬虫机制
+优先用curl_cffi模拟浏览器TLS指纹直接请求页面（不启动Chrome），
+只有返回403时才回退到Selenium模拟真实浏览器
 适配n8n环境，返回JSON格式数据
 """
 
-from selenium import webdriver
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.chrome.options import Options
-from webdriver_manager.chrome import ChromeDriverManager
+import argparse
 import datetime
 import time
 import random
@@ -17,40 +15,45 @@ import json
 import sys
 import os
 
+from curl_cffi import requests as curl_requests
+
+GURUFOCUS_URL = "https://www.gurufocus.com/economic_indicators/6778/nasdaq-100-pe-ratio"
+HTTP_IMPERSONATE = "chrome"  # curl_cffi模拟的浏览器指纹
+HTTP_TIMEOUT = 15
+
+
+class ForbiddenError(Exception):
+    """页面返回403（被反爬拦截）"""
+
+
+def fetch_page_http(url):
+    """用curl_cffi（浏览器TLS指纹）请求页面，返回HTML；403时抛出ForbiddenError"""
+    start = time.perf_counter()
+    response = curl_requests.get(url, impersonate=HTTP_IMPERSONATE, timeout=HTTP_TIMEOUT)
+    print(f"HTTP请求完成: 状态码 {response.status_code}，耗时 {time.perf_counter() - start:.2f}s", file=sys.stderr)
+    if response.status_code == 403:
+        raise ForbiddenError(f"HTTP 403: {url}")
+    response.raise_for_status()
+    return response.text
+
+
+def fetch_page_selenium(url):
+    """用Selenium打开页面并返回page_source；页面访问被拒绝时返回None"""
+    # 只在回退时才加载Selenium相关模块
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'utils'))
+    from driver_factory import create_driver, timed_get
 
-def get_nasdaq100_pe():
-    """使用Selenium获取纳斯达克100 PE比率 - 获取最新数据"""
-    url = "https://www.gurufocus.com/economic_indicators/6778/nasdaq-100-pe-ratio"
     driver = None
-    
     try:
-        print("正在从GuruFocus获取纳斯达克100 PE数据...", file=sys.stderr)
-        
-        # 设置Chrome浏览器选项 - 适配n8n环境
-        chrome_options = Options()
-        chrome_options.add_argument("--no-sandbox")
-        chrome_options.add_argument("--disable-dev-shm-usage")
-        chrome_options.add_argument("--disable-blink-features=AutomationControlled")
-        chrome_options.add_argument("--headless")  # n8n环境通常需要无头模式
-        chrome_options.add_argument("--disable-gpu")
-        chrome_options.add_argument("--window-size=1920,1080")
-        chrome_options.add_experimental_option("excludeSwitches", ["enable-automation"])
-        chrome_options.add_experimental_option('useAutomationExtension', False)
-        chrome_options.add_argument("--user-agent=Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36")
-        
-        # 禁用图片加载以提高速度
-        prefs = {"profile.managed_default_content_settings.images": 2}
-        chrome_options.add_experimental_option("prefs", prefs)
-        
-        # 设置ChromeDriver
-        service = Service(ChromeDriverManager().install())
-        driver = webdriver.Chrome(service=service, options=chrome_options)
-        
-        # 执行反检测脚本
-        driver.execute_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined})")
+        # 启动浏览器（n8n环境使用无头模式；chromedriver路径已缓存，拦截图片/字体/媒体/统计脚本）
+        driver = create_driver(
+            headless=True,
+            prefs={"profile.managed_default_content_settings.images": 2},  # 禁用图片加载以提高速度
+            label='GuruFocus浏览器'
+        )
         
         print("浏览器启动成功，正在访问页面...", file=sys.stderr)
-        driver.get(url)
+        timed_get(driver, url, label='GuruFocus页面')
         
         # 模拟人类行为
         time.sleep(random.uniform(2, 4))
@@ -74,76 +77,170 @@ def get_nasdaq100_pe():
             print("页面访问被拒绝", file=sys.stderr)
             return None
         
-        print("页面加载成功，开始提取数据...", file=sys.stderr)
-        
         # 获取页面源码
-        page_source = driver.page_source
+        return driver.page_source
+    
+    finally:
+        if driver:
+            driver.quit()
+            print("浏览器已关闭", file=sys.stderr)
+
+
+def extract_pe_ratio(page_source):
+    """从页面源码中提取PE比率，返回结果字典"""
+    # 直接查找"Nasdaq 100 PE Ratio was xxx as of 2025-xx-xx"格式的最新数据
+    print("查找页面中的'Nasdaq 100 PE Ratio was xxx as of 2025-xx-xx'格式数据...", file=sys.stderr)
+    
+    # 使用正则表达式匹配这个格式
+    nasdaq_pattern = r'Nasdaq 100 PE Ratio was (\d+\.?\d*) as of (\d{4}-\d{2}-\d{2})'
+    matches = re.findall(nasdaq_pattern, page_source, re.IGNORECASE)
+    
+    if matches:
+        print(f"找到 {len(matches)} 个匹配的Nasdaq 100 PE Ratio数据:", file=sys.stderr)
+        # 只显示最后几条，完整序列在返回结果的series中
+        for i, (pe_value, date) in enumerate(matches[-5:], max(len(matches) - 5, 0)):
+            print(f"  {i+1}. PE比率: {pe_value}, 日期: {date}", file=sys.stderr)
         
-        # 直接查找"Nasdaq 100 PE Ratio was xxx as of 2025-xx-xx"格式的最新数据
-        print("查找页面中的'Nasdaq 100 PE Ratio was xxx as of 2025-xx-xx'格式数据...", file=sys.stderr)
+        # 完整的日期序列（同一日期出现多次时以最后一次为准），按日期升序
+        series = {date: float(pe_value) for pe_value, date in matches}
+        series = [{"date": date, "pe_ratio": series[date]} for date in sorted(series)]
         
-        # 使用正则表达式匹配这个格式
-        nasdaq_pattern = r'Nasdaq 100 PE Ratio was (\d+\.?\d*) as of (\d{4}-\d{2}-\d{2})'
-        matches = re.findall(nasdaq_pattern, page_source, re.IGNORECASE)
+        # 选择最新的数据（最后一个）
+        latest_pe, latest_date = matches[-1]
+        print(f"选择最新数据: PE比率 {latest_pe}, 日期 {latest_date}", file=sys.stderr)
         
+        # 返回JSON格式数据
+        result = {
+            "success": True,
+            "data": {
+                "pe_ratio": float(latest_pe),
+                "date": latest_date,
+                "source": "GuruFocus",
+                "timestamp": datetime.datetime.now().isoformat(),
+                "description": f"Nasdaq 100 PE Ratio: {latest_pe} (As of {latest_date})",
+                "series": series
+            }
+        }
+        return result
+    
+    # 如果主要格式没找到，尝试其他格式
+    print("主要格式未找到，尝试其他格式...", file=sys.stderr)
+    
+    # 使用正则表达式提取PE比率
+    pe_patterns = [
+        r'Nasdaq 100 PE Ratio\s*:?\s*(\d+\.?\d*)',
+        r'PE\s*Ratio\s*:?\s*(\d+\.?\d*)',
+        r'(\d+\.?\d*)\s*\(.*PE.*\)',
+        r'PE.*?(\d+\.?\d*)'
+    ]
+    
+    for i, pattern in enumerate(pe_patterns):
+        matches = re.findall(pattern, page_source, re.IGNORECASE)
         if matches:
-            print(f"找到 {len(matches)} 个匹配的Nasdaq 100 PE Ratio数据:", file=sys.stderr)
-            for i, (pe_value, date) in enumerate(matches):
-                print(f"  {i+1}. PE比率: {pe_value}, 日期: {date}", file=sys.stderr)
+            pe_value = matches[0]
+            print(f"找到PE比率: {pe_value}", file=sys.stderr)
             
-            # 选择最新的数据（最后一个）
-            latest_pe, latest_date = matches[-1]
-            print(f"选择最新数据: PE比率 {latest_pe}, 日期 {latest_date}", file=sys.stderr)
-            
-            # 返回JSON格式数据
             result = {
                 "success": True,
                 "data": {
-                    "pe_ratio": float(latest_pe),
-                    "date": latest_date,
+                    "pe_ratio": float(pe_value),
+                    "date": "未知",
                     "source": "GuruFocus",
                     "timestamp": datetime.datetime.now().isoformat(),
-                    "description": f"Nasdaq 100 PE Ratio: {latest_pe} (As of {latest_date})"
+                    "description": f"Nasdaq 100 PE Ratio: {pe_value}"
                 }
             }
             return result
+    
+    # 如果都没找到
+    print("未找到PE比率信息", file=sys.stderr)
+    return {
+        "success": False,
+        "error": "未找到PE比率信息",
+        "timestamp": datetime.datetime.now().isoformat()
+    }
+
+
+PE_UPDATE_CHUNK_SIZE = 1000
+
+def save_pe_series(series, chunk_size=PE_UPDATE_CHUNK_SIZE):
+    """
+    把PE日期序列批量写入 stock_indices.nasdaq_100_pe（只更新已存在且数值有变化的日期，一个事务）
+    每chunk_size个日期一条 UPDATE ... JOIN 语句
+    返回 (实际更新的行数, PE发生变化的最早日期或None)，失败时返回None
+    """
+    # 与stock_indices.py共用数据库连接配置（只在需要写库时加载）
+    from stock_indices import get_db_connection
+    
+    connection = None
+    try:
+        connection = get_db_connection()
+        if not connection:
+            return None
         
-        # 如果主要格式没找到，尝试其他格式
-        print("主要格式未找到，尝试其他格式...", file=sys.stderr)
-        
-        # 使用正则表达式提取PE比率
-        pe_patterns = [
-            r'Nasdaq 100 PE Ratio\s*:?\s*(\d+\.?\d*)',
-            r'PE\s*Ratio\s*:?\s*(\d+\.?\d*)',
-            r'(\d+\.?\d*)\s*\(.*PE.*\)',
-            r'PE.*?(\d+\.?\d*)'
-        ]
-        
-        for i, pattern in enumerate(pe_patterns):
-            matches = re.findall(pattern, page_source, re.IGNORECASE)
-            if matches:
-                pe_value = matches[0]
-                print(f"找到PE比率: {pe_value}", file=sys.stderr)
-                
-                result = {
-                    "success": True,
-                    "data": {
-                        "pe_ratio": float(pe_value),
-                        "date": "未知",
-                        "source": "GuruFocus",
-                        "timestamp": datetime.datetime.now().isoformat(),
-                        "description": f"Nasdaq 100 PE Ratio: {pe_value}"
-                    }
-                }
-                return result
+        updated = 0
+        with connection.cursor() as cursor:
+            # 只写入已存在且PE有变化的日期（列为decimal(12,3)，按3位小数比较）
+            cursor.execute(
+                "SELECT date, nasdaq_100_pe FROM stock_indices WHERE date >= %s",
+                (min(item["date"] for item in series),)
+            )
+            current = {str(row["date"]): float(row["nasdaq_100_pe"]) for row in cursor.fetchall()}
+            changed = [
+                item for item in series
+                if item["date"] in current and round(float(item["pe_ratio"]), 3) != round(current[item["date"]], 3)
+            ]
+            for i in range(0, len(changed), chunk_size):
+                chunk = changed[i:i + chunk_size]
+                values_sql = " UNION ALL ".join(["SELECT %s AS date, %s AS pe"] * len(chunk))
+                params = []
+                for item in chunk:
+                    params.extend([item["date"], item["pe_ratio"]])
+                updated += cursor.execute(f"""
+                    UPDATE stock_indices s
+                    JOIN ({values_sql}) v ON s.date = v.date
+                    SET s.nasdaq_100_pe = v.pe
+                """, params)
+        connection.commit()
+        return updated, (min(item["date"] for item in changed) if changed else None)
+    
+    except Exception as e:
+        print(f"数据库操作失败: {e}", file=sys.stderr)
+        if connection:
+            connection.rollback()
+        return None
+    finally:
+        if connection:
+            connection.close()
+
+def get_nasdaq100_pe(engine="auto"):
+    """
+    获取纳斯达克100 PE比率 - 获取最新数据
+    
+    参数:
+        engine: auto=先用HTTP，403时回退Selenium；http=只用HTTP；selenium=只用浏览器
+    """
+    url = GURUFOCUS_URL
+    
+    try:
+        print("正在从GuruFocus获取纳斯达克100 PE数据...", file=sys.stderr)
         
-        # 如果都没找到
-        print("未找到PE比率信息", file=sys.stderr)
-        return {
-            "success": False,
-            "error": "未找到PE比率信息",
-            "timestamp": datetime.datetime.now().isoformat()
-        }
+        page_source = None
+        if engine in ("auto", "http"):
+            try:
+                page_source = fetch_page_http(url)
+            except ForbiddenError as e:
+                if engine == "http":
+                    raise
+                print(f"{e}，回退到Selenium...", file=sys.stderr)
+        
+        if page_source is None:
+            page_source = fetch_page_selenium(url)
+            if page_source is None:
+                return None
+        
+        print("页面加载成功，开始提取数据...", file=sys.stderr)
+        return extract_pe_ratio(page_source)
         
     except Exception as e:
         print(f"获取数据时出错: {e}", file=sys.stderr)
@@ -152,17 +249,19 @@ def get_nasdaq100_pe():
             "error": str(e),
             "timestamp": datetime.datetime.now().isoformat()
         }
-    
-    finally:
-        if driver:
-            driver.quit()
-            print("浏览器已关闭", file=sys.stderr)
 
 def main():
     """主函数 - 直接输出结果"""
+    parser = argparse.ArgumentParser(description='从GuruFocus获取纳斯达克100 PE比率')
+    parser.add_argument('--engine', default='auto', choices=['auto', 'http', 'selenium'],
+                        help='抓取方式（auto=优先HTTP、403时回退Selenium，默认：auto）')
+    parser.add_argument('--no-db', action='store_true',
+                        help='不写入stock_indices表的nasdaq_100_pe字段')
+    args = parser.parse_args()
+    
     try:
         print("开始获取纳斯达克100 PE数据...")
-        result = get_nasdaq100_pe()
+        result = get_nasdaq100_pe(engine=args.engine)
         
         # 如果成功获取数据，直接打印结果
         if result and result.get("success") and result.get("data"):
@@ -175,7 +274,27 @@ def main():
             print(f"数据源: {result['data']['source']}")
             print(f"获取时间: {result['data']['timestamp']}")
             print(f"描述: {result['data']['description']}")
+            series = result["data"].get("series", [])
+            if series:
+                print(f"历史序列: {len(series)} 个日期（{series[0]['date']} ~ {series[-1]['date']}）")
             print("=" * 40)
+            
+            # 整个序列一次写入数据库（只更新stock_indices中已有的日期）
+            if series and not args.no_db:
+                saved = save_pe_series(series)
+                if saved is None:
+                    print("数据库保存失败")
+                else:
+                    updated, first_changed = saved
+                    print(f"已更新 stock_indices.nasdaq_100_pe: {updated} 行")
+                    if first_changed:
+                        # 指标通常在PE写入之前就已计算，从PE变化的最早日期起重算pe_zscore
+                        from indicators import update_pe_zscore
+                        zscore_result = update_pe_zscore(first_changed)
+                        if zscore_result["success"]:
+                            print(f"已重算 index_indicators.pe_zscore: {zscore_result['data']['updated']} 行")
+                        else:
+                            print(f"重算pe_zscore失败: {zscore_result['error']}")
         else:
             print("获取数据失败")
             if result and result.get("error"):
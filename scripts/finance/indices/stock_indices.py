@@ -2,16 +2,30 @@
 """
 股票指数数据获取脚本
 使用yfinance获取纳斯达克、纳斯达克100、日经225、VIX指数的最新收盘价
-数据保存到MySQL数据库的stock_indices表中
+（一次批量下载，日线缓存在本地 data/market_data.db，只请求缓存之后的新日期）
+数据保存到MySQL数据库的stock_indices表中，每行的日期是NASDAQ交易日，
+日经225取该日期当天或之前最近一个东京交易日的收盘价（日经比纳斯达克早收盘）
+按交易日历判断：上次保存之后NASDAQ没有新的交易日收盘时（周末、节假日）直接退出
+
+用法:
+    python3 stock_indices.py                                   # 获取最新交易日收盘价
+    python3 stock_indices.py --force                           # 不检查交易日历，强制获取
+    python3 stock_indices.py --backfill 2020-01-01 2025-10-31  # 回填历史日线（批量upsert）
 """
 
-import yfinance as yf
+import argparse
 import datetime
 import json
 import sys
 import pymysql
 from decimal import Decimal
 
+from market_data import INDEX_SYMBOLS, INDEX_MARKETS, BarCache, update_cache
+from trading_calendar import CALENDARS
+
+# 每行数据的日期以该指数的交易日为准
+BASE_INDEX = 'nasdaq'
+
 def get_db_connection():
     """获取数据库连接"""
     try:
@@ -28,63 +42,74 @@ def get_db_connection():
         print(f"数据库连接失败: {e}", file=sys.stderr)
         return None
 
+def get_last_saved_date():
+    """stock_indices表中最后一行的日期（没有数据或连接失败时返回None）"""
+    connection = get_db_connection()
+    if not connection:
+        return None
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT MAX(date) AS date FROM stock_indices")
+            row = cursor.fetchone()
+        return row['date'] if row else None
+    except Exception as e:
+        print(f"读取最后保存日期失败: {e}", file=sys.stderr)
+        return None
+    finally:
+        connection.close()
+
 def get_stock_indices():
     """获取股票指数数据 - 获取前一个交易日的收盘价"""
     try:
         print("开始获取股票指数数据（前一个交易日）...", file=sys.stderr)
         
-        # 定义要获取的指数代码
-        indices = {
-            'nasdaq': '^IXIC',      # 纳斯达克综合指数
-            'nasdaq_100': '^NDX',   # 纳斯达克100指数
-            'n225': '^N225',        # 日经225指数
-            'vix': '^VIX'           # VIX恐慌指数
-        }
-        
         results = {}
-        trading_date = None
+        source_dates = {}
         
-        for name, symbol in indices.items():
+        # 所有指数一次批量下载（只下载缓存最后日期之后的K线）
+        cache = BarCache()
+        try:
             try:
-                print(f"正在获取 {name} ({symbol}) 数据...", file=sys.stderr)
-                
-                # 获取股票数据
-                ticker = yf.Ticker(symbol)
-                hist = ticker.history(period="10d")  # 获取最近10天数据，确保有前一个交易日
-                
-                if hist.empty:
+                update_cache(list(INDEX_SYMBOLS.values()), cache)
+            except Exception as e:
+                # 下载失败时仍使用已缓存的数据
+                print(f"批量下载指数数据时出错: {e}", file=sys.stderr)
+            
+            # 行日期 = 基准指数（NASDAQ）最新的交易日；没有缓存时用日历上最近收盘的交易日
+            base = cache.latest(INDEX_SYMBOLS[BASE_INDEX])
+            if base:
+                trading_date = base[-1][0]
+            else:
+                trading_date = CALENDARS[INDEX_MARKETS[BASE_INDEX]].last_closed_session()
+                print(f"未获取到{BASE_INDEX}数据，使用交易日历日期: {trading_date}", file=sys.stderr)
+            
+            for name, symbol in INDEX_SYMBOLS.items():
+                # 只取行日期当天或之前的K线（东京先收盘，不能把NASDAQ之后的日经收盘价算进来）
+                recent = cache.closes(symbol, start=trading_date - datetime.timedelta(days=10), end=trading_date)[-5:]
+                if not recent:
                     print(f"警告: {name} 没有获取到数据", file=sys.stderr)
                     results[name] = 0.0
                     continue
                 
                 # 显示最近几天的数据用于调试
                 print(f"{name} 最近几天数据:", file=sys.stderr)
-                for i, (date, row) in enumerate(hist.tail(5).iterrows()):
-                    print(f"  {i}: {date.date()} - 收盘价: {row['Close']:.3f}", file=sys.stderr)
+                for i, (date, close) in enumerate(recent):
+                    print(f"  {i}: {date} - 收盘价: {close:.3f}", file=sys.stderr)
                 
                 # 获取最新的交易日收盘价（最后一个数据点）
-                if len(hist) >= 1:
-                    latest_close = hist['Close'].iloc[-1]  # 最新交易日收盘价
-                    latest_date = hist.index[-1].date()    # 最新交易日日期
-                    results[name] = float(latest_close)
-                    
-                    # 记录交易日期（所有指数应该使用相同的日期）
-                    if trading_date is None:
-                        trading_date = latest_date
-                    
-                    print(f"{name} 最新交易日({latest_date})收盘价: {latest_close:.3f}", file=sys.stderr)
-                else:
-                    print(f"警告: {name} 数据不足，无法获取最新交易日数据", file=sys.stderr)
-                    results[name] = 0.0
+                latest_date, latest_close = recent[-1]
+                results[name] = float(latest_close)
+                source_dates[name] = latest_date.strftime("%Y-%m-%d")
                 
-            except Exception as e:
-                print(f"获取 {name} 数据时出错: {e}", file=sys.stderr)
-                results[name] = 0.0
-        
-        # 如果没有获取到任何交易日期，使用昨天作为默认日期
-        if trading_date is None:
-            trading_date = datetime.date.today() - datetime.timedelta(days=1)
-            print(f"未获取到交易日期，使用默认日期: {trading_date}", file=sys.stderr)
+                # 该指数所在市场在行日期当天或之前最近的交易日
+                calendar = CALENDARS[INDEX_MARKETS[name]]
+                expected = trading_date if calendar.is_session(trading_date) else calendar.previous_session(trading_date)
+                if latest_date < expected:
+                    print(f"警告: {name} 缓存缺少 {calendar.name} 交易日 {expected} 的数据，使用 {latest_date}", file=sys.stderr)
+                
+                print(f"{name} 最新交易日({latest_date})收盘价: {latest_close:.3f}", file=sys.stderr)
+        finally:
+            cache.close()
         
         # 返回结果
         return {
@@ -95,6 +120,7 @@ def get_stock_indices():
                 "nasdaq_100": results.get('nasdaq_100', 0.0),
                 "n225": results.get('n225', 0.0),
                 "vix": results.get('vix', 0.0),
+                "source_dates": source_dates,
                 "timestamp": datetime.datetime.now().isoformat()
             }
         }
@@ -107,64 +133,154 @@ def get_stock_indices():
             "timestamp": datetime.datetime.now().isoformat()
         }
 
-def save_to_database(data):
-    """将股票指数数据保存到数据库"""
+# 批量upsert（依赖 stock_indices 表的 UNIQUE KEY `date`；不覆盖 nasdaq_100_pe 和 a）
+UPSERT_SQL = """
+INSERT INTO stock_indices (date, nasdaq, nasdaq_100, nasdaq_100_pe, n225, vix, a)
+VALUES (%s, %s, %s, %s, %s, %s, %s)
+ON DUPLICATE KEY UPDATE
+    nasdaq = VALUES(nasdaq),
+    nasdaq_100 = VALUES(nasdaq_100),
+    n225 = VALUES(n225),
+    vix = VALUES(vix)
+"""
+UPSERT_CHUNK_SIZE = 1000
+
+def bulk_upsert_indices(rows, chunk_size=UPSERT_CHUNK_SIZE):
+    """
+    批量写入指数数据（一个事务，每chunk_size行一条多行INSERT）
+    rows: [(date, nasdaq, nasdaq_100, n225, vix), ...]
+    返回写入行数，失败时返回None
+    """
     connection = None
     try:
         connection = get_db_connection()
         if not connection:
-            return False
+            return None
         
+        # 新行的 nasdaq_100_pe 和 a 写0（已有行不覆盖）
+        params = [(date, nasdaq, nasdaq_100, 0, n225, vix, 0) for date, nasdaq, nasdaq_100, n225, vix in rows]
         with connection.cursor() as cursor:
-            # 检查该日期是否已存在数据
-            check_sql = "SELECT id FROM stock_indices WHERE date = %s"
-            cursor.execute(check_sql, (data['date'],))
-            existing = cursor.fetchone()
-            
-            if existing:
-                # 更新现有记录
-                update_sql = """
-                UPDATE stock_indices 
-                SET nasdaq = %s, nasdaq_100 = %s, n225 = %s, vix = %s
-                WHERE date = %s
-                """
-                cursor.execute(update_sql, (
-                    data['nasdaq'], 
-                    data['nasdaq_100'], 
-                    data['n225'], 
-                    data['vix'],
-                    data['date']
-                ))
-                print(f"更新数据库记录: 日期 {data['date']}", file=sys.stderr)
-            else:
-                # 插入新记录
-                insert_sql = """
-                INSERT INTO stock_indices (date, nasdaq, nasdaq_100, nasdaq_100_pe, n225, vix, a)
-                VALUES (%s, %s, %s, 0, %s, %s, 0)
-                """
-                cursor.execute(insert_sql, (
-                    data['date'],
-                    data['nasdaq'], 
-                    data['nasdaq_100'], 
-                    data['n225'], 
-                    data['vix']
-                ))
-                print(f"插入新数据库记录: 日期 {data['date']}", file=sys.stderr)
-            
-            connection.commit()
-            return True
-            
+            for i in range(0, len(params), chunk_size):
+                # pymysql会把executemany的INSERT ... VALUES合并为一条多行语句（VALUES中只能是占位符）
+                cursor.executemany(UPSERT_SQL, params[i:i + chunk_size])
+        connection.commit()
+        return len(rows)
+    
     except Exception as e:
         print(f"数据库操作失败: {e}", file=sys.stderr)
         if connection:
             connection.rollback()
-        return False
+        return None
     finally:
         if connection:
             connection.close()
 
+def build_backfill_rows(cache, start, end):
+    """
+    从本地行情缓存生成回填行
+    以纳斯达克的交易日为准（与每日任务的日期一致），其余指数取当日或之前最近一个交易日的收盘价
+    """
+    series = {name: cache.closes(symbol, end=end) for name, symbol in INDEX_SYMBOLS.items()}
+    base_dates = [date for date, _ in series[BASE_INDEX] if date >= start]
+    
+    rows = []
+    positions = {name: 0 for name in series}
+    latest = {name: 0.0 for name in series}
+    for date in base_dates:
+        for name, closes in series.items():
+            pos = positions[name]
+            while pos < len(closes) and closes[pos][0] <= date:
+                latest[name] = closes[pos][1]
+                pos += 1
+            positions[name] = pos
+        rows.append((date.isoformat(), latest['nasdaq'], latest['nasdaq_100'], latest['n225'], latest['vix']))
+    return rows
+
+def backfill(start, end):
+    """回填 [start, end] 区间的历史日线到stock_indices表"""
+    print(f"开始回填股票指数历史数据: {start} ~ {end}", file=sys.stderr)
+    cache = BarCache()
+    try:
+        # 一次批量下载全部指数的区间日线（多取10天用于前值填充）
+        update_cache(list(INDEX_SYMBOLS.values()), cache, start=start - datetime.timedelta(days=10), end=end)
+        rows = build_backfill_rows(cache, start, end)
+    finally:
+        cache.close()
+    
+    if not rows:
+        return {
+            "success": False,
+            "error": "区间内没有交易日数据",
+            "timestamp": datetime.datetime.now().isoformat()
+        }
+    
+    started = datetime.datetime.now()
+    written = bulk_upsert_indices(rows)
+    elapsed = (datetime.datetime.now() - started).total_seconds()
+    if written is None:
+        return {
+            "success": False,
+            "error": "数据库保存失败",
+            "timestamp": datetime.datetime.now().isoformat()
+        }
+    
+    print(f"已回填 {written} 个交易日（{rows[0][0]} ~ {rows[-1][0]}），数据库写入耗时 {elapsed:.2f}s", file=sys.stderr)
+    return {
+        "success": True,
+        "data": {
+            "start": rows[0][0],
+            "end": rows[-1][0],
+            "rows": written,
+            "timestamp": datetime.datetime.now().isoformat()
+        }
+    }
+
+def save_to_database(data):
+    """将股票指数数据保存到数据库（按日期upsert）"""
+    written = bulk_upsert_indices([(
+        data['date'],
+        data['nasdaq'],
+        data['nasdaq_100'],
+        data['n225'],
+        data['vix']
+    )])
+    if written is None:
+        return False
+    print(f"写入数据库记录: 日期 {data['date']}", file=sys.stderr)
+    return True
+
 def main():
     """主函数"""
+    parser = argparse.ArgumentParser(description='获取股票指数收盘价并保存到stock_indices表')
+    parser.add_argument('--backfill', nargs=2, metavar=('START', 'END'), type=datetime.date.fromisoformat,
+                        help='回填区间（YYYY-MM-DD YYYY-MM-DD，含两端）')
+    parser.add_argument('--force', action='store_true', help='不检查交易日历，强制获取并保存')
+    args = parser.parse_args()
+    
+    if args.backfill:
+        start, end = args.backfill
+        if start > end:
+            parser.error("START 不能晚于 END")
+        print(json.dumps(backfill(start, end), ensure_ascii=False, indent=2))
+        return
+    
+    if not args.force:
+        # 只用本地数据判断：上次保存之后NASDAQ没有新的交易日收盘时直接退出（不启动yfinance）
+        calendar = CALENDARS[INDEX_MARKETS[BASE_INDEX]]
+        last_saved = get_last_saved_date()
+        if last_saved and not calendar.has_new_session(last_saved):
+            print(f"上次保存 {last_saved} 之后 {calendar.name} 没有新的交易日收盘，跳过", file=sys.stderr)
+            print(json.dumps({
+                "success": True,
+                "skipped": True,
+                "data": {
+                    "last_saved_date": last_saved.strftime("%Y-%m-%d"),
+                    "next_session": calendar.next_session(last_saved).strftime("%Y-%m-%d")
+                },
+                "timestamp": datetime.datetime.now().isoformat()
+            }, ensure_ascii=False, indent=2))
+            return
+    
     try:
         print("开始执行股票指数数据获取...", file=sys.stderr)
         
@@ -182,6 +298,13 @@ def main():
             if db_success:
                 result["database_saved"] = True
                 print("数据已成功保存到数据库", file=sys.stderr)
+
+                # 增量更新衍生指标（只计算新日期）
+                from indicators import update_indicators
+                indicators = update_indicators()
+                result["indicators_updated"] = indicators.get("success", False)
+                if not indicators.get("success"):
+                    result["indicators_error"] = indicators.get("error")
             else:
                 result["database_saved"] = False
                 result["database_error"] = "数据库保存失败"
@@ -0,0 +1,253 @@
+#!/usr/bin/env python3
+"""
+交易日历（NASDAQ / 东京证券交易所）
+按规则计算休市日，不依赖网络和第三方库，用于判断自上次保存之后是否有新的交易日已经收盘
+
+- NASDAQ：美国东部时间16:00收盘，休市日与NYSE相同（元旦、马丁·路德·金纪念日、总统日、耶稣受难日、
+  阵亡将士纪念日、六月节、独立日、劳动节、感恩节、圣诞节；周六的节日提前到周五、周日的顺延到周一，
+  元旦落在周六时不补休）。提前收盘日（13:00）按16:00处理，只会晚一点判定为已收盘
+- TSE：东京时间15:30收盘，休市日为日本国民节假日（含振替休日、国民の休日）以及1月1~3日、12月31日
+
+用法:
+    python3 trading_calendar.py                  # 各市场最近一个已收盘的交易日
+    python3 trading_calendar.py --year 2025      # 列出某年的休市日
+"""
+
+import argparse
+import datetime
+from functools import lru_cache
+from zoneinfo import ZoneInfo
+
+# 收盘后等待行情源更新日线的时间
+CLOSE_DATA_DELAY = datetime.timedelta(minutes=15)
+
+
+def _nth_weekday(year, month, weekday, n):
+    """某月第n个星期weekday（0=周一）；n=-1表示最后一个"""
+    if n > 0:
+        first = datetime.date(year, month, 1)
+        return first + datetime.timedelta(days=(weekday - first.weekday()) % 7 + 7 * (n - 1))
+    last = datetime.date(year, month + 1, 1) - datetime.timedelta(days=1) if month < 12 else datetime.date(year, 12, 31)
+    return last - datetime.timedelta(days=(last.weekday() - weekday) % 7)
+
+
+def _easter(year):
+    """复活节（格里高利历，匿名算法）"""
+    a = year % 19
+    b, c = divmod(year, 100)
+    d, e = divmod(b, 4)
+    f = (b + 8) // 25
+    g = (b - f + 1) // 3
+    h = (19 * a + b - d - g + 15) % 30
+    i, k = divmod(c, 4)
+    l = (32 + 2 * e + 2 * i - h - k) % 7
+    m = (a + 11 * h + 22 * l) // 451
+    month, day = divmod(h + l - 7 * m + 114, 31)
+    return datetime.date(year, month, day + 1)
+
+
+def _observed_us(date):
+    """美国节日的补休规则：周六提前到周五，周日顺延到周一"""
+    if date.weekday() == 5:
+        return date - datetime.timedelta(days=1)
+    if date.weekday() == 6:
+        return date + datetime.timedelta(days=1)
+    return date
+
+
+# 规则之外的临时休市
+NASDAQ_SPECIAL_CLOSURES = {
+    datetime.date(2018, 12, 5),   # 老布什国葬
+    datetime.date(2025, 1, 9),    # 卡特国葬
+}
+
+
+@lru_cache(maxsize=None)
+def nasdaq_holidays(year):
+    """NASDAQ某年的休市日"""
+    holidays = {
+        _nth_weekday(year, 1, 0, 3),                          # 马丁·路德·金纪念日
+        _nth_weekday(year, 2, 0, 3),                          # 总统日
+        _easter(year) - datetime.timedelta(days=2),           # 耶稣受难日
+        _nth_weekday(year, 5, 0, -1),                         # 阵亡将士纪念日
+        _observed_us(datetime.date(year, 7, 4)),              # 独立日
+        _nth_weekday(year, 9, 0, 1),                          # 劳动节
+        _nth_weekday(year, 11, 3, 4),                         # 感恩节
+        _observed_us(datetime.date(year, 12, 25)),            # 圣诞节
+    }
+    new_year = datetime.date(year, 1, 1)
+    if new_year.weekday() != 5:                               # 元旦落在周六时不补休
+        holidays.add(_observed_us(new_year))
+    if year >= 2022:
+        holidays.add(_observed_us(datetime.date(year, 6, 19)))  # 六月节
+    holidays.update(d for d in NASDAQ_SPECIAL_CLOSURES if d.year == year)
+    return frozenset(holidays)
+
+
+def _vernal_equinox(year):
+    """春分日（1980~2099年有效）"""
+    return datetime.date(year, 3, int(20.8431 + 0.242194 * (year - 1980) - (year - 1980) // 4))
+
+
+def _autumnal_equinox(year):
+    """秋分日（1980~2099年有效）"""
+    return datetime.date(year, 9, int(23.2488 + 0.242194 * (year - 1980) - (year - 1980) // 4))
+
+
+# 奥运会等特别法调整的节日：{年份: {节日: 日期}}，覆盖按规则计算的日期
+JAPAN_MOVED_HOLIDAYS = {
+    2020: {'marine': datetime.date(2020, 7, 23), 'sports': datetime.date(2020, 7, 24), 'mountain': datetime.date(2020, 8, 10)},
+    2021: {'marine': datetime.date(2021, 7, 22), 'sports': datetime.date(2021, 7, 23), 'mountain': datetime.date(2021, 8, 8)},
+}
+
+# 规则之外的一次性休日（2019年天皇即位）
+JAPAN_SPECIAL_HOLIDAYS = {
+    datetime.date(2019, 4, 30), datetime.date(2019, 5, 1), datetime.date(2019, 5, 2), datetime.date(2019, 10, 22),
+}
+
+
+@lru_cache(maxsize=None)
+def japan_national_holidays(year):
+    """日本某年的国民节假日（含振替休日和国民の休日）"""
+    named = {
+        'new_year': datetime.date(year, 1, 1),                # 元日
+        'coming_of_age': _nth_weekday(year, 1, 0, 2),         # 成人の日
+        'foundation': datetime.date(year, 2, 11),             # 建国記念の日
+        'vernal_equinox': _vernal_equinox(year),              # 春分の日
+        'showa': datetime.date(year, 4, 29),                  # 昭和の日
+        'constitution': datetime.date(year, 5, 3),            # 憲法記念日
+        'greenery': datetime.date(year, 5, 4),                # みどりの日
+        'children': datetime.date(year, 5, 5),                # こどもの日
+        'marine': _nth_weekday(year, 7, 0, 3),                # 海の日
+        'mountain': datetime.date(year, 8, 11),               # 山の日
+        'respect_for_aged': _nth_weekday(year, 9, 0, 3),      # 敬老の日
+        'autumnal_equinox': _autumnal_equinox(year),          # 秋分の日
+        'sports': _nth_weekday(year, 10, 0, 2),               # スポーツの日
+        'culture': datetime.date(year, 11, 3),                # 文化の日
+        'labor_thanksgiving': datetime.date(year, 11, 23),    # 勤労感謝の日
+    }
+    if year >= 2020:
+        named['emperor'] = datetime.date(year, 2, 23)         # 天皇誕生日
+    elif year <= 2018:
+        named['emperor'] = datetime.date(year, 12, 23)
+    named.update(JAPAN_MOVED_HOLIDAYS.get(year, {}))
+
+    holidays = set(named.values())
+    holidays.update(d for d in JAPAN_SPECIAL_HOLIDAYS if d.year == year)
+
+    # 国民の休日：夹在两个节日之间的平日
+    for day in sorted(holidays):
+        between = day + datetime.timedelta(days=1)
+        if between not in holidays and between.weekday() != 6 and between + datetime.timedelta(days=1) in holidays:
+            holidays.add(between)
+
+    # 振替休日：节日落在周日时，顺延到之后第一个不是节日的日子
+    for day in sorted(holidays):
+        if day.weekday() == 6:
+            substitute = day + datetime.timedelta(days=1)
+            while substitute in holidays:
+                substitute += datetime.timedelta(days=1)
+            holidays.add(substitute)
+    return frozenset(holidays)
+
+
+@lru_cache(maxsize=None)
+def tse_holidays(year):
+    """东京证券交易所某年的休市日"""
+    holidays = set(japan_national_holidays(year))
+    holidays.update({
+        datetime.date(year, 1, 2), datetime.date(year, 1, 3),  # 年初休市
+        datetime.date(year, 12, 31),                            # 大納会之后
+    })
+    return frozenset(holidays)
+
+
+class TradingCalendar:
+    """
+    单个市场的交易日历
+    交易日 = 非周末且不在休市日中；收盘时间按交易所当地时区计算
+    """
+
+    def __init__(self, name, timezone, close_time, holidays):
+        self.name = name
+        self.tz = ZoneInfo(timezone)
+        self.close_time = close_time
+        self._holidays = holidays
+
+    def holidays(self, year):
+        """某年的休市日（可能包含周末）"""
+        return self._holidays(year)
+
+    def is_session(self, date):
+        """是否为交易日"""
+        return date.weekday() < 5 and date not in self._holidays(date.year)
+
+    def previous_session(self, date):
+        """date之前（不含）最近的交易日"""
+        date -= datetime.timedelta(days=1)
+        while not self.is_session(date):
+            date -= datetime.timedelta(days=1)
+        return date
+
+    def next_session(self, date):
+        """date之后（不含）最近的交易日"""
+        date += datetime.timedelta(days=1)
+        while not self.is_session(date):
+            date += datetime.timedelta(days=1)
+        return date
+
+    def sessions(self, start, end):
+        """[start, end] 区间内的交易日列表"""
+        result = []
+        date = start
+        while date <= end:
+            if self.is_session(date):
+                result.append(date)
+            date += datetime.timedelta(days=1)
+        return result
+
+    def session_close(self, date):
+        """某交易日的收盘时刻（带时区）"""
+        return datetime.datetime.combine(date, self.close_time, tzinfo=self.tz)
+
+    def last_closed_session(self, now=None):
+        """最近一个已经收盘（并过了行情更新延迟）的交易日"""
+        now = now or datetime.datetime.now(datetime.timezone.utc)
+        local_now = now.astimezone(self.tz)
+        date = local_now.date()
+        if self.is_session(date) and local_now >= self.session_close(date) + CLOSE_DATA_DELAY:
+            return date
+        return self.previous_session(date)
+
+    def has_new_session(self, last_date, now=None):
+        """last_date之后是否又有交易日收盘"""
+        return last_date is None or self.last_closed_session(now) > last_date
+
+
+CALENDARS = {
+    'NASDAQ': TradingCalendar('NASDAQ', 'America/New_York', datetime.time(16, 0), nasdaq_holidays),
+    'TSE': TradingCalendar('TSE', 'Asia/Tokyo', datetime.time(15, 30), tse_holidays),
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='NASDAQ / 东京证券交易所 交易日历')
+    parser.add_argument('--year', type=int, help='列出该年的休市日（只列工作日）')
+    args = parser.parse_args()
+
+    if args.year:
+        for name, calendar in CALENDARS.items():
+            closed = [d for d in calendar.holidays(args.year) if d.weekday() < 5]
+            print(f"{name} {args.year} 休市日（{len(closed)}天）:")
+            for day in sorted(closed):
+                print(f"  {day} {day.strftime('%a')}")
+        return
+
+    now = datetime.datetime.now(datetime.timezone.utc)
+    for name, calendar in CALENDARS.items():
+        last = calendar.last_closed_session(now)
+        print(f"{name:<7} 最近收盘交易日: {last}  下一个交易日: {calendar.next_session(last)}")
+
+
+if __name__ == '__main__':
+    main()
@@ -3,66 +3,66 @@
 """
 朝日新闻RSS抓取脚本
 获取朝日新闻RSS feed并保存为JSON格式
-支持多个分类的RSS源
+支持多个分类的RSS源（所有分类通过同一个keep-alive会话并发抓取，单个分类超时或失败不影响其他分类）
+条件请求：本地缓存每个feed的ETag/Last-Modified和解析后的条目，返回304时直接复用缓存，不再解析
+增量入库：按链接生成稳定ID，本地记录已见过的链接，只输出新条目，
+并用分块的 executemany INSERT IGNORE 一次写入 articles.asahi_rss_articles
+（抓取/缓存/去重/入库由 ../feed_engine.py 提供，所有来源一起刷新见 feed_engine.py）
 """
 
+import argparse
 import sys
 import json
 import os
+import time
 from datetime import datetime
 
-try:
-    import feedparser
-except ImportError:
-    print("❌ 请先安装feedparser: pip install feedparser", file=sys.stderr)
-    sys.exit(1)
+# 抓取、缓存、去重和入库使用通用RSS引擎
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from feed_engine import (
+    ASAHI_FEEDS, FEED_SOURCES, SEEN_DB_PATH, FeedCache, SeenLinks, fetch_feeds, link_id, save_rows
+)
 
-try:
-    import requests
-except ImportError:
-    print("❌ 请先安装requests: pip install requests", file=sys.stderr)
-    sys.exit(1)
 
-
-# RSS链接配置 - 所有分类
+# RSS链接配置 - 所有分类（URL在 feed_engine.ASAHI_FEEDS 中统一维护）
 RSS_SOURCES = {
     "newsheadlines": {
-        "url": "https://www.asahi.com/rss/asahi/newsheadlines.rdf",
+        "url": ASAHI_FEEDS["newsheadlines"],
         "name": "综合头条",
         "emoji": "📰"
     },
     "national": {
-        "url": "https://www.asahi.com/rss/asahi/national.rdf",
+        "url": ASAHI_FEEDS["national"],
         "name": "社会新闻",
         "emoji": "🏘️"
     },
     "international": {
-        "url": "https://www.asahi.com/rss/asahi/international.rdf",
+        "url": ASAHI_FEEDS["international"],
         "name": "国际新闻",
         "emoji": "🌏"
     },
     "politics": {
-        "url": "https://www.asahi.com/rss/asahi/politics.rdf",
+        "url": ASAHI_FEEDS["politics"],
         "name": "政治新闻",
         "emoji": "🏛️"
     },
     "business": {
-        "url": "https://www.asahi.com/rss/asahi/business.rdf",
+        "url": ASAHI_FEEDS["business"],
         "name": "经济新闻",
         "emoji": "💼"
     },
     "sports": {
-        "url": "https://www.asahi.com/rss/asahi/sports.rdf",
+        "url": ASAHI_FEEDS["sports"],
         "name": "体育新闻",
         "emoji": "⚽"
     },
     "culture": {
-        "url": "https://www.asahi.com/rss/asahi/culture.rdf",
+        "url": ASAHI_FEEDS["culture"],
         "name": "文化新闻",
         "emoji": "🎭"
     },
     "science": {
-        "url": "https://www.asahi.com/rss/asahi/science.rdf",
+        "url": ASAHI_FEEDS["science"],
         "name": "科学新闻",
         "emoji": "🔬"
     }
@@ -71,90 +71,55 @@ RSS_SOURCES = {
 # 输出目录
 OUTPUT_DIR = os.path.expanduser("~/Desktop/workspace/brain/skynet")
 
+DB_TABLE = FEED_SOURCES["asahi"]["table"]
+DB_COLUMNS = ["title", "link", "pubDate", "content", "contentSnippet"]
+
 
-def fetch_rss_feed(url):
+def fetch_all_feeds(sources=RSS_SOURCES, cache=None):
     """
-    获取RSS feed
-    
-    Args:
-        url: RSS feed的URL
+    并发抓取所有分类（共用一个会话），总耗时约等于最慢的单个分类
     
     Returns:
-        feedparser解析后的对象
+        dict: {分类键: (条目列表, 是否304, 错误信息, 耗时秒数)}，顺序与sources一致
     """
-    try:
-        print(f"📡 正在获取RSS: {url}", file=sys.stderr)
-        
-        # 使用requests获取内容（可以设置超时和headers）
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36'
-        }
-        response = requests.get(url, headers=headers, timeout=30)
-        response.raise_for_status()
-        
-        # 使用feedparser解析
-        feed = feedparser.parse(response.content)
-        
-        print(f"✅ 成功获取 {len(feed.entries)} 条新闻", file=sys.stderr)
-        return feed
-        
-    except requests.exceptions.RequestException as e:
-        print(f"❌ 获取RSS失败: {e}", file=sys.stderr)
-        return None
-    except Exception as e:
-        print(f"❌ 解析RSS失败: {e}", file=sys.stderr)
-        return None
+    return fetch_feeds(
+        [(cat_key, cat_info['url'], f"{cat_info['emoji']} {cat_info['name']}") for cat_key, cat_info in sources.items()],
+        cache=cache
+    )
 
 
-def parse_date(entry):
+def save_to_database(news_list):
     """
-    解析日期字符串为标准格式
-    
-    Args:
-        entry: RSS entry对象
+    批量写入 asahi_rss_articles（分块的多行 INSERT IGNORE，重复标题被忽略）
     
     Returns:
-        格式化的日期字符串 (YYYY-MM-DD HH:MM:SS)
+        int: 实际新增的行数；失败时返回None
     """
-    try:
-        # 尝试多个日期字段
-        if hasattr(entry, 'published_parsed') and entry.published_parsed:
-            dt = datetime(*entry.published_parsed[:6])
-            return dt.strftime('%Y-%m-%d %H:%M:%S')
-        elif hasattr(entry, 'updated_parsed') and entry.updated_parsed:
-            dt = datetime(*entry.updated_parsed[:6])
-            return dt.strftime('%Y-%m-%d %H:%M:%S')
-        elif 'published' in entry:
-            # 尝试直接解析字符串
-            return entry.published
-        return ""
-    except Exception as e:
-        return ""
+    return save_rows(DB_TABLE, DB_COLUMNS, news_list)
 
 
-def convert_to_json_format(feed, category_key="", category_name="", start_id=1):
+def convert_to_json_format(entries, category_key="", category_name=""):
     """
-    将RSS feed转换为指定的JSON格式
+    将RSS条目转换为指定的JSON格式
     
     Args:
-        feed: feedparser解析后的feed对象
+        entries: simplify_entry转换后的条目列表
         category_key: 分类键名（如 "national"）
         category_name: 分类名称（如 "社会新闻"）
-        start_id: 起始ID
     
     Returns:
         list: JSON格式的新闻列表
     """
     news_list = []
     
-    for idx, entry in enumerate(feed.entries, start=start_id):
+    for entry in entries:
         news_item = {
-            "id": idx,
+            "id": link_id(entry.get('link', ''), fallback=entry.get('title', '')),
             "category": category_key,
             "category_name": category_name,
             "title": entry.get('title', ''),
             "link": entry.get('link', ''),
-            "pubDate": parse_date(entry),
+            "pubDate": entry.get('pubDate', ''),
             "content": entry.get('description', ''),
             "contentSnippet": entry.get('summary', '')
         }
@@ -195,7 +160,8 @@ def save_to_json(news_list, output_dir, category_stats=None):
         if category_stats:
             print("\n📋 分类统计:", file=sys.stderr)
             for cat_key, info in category_stats.items():
-                print(f"   {info['emoji']} {info['name']}: {info['count']} 条", file=sys.stderr)
+                status = f"（失败: {info['error']}）" if info.get('error') else ""
+                print(f"   {info['emoji']} {info['name']}: {info['count']} 条{status}", file=sys.stderr)
         
         return filepath
         
@@ -229,6 +195,13 @@ def print_summary(news_list, category_stats):
 
 def main():
     """主函数"""
+    parser = argparse.ArgumentParser(description='抓取朝日新闻全分类RSS')
+    parser.add_argument('--no-cache', action='store_true', help='不发送条件请求，完整下载并解析所有feed')
+    parser.add_argument('--all', action='store_true', help='输出全部条目（不按已见链接过滤）')
+    parser.add_argument('--no-db', action='store_true', help='不写入MySQL，只输出新条目')
+    parser.add_argument('--seen-db', default=SEEN_DB_PATH, help='已见链接索引路径（默认：data/rss_seen.db）')
+    args = parser.parse_args()
+    
     print("="*60, file=sys.stderr)
     print("📰 朝日新闻RSS抓取工具 - 全分类版", file=sys.stderr)
     print("="*60, file=sys.stderr)
@@ -237,28 +210,35 @@ def main():
     all_news = []
     category_stats = {}
     
-    # 循环抓取所有RSS源
+    # 并发抓取所有RSS源
+    cache = None if args.no_cache else FeedCache()
+    start = time.perf_counter()
+    results = fetch_all_feeds(RSS_SOURCES, cache=cache)
+    not_modified_count = sum(1 for result in results.values() if result[1])
+    print(f"\n⏱️  {len(results)} 个分类抓取完成（{not_modified_count} 个未变化），总耗时 {time.perf_counter() - start:.2f}s", file=sys.stderr)
+    if cache:
+        cache.save()
+    
     for cat_key, cat_info in RSS_SOURCES.items():
-        print(f"\n{cat_info['emoji']} 正在抓取: {cat_info['name']}", file=sys.stderr)
-        
-        # 获取RSS feed
-        feed = fetch_rss_feed(cat_info['url'])
+        entries, not_modified, error, elapsed = results[cat_key]
         
-        if not feed or not feed.entries:
+        if not entries:
             print(f"⚠️  {cat_info['name']} 未能获取数据，跳过", file=sys.stderr)
             category_stats[cat_key] = {
                 'name': cat_info['name'],
                 'emoji': cat_info['emoji'],
-                'count': 0
+                'count': 0,
+                'not_modified': not_modified,
+                'error': error or "RSS中没有新闻",
+                'elapsed': round(elapsed, 2)
             }
             continue
         
-        # 转换为JSON格式（临时ID，稍后统一编号）
+        # 转换为JSON格式（ID由链接生成，每次运行都相同）
         news_list = convert_to_json_format(
-            feed, 
+            entries, 
             category_key=cat_key,
-            category_name=cat_info['name'],
-            start_id=0
+            category_name=cat_info['name']
         )
         
         # 添加到总列表
@@ -268,17 +248,16 @@ def main():
         category_stats[cat_key] = {
             'name': cat_info['name'],
             'emoji': cat_info['emoji'],
-            'count': len(news_list)
+            'count': len(news_list),
+            'not_modified': not_modified,
+            'error': None,
+            'elapsed': round(elapsed, 2)
         }
     
     if not all_news:
         print("\n❌ 未能获取到任何新闻数据", file=sys.stderr)
         sys.exit(1)
     
-    # 统一重新编号
-    for idx, news in enumerate(all_news, start=1):
-        news['id'] = idx
-    
     print(f"\n📊 总计获取 {len(all_news)} 条新闻", file=sys.stderr)
     
     # 保存到文件
@@ -289,8 +268,24 @@ def main():
     # 打印摘要
     print_summary(all_news, category_stats)
     
-    # 输出JSON到stdout（可选）
-    print(json.dumps(all_news, ensure_ascii=False, indent=2))
+    # 只保留没见过的条目（跨分类重复的文章只保留一条）
+    seen = SeenLinks(args.seen_db)
+    try:
+        new_news = all_news if args.all else seen.filter_new(all_news)
+        print(f"🆕 新条目 {len(new_news)} 条（重复或已见过 {len(all_news) - len(new_news)} 条）", file=sys.stderr)
+        
+        if new_news and not args.no_db:
+            inserted = save_to_database(new_news)
+            if inserted is None:
+                # 入库失败时不记录为已见，下次重新输出
+                sys.exit(1)
+            print(f"🗄️  写入 {DB_TABLE}: 新增 {inserted} 行（重复标题 {len(new_news) - inserted} 条被忽略）", file=sys.stderr)
+        
+        # 输出JSON到stdout（只包含新条目）
+        print(json.dumps(new_news, ensure_ascii=False, indent=2))
+        seen.mark(new_news, source='asahi')
+    finally:
+        seen.close()
     
     print("\n✅ 抓取完成！", file=sys.stderr)
 
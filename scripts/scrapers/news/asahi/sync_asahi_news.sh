@@ -34,9 +34,9 @@ source "${VENV_DIR}/bin/activate"
 
 # 检查依赖
 echo -e "${YELLOW}🔍 检查依赖...${NC}"
-python3 -c "import feedparser, requests" 2>/dev/null || {
+python3 -c "import feedparser, requests, pymysql" 2>/dev/null || {
     echo -e "${YELLOW}📦 安装依赖...${NC}"
-    python3 -m pip install feedparser requests -q
+    python3 -m pip install feedparser requests pymysql -q
 }
 
 # 运行脚本
@@ -0,0 +1,559 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+通用RSS抓取引擎
+按 FEED_SOURCES 注册表抓取所有来源（朝日、NHK、华尔街见闻、WSJ、YouTube），一个进程并发刷新：
+- 所有feed共用一个keep-alive会话并发抓取，每个feed单独超时，失败只影响自己
+- 条件请求缓存（ETag / Last-Modified），返回304时复用缓存的条目，不再解析
+- 按链接生成稳定ID，本地记录已见过的链接，只输出新条目
+- 每个来源的新条目用分块的 executemany INSERT IGNORE 写入对应的表（表结构见 Documents/db_config.md）
+
+用法:
+    python3 feed_engine.py                       # 刷新所有来源
+    python3 feed_engine.py --sources nhk,wsj     # 只刷新指定来源
+    python3 feed_engine.py --no-db               # 只输出新条目，不写数据库
+    python3 feed_engine.py --list                # 列出注册的来源
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+try:
+    import feedparser
+except ImportError:
+    print("❌ 请先安装feedparser: pip install feedparser", file=sys.stderr)
+    sys.exit(1)
+
+try:
+    import requests
+except ImportError:
+    print("❌ 请先安装requests: pip install requests", file=sys.stderr)
+    sys.exit(1)
+
+try:
+    import pymysql
+except ImportError:
+    pymysql = None
+
+from requests.adapters import HTTPAdapter
+
+
+# 朝日新闻各分类（fetch_asahi_rss.py 也使用这份列表）
+ASAHI_FEEDS = {
+    "newsheadlines": "https://www.asahi.com/rss/asahi/newsheadlines.rdf",
+    "national": "https://www.asahi.com/rss/asahi/national.rdf",
+    "international": "https://www.asahi.com/rss/asahi/international.rdf",
+    "politics": "https://www.asahi.com/rss/asahi/politics.rdf",
+    "business": "https://www.asahi.com/rss/asahi/business.rdf",
+    "sports": "https://www.asahi.com/rss/asahi/sports.rdf",
+    "culture": "https://www.asahi.com/rss/asahi/culture.rdf",
+    "science": "https://www.asahi.com/rss/asahi/science.rdf"
+}
+
+# 来源注册表（URL见 Documents/rss.md）
+#   feeds: {feed键: URL}
+#   table: 写入的表（articles库）
+#   columns: {表字段: simplify_entry中的字段}
+# Housing Japan、中国数字时代还没有对应的表，暂未注册
+FEED_SOURCES = {
+    "asahi": {
+        "name": "朝日新闻",
+        "feeds": ASAHI_FEEDS,
+        "table": "asahi_rss_articles",
+        "columns": {"title": "title", "link": "link", "pubDate": "pubDate",
+                    "content": "description", "contentSnippet": "summary"}
+    },
+    "nhk": {
+        "name": "NHK",
+        "feeds": {
+            "cat0": "https://www3.nhk.or.jp/rss/news/cat0.xml"
+        },
+        "table": "nhk_rss_articles",
+        "columns": {"title": "title", "link": "link", "pubDate": "pubDate",
+                    "content": "description", "contentSnippet": "summary"}
+    },
+    "wallstreetcn": {
+        "name": "华尔街见闻",
+        "feeds": {
+            "hot": "https://rss.injahow.cn/wallstreetcn/hot"
+        },
+        "table": "wallstreetcn_rss_articles",
+        "columns": {"title": "title", "link": "link", "pubDate": "pubDate", "content": "content"}
+    },
+    "wsj": {
+        "name": "WSJ",
+        "feeds": {
+            "world": "https://feeds.a.dj.com/rss/RSSWorldNews.xml",
+            "us": "https://feeds.a.dj.com/rss/WSJcomUSBusiness.xml",
+            "markets": "https://feeds.a.dj.com/rss/WSJcomMarkets.xml",
+            "tech": "https://feeds.a.dj.com/rss/RSSWSJD.xml"
+        },
+        "table": "wsj_rss_articles",
+        "columns": {"title": "title", "link": "link", "pubDate": "pubDate", "content": "description"}
+    },
+    "youtube": {
+        "name": "YouTube",
+        "feeds": {
+            "xiao_lin_shuo": "https://www.youtube.com/feeds/videos.xml?channel_id=UCilwQlk62k1z7aUEZPOB6yw",
+            "laogao": "https://www.youtube.com/feeds/videos.xml?channel_id=UCMUnInmOkrWN4gof9KlhNmQ"
+        },
+        "table": "youtube_rss_articles",
+        "columns": {"title": "title", "link": "link", "pubDate": "pubDate",
+                    "isoDate": "isoDate", "author": "author"}
+    }
+}
+
+HTTP_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36'
+}
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', '..'))
+# 条件请求缓存：{url: {etag, last_modified, entries, fetched_at}}
+FEED_CACHE_PATH = os.path.join(PROJECT_ROOT, 'data', 'rss_feed_cache.json')
+# 已见过的链接索引（SQLite）
+SEEN_DB_PATH = os.path.join(PROJECT_ROOT, 'data', 'rss_seen.db')
+
+# 数据库配置（见 Documents/db_config.md）
+DB_CONFIG = {
+    'host': 'localhost',
+    'user': 'root',
+    'password': '123456',
+    'database': 'articles',
+    'charset': 'utf8mb4'
+}
+INSERT_CHUNK_SIZE = 500
+# NOT NULL的时间字段，条目没有日期时用当前时间
+DATETIME_COLUMNS = ('pubDate', 'isoDate')
+
+# 每个feed的超时（连接, 读取）秒数，慢的feed只会让自己失败
+FEED_TIMEOUT = (5, 15)
+# 同时抓取的feed数上限
+MAX_FETCH_WORKERS = 16
+
+
+def create_http_session(pool_size=MAX_FETCH_WORKERS):
+    """创建所有feed共用的HTTP会话（同一主机复用keep-alive连接）"""
+    session = requests.Session()
+    session.headers.update(HTTP_HEADERS)
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+class FeedCache:
+    """
+    RSS条件请求缓存（JSON文件）
+    每个feed URL保存服务器返回的ETag、Last-Modified和解析后的条目
+    """
+
+    def __init__(self, path=FEED_CACHE_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._dirty = False
+        try:
+            with open(path, encoding='utf-8') as f:
+                self._feeds = json.load(f)
+        except (OSError, ValueError):
+            self._feeds = {}
+
+    def get(self, url):
+        with self._lock:
+            return self._feeds.get(url)
+
+    def put(self, url, etag, last_modified, entries):
+        with self._lock:
+            self._feeds[url] = {
+                'etag': etag,
+                'last_modified': last_modified,
+                'entries': entries,
+                'fetched_at': datetime.now().isoformat()
+            }
+            self._dirty = True
+
+    def save(self):
+        """有更新时写回磁盘（先写临时文件再替换，避免中途退出损坏缓存）"""
+        with self._lock:
+            if not self._dirty:
+                return
+            try:
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+                tmp_path = self.path + '.tmp'
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    json.dump(self._feeds, f, ensure_ascii=False)
+                os.replace(tmp_path, self.path)
+                self._dirty = False
+            except OSError as e:
+                print(f"⚠️  无法写入RSS缓存: {e}", file=sys.stderr)
+
+
+def parse_date(entry, fields=('published', 'updated')):
+    """
+    解析日期字符串为标准格式
+
+    Args:
+        entry: RSS entry对象
+        fields: 依次尝试的日期字段
+
+    Returns:
+        格式化的日期字符串 (YYYY-MM-DD HH:MM:SS)
+    """
+    try:
+        # 尝试多个日期字段
+        for field in fields:
+            parsed = entry.get(f'{field}_parsed')
+            if parsed:
+                return datetime(*parsed[:6]).strftime('%Y-%m-%d %H:%M:%S')
+        if 'published' in entry:
+            # 尝试直接解析字符串
+            return entry.published
+        return ""
+    except Exception:
+        return ""
+
+
+def simplify_entry(entry):
+    """把feedparser条目转换为可以缓存的普通字典（包含各来源用到的全部字段）"""
+    content = entry.get('content')
+    return {
+        "title": entry.get('title', ''),
+        "link": entry.get('link', ''),
+        "pubDate": parse_date(entry),
+        "isoDate": parse_date(entry, fields=('updated', 'published')),
+        "author": entry.get('author', ''),
+        "description": entry.get('description', ''),
+        "summary": entry.get('summary', ''),
+        # content:encoded（全文），没有时用description
+        "content": content[0].get('value', '') if content else entry.get('description', '')
+    }
+
+
+def fetch_rss_feed(url, session=None, timeout=FEED_TIMEOUT, cache=None):
+    """
+    获取RSS feed
+
+    Args:
+        url: RSS feed的URL
+        session: 共用的requests会话（不传时单独请求）
+        timeout: 超时秒数（连接, 读取）
+        cache: FeedCache，传入时发送 If-None-Match / If-Modified-Since
+
+    Returns:
+        (条目列表, 是否为304未变化)；请求失败时抛出requests异常
+    """
+    print(f"📡 正在获取RSS: {url}", file=sys.stderr)
+
+    headers = {}
+    cached = cache.get(url) if cache else None
+    if cached:
+        if cached.get('etag'):
+            headers['If-None-Match'] = cached['etag']
+        if cached.get('last_modified'):
+            headers['If-Modified-Since'] = cached['last_modified']
+
+    if session is None:
+        response = requests.get(url, headers={**HTTP_HEADERS, **headers}, timeout=timeout)
+    else:
+        response = session.get(url, headers=headers, timeout=timeout)
+
+    # 未变化：直接复用缓存的条目，不再解析
+    if response.status_code == 304 and cached:
+        return cached['entries'], True
+    response.raise_for_status()
+
+    # 使用feedparser解析
+    entries = [simplify_entry(entry) for entry in feedparser.parse(response.content).entries]
+    if cache and entries:
+        cache.put(url, response.headers.get('ETag'), response.headers.get('Last-Modified'), entries)
+    return entries, False
+
+
+def _fetch_one(session, url, label, cache):
+    """抓取一个feed（在线程池中运行），返回 (条目列表, 是否304, 错误信息, 耗时秒数)"""
+    start = time.perf_counter()
+    try:
+        entries, not_modified = fetch_rss_feed(url, session=session, cache=cache)
+        elapsed = time.perf_counter() - start
+        status = "未变化，使用缓存" if not_modified else "已更新"
+        print(f"✅ {label}: {len(entries)} 条（{status}，{elapsed:.2f}s）", file=sys.stderr)
+        return entries, not_modified, None, elapsed
+    except requests.exceptions.RequestException as e:
+        error = f"获取RSS失败: {e}"
+    except Exception as e:
+        error = f"解析RSS失败: {e}"
+    elapsed = time.perf_counter() - start
+    print(f"❌ {label}: {error}（{elapsed:.2f}s）", file=sys.stderr)
+    return None, False, error, elapsed
+
+
+def fetch_feeds(feeds, cache=None, workers=None):
+    """
+    并发抓取一组feed（共用一个会话），总耗时约等于最慢的单个feed
+
+    Args:
+        feeds: [(键, URL, 日志名称), ...]
+        cache: FeedCache（None时不发送条件请求）
+        workers: 并发数（默认为feed数，最多MAX_FETCH_WORKERS）
+
+    Returns:
+        dict: {键: (条目列表, 是否304, 错误信息, 耗时秒数)}，顺序与feeds一致
+    """
+    workers = workers or max(1, min(MAX_FETCH_WORKERS, len(feeds)))
+    session = create_http_session(pool_size=workers)
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {
+                key: executor.submit(_fetch_one, session, url, label, cache)
+                for key, url, label in feeds
+            }
+            return {key: future.result() for key, future in futures.items()}
+    finally:
+        session.close()
+
+
+# 生成稳定ID时忽略的跟踪参数
+TRACKING_PARAMS = ('ref', 'iref', 'cid', 'fbclid', 'gclid')
+
+
+def normalize_link(link):
+    """去掉跟踪参数（ref、utm_*等）和锚点，同一篇文章得到相同的链接"""
+    parts = urlsplit(link.strip())
+    query = [
+        (key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if key not in TRACKING_PARAMS and not key.startswith('utm_')
+    ]
+    return urlunsplit((parts.scheme, parts.netloc.lower(), parts.path, urlencode(query), ''))
+
+
+def link_id(link, fallback=''):
+    """由链接生成的稳定ID（规范化链接的SHA-1前16位），没有链接时用fallback（标题）"""
+    key = normalize_link(link) if link else fallback
+    return hashlib.sha1(key.encode('utf-8')).hexdigest()[:16]
+
+
+class SeenLinks:
+    """
+    已见过的链接索引（SQLite）
+    按稳定ID记录，只有成功输出/入库之后才写入
+    """
+
+    def __init__(self, db_path=SEEN_DB_PATH):
+        os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        self.conn = sqlite3.connect(db_path)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS seen_links (
+                id TEXT PRIMARY KEY,
+                source TEXT NOT NULL,
+                link TEXT,
+                first_seen TEXT NOT NULL
+            )
+        """)
+        self.conn.commit()
+
+    def filter_new(self, items):
+        """返回没见过的条目（同一次运行中重复的ID只保留第一条）"""
+        ids = list({item['id'] for item in items})
+        seen = set()
+        # SQLite单条语句的参数个数有上限，分块查询
+        for i in range(0, len(ids), 500):
+            chunk = ids[i:i + 500]
+            rows = self.conn.execute(
+                f"SELECT id FROM seen_links WHERE id IN ({','.join('?' * len(chunk))})", chunk
+            ).fetchall()
+            seen.update(row[0] for row in rows)
+
+        new_items = []
+        for item in items:
+            if item['id'] not in seen:
+                seen.add(item['id'])
+                new_items.append(item)
+        return new_items
+
+    def mark(self, items, source):
+        now = datetime.now().isoformat()
+        self.conn.executemany(
+            "INSERT OR IGNORE INTO seen_links (id, source, link, first_seen) VALUES (?, ?, ?, ?)",
+            [(item['id'], source, item.get('link', ''), now) for item in items]
+        )
+        self.conn.commit()
+
+    def close(self):
+        self.conn.close()
+
+
+def save_rows(table, columns, items, chunk_size=INSERT_CHUNK_SIZE):
+    """
+    批量写入一个表（一个事务，每chunk_size条一条多行 INSERT IGNORE）
+    依赖表上的 UNIQUE KEY idx_title_unique，已存在的标题被忽略
+
+    Args:
+        table: 表名
+        columns: 字段列表（与条目字典的键相同）
+        items: 条目列表
+
+    Returns:
+        int: 实际新增的行数；失败时返回None
+    """
+    if pymysql is None:
+        print("❌ 请先安装pymysql: pip install pymysql", file=sys.stderr)
+        return None
+
+    # pymysql会把executemany的INSERT ... VALUES合并为一条多行语句（VALUES中只能是占位符）
+    sql = (f"INSERT IGNORE INTO {table} ({', '.join(columns)}) "
+           f"VALUES ({', '.join(['%s'] * len(columns))})")
+    now = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    params = [
+        tuple((item.get(column) or now) if column in DATETIME_COLUMNS else item.get(column, '') for column in columns)
+        for item in items
+    ]
+
+    connection = None
+    try:
+        connection = pymysql.connect(**DB_CONFIG)
+        inserted = 0
+        with connection.cursor() as cursor:
+            for i in range(0, len(params), chunk_size):
+                inserted += cursor.executemany(sql, params[i:i + chunk_size]) or 0
+        connection.commit()
+        return inserted
+    except Exception as e:
+        print(f"❌ {table} 写入失败: {e}", file=sys.stderr)
+        if connection:
+            connection.rollback()
+        return None
+    finally:
+        if connection:
+            connection.close()
+
+
+def build_items(source_name, source, feed_key, entries):
+    """按来源的字段映射把条目转换为表的行（附带稳定ID、来源和feed键）"""
+    items = []
+    for entry in entries:
+        item = {
+            "id": link_id(entry.get('link', ''), fallback=entry.get('title', '')),
+            "source": source_name,
+            "feed": feed_key
+        }
+        for column, field in source['columns'].items():
+            item[column] = entry.get(field, '')
+        items.append(item)
+    return items
+
+
+def refresh_sources(names, cache=None, seen=None, write_db=True, workers=None):
+    """
+    并发刷新多个来源：所有来源的feed在同一个线程池、同一个会话中抓取，
+    然后按来源过滤已见条目并批量写入各自的表
+
+    Args:
+        names: 来源名称列表（FEED_SOURCES的键）
+        cache: FeedCache（None时不发送条件请求）
+        seen: SeenLinks（None时输出全部条目）
+        write_db: 是否写入MySQL
+
+    Returns:
+        dict: {来源: {feeds, fetched, new, inserted, error, items}}
+    """
+    feeds = [
+        ((name, feed_key), url, f"{FEED_SOURCES[name]['name']}/{feed_key}")
+        for name in names
+        for feed_key, url in FEED_SOURCES[name]['feeds'].items()
+    ]
+    start = time.perf_counter()
+    results = fetch_feeds(feeds, cache=cache, workers=workers)
+    print(f"\n⏱️  {len(feeds)} 个feed抓取完成，总耗时 {time.perf_counter() - start:.2f}s", file=sys.stderr)
+    if cache:
+        cache.save()
+
+    summary = {}
+    for name in names:
+        source = FEED_SOURCES[name]
+        items = []
+        feed_stats = {}
+        for feed_key in source['feeds']:
+            entries, not_modified, error, elapsed = results[(name, feed_key)]
+            feed_stats[feed_key] = {
+                'count': len(entries or []),
+                'not_modified': not_modified,
+                'error': error,
+                'elapsed': round(elapsed, 2)
+            }
+            items.extend(build_items(name, source, feed_key, entries or []))
+
+        new_items = seen.filter_new(items) if seen else items
+        result = {
+            'feeds': feed_stats,
+            'fetched': len(items),
+            'new': len(new_items),
+            'inserted': 0,
+            'error': None,
+            'items': new_items
+        }
+
+        if new_items and write_db:
+            inserted = save_rows(source['table'], list(source['columns']), new_items)
+            if inserted is None:
+                # 入库失败时不记录为已见，下次重新输出
+                result['error'] = f"{source['table']} 写入失败"
+                result['items'] = []
+                summary[name] = result
+                continue
+            result['inserted'] = inserted
+        if seen:
+            seen.mark(new_items, source=name)
+        print(f"{source['name']}: 抓取 {len(items)} 条，新条目 {len(new_items)} 条，写入 {result['inserted']} 行", file=sys.stderr)
+        summary[name] = result
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description='按注册表并发刷新所有RSS来源')
+    parser.add_argument('--sources', help=f"逗号分隔的来源（默认全部：{','.join(FEED_SOURCES)}）")
+    parser.add_argument('--no-cache', action='store_true', help='不发送条件请求，完整下载并解析所有feed')
+    parser.add_argument('--all', action='store_true', help='输出全部条目（不按已见链接过滤）')
+    parser.add_argument('--no-db', action='store_true', help='不写入MySQL，只输出新条目')
+    parser.add_argument('--seen-db', default=SEEN_DB_PATH, help='已见链接索引路径（默认：data/rss_seen.db）')
+    parser.add_argument('--list', action='store_true', help='列出注册的来源')
+    args = parser.parse_args()
+
+    if args.list:
+        for name, source in FEED_SOURCES.items():
+            print(f"{name:<14} {source['name']:<8} → {source['table']}（{len(source['feeds'])} 个feed）")
+        return
+
+    names = list(FEED_SOURCES)
+    if args.sources:
+        names = [name.strip() for name in args.sources.split(',') if name.strip()]
+        unknown = [name for name in names if name not in FEED_SOURCES]
+        if unknown:
+            parser.error(f"未知的来源: {', '.join(unknown)}")
+
+    cache = None if args.no_cache else FeedCache()
+    seen = None if args.all else SeenLinks(args.seen_db)
+    try:
+        summary = refresh_sources(names, cache=cache, seen=seen, write_db=not args.no_db)
+    finally:
+        if seen:
+            seen.close()
+
+    failed = [name for name, result in summary.items() if result['error']]
+    print(json.dumps({
+        "success": not failed,
+        "data": summary,
+        "timestamp": datetime.now().isoformat()
+    }, ensure_ascii=False, indent=2))
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+"""
+Suumo爬虫性能基准测试
+
+用法:
+    # 本地解析耗时（page_source快照 + BeautifulSoup）
+    python3 benchmark_suumo.py parse --html saved_page.html
+
+    # 同时测量旧的逐字段WebDriver往返方式（需要Chrome）
+    python3 benchmark_suumo.py parse --html saved_page.html --selenium
+
+    # 追加模式去重：旧的子串扫描 vs 索引（10万条已有 × 2000条新房源）
+    python3 benchmark_suumo.py dedup --existing 100000 --incoming 2000
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import random
+import sys
+import time
+
+from selenium.webdriver.common.by import By
+
+from suumo_scraper import DedupIndex, parse_properties_from_html, setup_driver
+
+
+def _legacy_webdriver_extract(driver):
+    """旧版提取方式：每个字段都是一次WebDriver RPC（仅用于对比耗时）"""
+    results = []
+    for item in driver.find_elements(By.CLASS_NAME, "property_unit"):
+        data = {}
+        try:
+            title_element = item.find_element(By.CSS_SELECTOR, ".property_unit-title a")
+            data["building_name"] = title_element.text.strip()
+            data["url"] = title_element.get_attribute("href")
+        except Exception:
+            pass
+        for elem in item.find_elements(By.CSS_SELECTOR, "*"):
+            text = elem.text.strip()
+            if '万円' in text and len(text) < 20:
+                data["price"] = text
+                break
+        data["lines"] = item.text.split('\n')
+        data["detail_lines"] = item.text.split('\n')
+        try:
+            detail_table = item.find_element(By.CSS_SELECTOR, ".dottable")
+            for row in detail_table.find_elements(By.TAG_NAME, "tr"):
+                try:
+                    row.find_element(By.TAG_NAME, "th").text
+                    row.find_element(By.TAG_NAME, "td").text
+                except Exception:
+                    pass
+        except Exception:
+            pass
+        results.append(data)
+    return results
+
+
+def bench_parse(args):
+    """对比旧的逐字段往返与新的快照解析"""
+    html_path = os.path.abspath(args.html)
+    with open(html_path, encoding='utf-8') as f:
+        html = f.read()
+    base_url = "https://suumo.jp/jj/bukken/ichiran/JJ012FC001/"
+
+    # 新方式：本地解析（屏蔽解析过程中的日志输出）
+    timings = []
+    with contextlib.redirect_stderr(io.StringIO()):
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            properties, _ = parse_properties_from_html(html, base_url)
+            timings.append(time.perf_counter() - start)
+    print(f"📄 页面: {html_path}（{len(properties)} 个房源）")
+    print(f"⚡ 快照解析: 最快 {min(timings) * 1000:.1f} ms / 平均 {sum(timings) / len(timings) * 1000:.1f} ms（{args.repeat} 次）")
+
+    if not args.selenium:
+        return
+
+    # 旧方式：在浏览器中打开同一个保存的页面，逐字段读取
+    driver = setup_driver()
+    if not driver:
+        print("❌ 浏览器启动失败，无法测量旧方式", file=sys.stderr)
+        return
+    try:
+        driver.get(f"file://{html_path}")
+        start = time.perf_counter()
+        legacy = _legacy_webdriver_extract(driver)
+        legacy_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        with contextlib.redirect_stderr(io.StringIO()):
+            parse_properties_from_html(driver.page_source, base_url)
+        snapshot_time = time.perf_counter() - start
+    finally:
+        driver.quit()
+
+    print(f"🐢 逐字段WebDriver往返: {legacy_time * 1000:.1f} ms（{len(legacy)} 个房源）")
+    print(f"⚡ page_source + 本地解析: {snapshot_time * 1000:.1f} ms")
+    if snapshot_time > 0:
+        print(f"📈 加速比: {legacy_time / snapshot_time:.1f}x")
+
+
+def _legacy_dedup_check(existing_records, existing_urls, region, prop_type, name, url):
+    """旧版去重：名称+地区检查对全部已有记录做子串扫描（仅用于对比耗时）"""
+    if f"{region}|{prop_type}|{name}|{url}" in existing_records:
+        return "完全重复记录"
+    if url != 'N/A' and url in existing_urls:
+        return "URL重复"
+    if name != 'N/A':
+        name_region_key = f"{region}|{prop_type}|{name}"
+        for existing_key in existing_records:
+            if name_region_key in existing_key:
+                return "名称+地区重复"
+    return None
+
+
+def _synthetic_rows(existing_count, incoming_count, seed):
+    """生成模拟的已有记录和新房源（URL重复 / 名称重复 / 名称前缀 / 新房源各约四分之一）"""
+    rng = random.Random(seed)
+    regions = ['港区', '渋谷区', '新宿区', '目黒区', '品川区']
+    types = ['二手公寓', '新建公寓', '二手独栋']
+    existing = []
+    for i in range(existing_count):
+        existing.append((rng.choice(regions), rng.choice(types), f"物件{i:07d}", f"https://suumo.jp/ms/chuko/nc_{i:08d}/"))
+
+    incoming = []
+    for i in range(incoming_count):
+        kind = i % 4
+        if kind == 3:
+            # 名称是已有名称的前缀（旧的子串检查会判为重复）
+            region, prop_type, name, _ = rng.choice(existing)
+            incoming.append((region, prop_type, name[:-3], f"https://suumo.jp/ms/chuko/nc_prefix_{i:08d}/"))
+        elif kind == 0:
+            # 同一URL（字段可能已变）
+            region, prop_type, name, url = rng.choice(existing)
+            incoming.append((region, prop_type, name + '（更新）', url))
+        elif kind == 1:
+            # 同一房源换了URL
+            region, prop_type, name, _ = rng.choice(existing)
+            incoming.append((region, prop_type, name, f"https://suumo.jp/ms/chuko/nc_new_{i:08d}/"))
+        else:
+            incoming.append((rng.choice(regions), rng.choice(types), f"新物件{i:07d}", f"https://suumo.jp/ms/chuko/nc_fresh_{i:08d}/"))
+    rng.shuffle(incoming)
+    return existing, incoming
+
+
+def bench_dedup(args):
+    """对比追加模式的旧子串扫描去重与索引去重"""
+    existing, incoming = _synthetic_rows(args.existing, args.incoming, args.seed)
+    print(f"📊 已有记录: {len(existing)} 条 / 新房源: {len(incoming)} 条")
+
+    # 新方式：索引
+    start = time.perf_counter()
+    index = DedupIndex()
+    for row in existing:
+        index.add(*row, from_sheet=True)
+    build_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    indexed = []
+    for row in incoming:
+        reason = index.check(*row)
+        indexed.append(reason)
+        if reason is None:
+            index.add(*row)
+    check_time = time.perf_counter() - start
+    print(f"⚡ 索引去重: 建索引 {build_time * 1000:.1f} ms + 检查 {check_time * 1000:.1f} ms"
+          f"（跳过 {sum(r is not None for r in indexed)} 条）")
+
+    # 旧方式：逐条子串扫描（很慢，默认只跑一部分新房源再按比例估算）
+    sample = incoming if args.legacy_sample <= 0 else incoming[:args.legacy_sample]
+    existing_records = {f"{r}|{t}|{n}|{u}" for r, t, n, u in existing}
+    existing_urls = {u for _, _, _, u in existing if u and u != 'N/A'}
+    start = time.perf_counter()
+    legacy = []
+    for region, prop_type, name, url in sample:
+        reason = _legacy_dedup_check(existing_records, existing_urls, region, prop_type, name, url)
+        legacy.append(reason)
+        if reason is None:
+            existing_records.add(f"{region}|{prop_type}|{name}|{url}")
+            if url != 'N/A':
+                existing_urls.add(url)
+    legacy_time = time.perf_counter() - start
+    estimated = legacy_time * len(incoming) / max(len(sample), 1)
+    note = '' if len(sample) == len(incoming) else f"（实测 {len(sample)} 条，按比例估算全部）"
+    print(f"🐢 子串扫描去重: {estimated * 1000:.1f} ms{note}")
+
+    if check_time > 0:
+        print(f"📈 加速比（检查阶段）: {estimated / check_time:.0f}x")
+
+    # 逐条对比跳过判断和原因，不一致时以非0退出
+    mismatches = [(row, a, b) for row, a, b in zip(sample, legacy, indexed) if a != b]
+    print(f"🔍 跳过判断一致性: {len(sample) - len(mismatches)}/{len(sample)} 条一致"
+          f"（其中名称前缀 {sum(1 for row in sample if '/nc_prefix_' in row[3])} 条）")
+    for row, a, b in mismatches[:10]:
+        print(f"   ❌ {row}: 旧={a} 新={b}")
+    if mismatches:
+        sys.exit(1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Suumo爬虫性能基准测试')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    parse_parser = subparsers.add_parser('parse', help='列表页解析耗时（快照解析 vs 逐字段往返）')
+    parse_parser.add_argument('--html', required=True, help='保存的Suumo列表页HTML文件')
+    parse_parser.add_argument('--repeat', type=int, default=5, help='本地解析重复次数（默认：5）')
+    parse_parser.add_argument('--selenium', action='store_true', help='同时测量旧的逐字段WebDriver方式（需要Chrome）')
+    parse_parser.set_defaults(func=bench_parse)
+
+    dedup_parser = subparsers.add_parser('dedup', help='追加模式去重耗时（子串扫描 vs 索引）')
+    dedup_parser.add_argument('--existing', type=int, default=100000, help='模拟的已有记录数（默认：100000）')
+    dedup_parser.add_argument('--incoming', type=int, default=2000, help='模拟的新房源数（默认：2000）')
+    dedup_parser.add_argument('--legacy-sample', type=int, default=200,
+                              help='旧方式实测的新房源条数，其余按比例估算；0表示全部实测（默认：200）')
+    dedup_parser.add_argument('--seed', type=int, default=42, help='随机种子（默认：42）')
+    dedup_parser.set_defaults(func=bench_dedup)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == '__main__':
+    main()
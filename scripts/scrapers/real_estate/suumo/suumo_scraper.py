@@ -1,25 +1,35 @@
 #!/usr/bin/env python3
 """
 Suumo房地产信息抓取脚本
-使用Selenium抓取Suumo网站的房产信息
+优先使用HTTP会话+BeautifulSoup抓取Suumo列表页，被拦截时回退到Selenium
 支持直接上传到Google Sheets
 """
 
-from selenium import webdriver
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-from webdriver_manager.chrome import ChromeDriverManager
 import time
-import random
 import json
 import sys
 import os
 import re
 import argparse
+import bisect
+import math
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from urllib.parse import urljoin, urlparse, urlsplit, urlunsplit, parse_qsl, urlencode
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from bs4 import BeautifulSoup, NavigableString, Comment
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', '..', 'utils'))
+from driver_factory import create_driver, timed_get, DriverPool
+
+from suumo_store import SeenIndex, ListingStore, DEFAULT_DB_PATH, SHEET_HEADERS, build_sheet_row
 
 # Google Sheets相关导入
 try:
@@ -31,30 +41,70 @@ except ImportError:
     print("提示: 未安装gspread库，无法上传到Google Sheets", file=sys.stderr)
     print("安装方法: pip install gspread google-auth", file=sys.stderr)
 
+# 区域代码到URL路径映射
+AREA_CODE_TO_PATH = {
+    "13107": "sumida",    # 墨田区
+    "13108": "koto",      # 江东区
+    "13119": "itabashi",  # 板桥区
+    "13121": "adachi",    # 足立区
+    "13112": "setagaya",  # 世田谷区
+}
+
+AREA_NAME_MAP = {
+    "13107": "墨田区",
+    "13108": "江东区",
+    "13119": "板桥区",
+    "13121": "足立区",
+    "13112": "世田谷区",
+}
+
+TYPE_NAME_MAP = {
+    "mansion": "二手公寓",
+    "house": "二手一户建"
+}
+
+# 房屋类型在表格中的显示名称
+TYPE_DISPLAY_NAMES = {
+    'mansion': '公寓',
+    'house': '一户建'
+}
+
+# HTTP引擎配置
+HTTP_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
+    'Accept-Language': 'ja,en-US;q=0.9,en;q=0.8',
+}
+HTTP_TIMEOUT = 20
+HTTP_PAGE_WORKERS = 4  # 第2页之后并发抓取的线程数
+HTTP_PAGE_INTERVAL = 1.0  # 并发翻页时同一主机的最小请求间隔（秒）
+SELENIUM_PAGE_INTERVAL = 3.0  # Selenium翻页时同一主机的最小请求间隔（秒）
+PAGE_PARAMS = ('pn', 'page')  # Suumo分页参数（JJ012FC001使用pn）
+NEWEST_SORT_PARAMS = {'po': '1', 'pj': '2'}  # 增量模式使用的"新着順"排序参数
+BLOCKED_STATUS_CODES = (403, 429, 503)
+# 拦截页的<title>（只看标题：正常页面的<head>里也可能引用reCAPTCHA脚本）
+BLOCKED_TITLE_MARKERS = ('Access Denied', 'アクセスが集中', 'Request Rejected', 'Attention Required', '403 Forbidden')
+# 只出现在验证/拦截页上的元素（Cloudflare / PerimeterX 的验证表单）
+BLOCKED_PAGE_ELEMENT_RE = re.compile(r'id=["\'](?:challenge-form|challenge-running|px-captcha)["\']', re.IGNORECASE)
+TITLE_RE = re.compile(r'<title[^>]*>(.*?)</title>', re.IGNORECASE | re.DOTALL)
+
+# 列表页房源节点（公寓/一户建/租房）
+LIST_ITEM_SELECTOR = ".property_unit, .property_unit-content, .l-itemlist_item, .cassetteitem"
+
+# 近似浏览器渲染时会换行的块级元素
+BLOCK_TAGS = {
+    'address', 'article', 'aside', 'blockquote', 'dd', 'div', 'dl', 'dt',
+    'fieldset', 'figcaption', 'figure', 'footer', 'form', 'h1', 'h2', 'h3',
+    'h4', 'h5', 'h6', 'header', 'hr', 'li', 'main', 'nav', 'ol', 'p', 'pre',
+    'section', 'table', 'tbody', 'thead', 'tfoot', 'tr', 'ul', 'caption',
+}
+
 def setup_driver():
-    """配置并启动Chrome浏览器"""
+    """配置并启动Chrome浏览器（列表页只需要HTML，拦截图片/字体/媒体/统计脚本）"""
     try:
         print("正在启动浏览器...", file=sys.stderr)
-        
-        # 设置Chrome浏览器选项
-        chrome_options = Options()
-        chrome_options.add_argument("--no-sandbox")
-        chrome_options.add_argument("--disable-dev-shm-usage")
-        chrome_options.add_argument("--disable-blink-features=AutomationControlled")
-        # chrome_options.add_argument("--headless")  # 取消注释可以无头模式运行
-        chrome_options.add_argument("--disable-gpu")
-        chrome_options.add_argument("--window-size=1920,1080")
-        chrome_options.add_experimental_option("excludeSwitches", ["enable-automation"])
-        chrome_options.add_experimental_option('useAutomationExtension', False)
-        chrome_options.add_argument("--user-agent=Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36")
-        
-        # 设置ChromeDriver
-        service = Service(ChromeDriverManager().install())
-        driver = webdriver.Chrome(service=service, options=chrome_options)
-        
-        # 执行反检测脚本
-        driver.execute_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined})")
-        
+        # 保持原来的有界面模式（headless=False）
+        driver = create_driver(headless=False, label='Suumo浏览器')
         print("浏览器启动成功", file=sys.stderr)
         return driver
         
@@ -62,7 +112,553 @@ def setup_driver():
         print(f"启动浏览器失败: {e}", file=sys.stderr)
         return None
 
-def scrape_suumo_sale(station="錦糸町", area_code="13107", property_type="mansion", max_pages=3):
+class HostRateLimiter:
+    """
+    按主机限速（线程安全）
+    同一主机的两次请求之间至少间隔 min_interval 秒，多个线程共享同一个限速器
+    """
+    
+    def __init__(self, min_interval=2.0):
+        self.min_interval = min_interval
+        self._next_time = {}
+        self._lock = threading.Lock()
+    
+    def wait(self, url):
+        """在请求url之前调用，必要时阻塞到该主机允许的下一个时间点"""
+        host = urlparse(url).netloc
+        with self._lock:
+            now = time.monotonic()
+            scheduled = max(now, self._next_time.get(host, 0))
+            self._next_time[host] = scheduled + self.min_interval
+        if scheduled > now:
+            time.sleep(scheduled - now)
+
+def set_query_params(url, params):
+    """在URL上设置（覆盖）查询参数，保留其余参数（包括空值参数）"""
+    parts = urlsplit(url)
+    query = [(k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True) if k not in params]
+    query.extend((k, str(v)) for k, v in params.items())
+    return urlunsplit(parts._replace(query=urlencode(query)))
+
+def build_search_url(area_code, property_type, newest_first=False):
+    """
+    构建Suumo列表页URL
+    一户建和公寓使用完全不同的URL结构；newest_first=True时按新着顺排序（增量模式）
+    """
+    if property_type == "house":
+        # 一户建使用不同的URL路径
+        area_path = AREA_CODE_TO_PATH.get(area_code, "koto")
+        url = f"https://suumo.jp/chukoikkodate/tokyo/sc_{area_path}/"
+    else:
+        # 公寓使用原有的URL
+        base_url = "https://suumo.jp/jj/bukken/ichiran/JJ012FC001/"
+        params = f"?ar=030&bs=011&ta=13&sc={area_code}&kb=1&kt=9999999&tb=0&tt=9999999&hb=0&ht=9999999&ekTjCd=&ekTjNm=&tj=0&cnb=0&cn=9999999"
+        url = base_url + params
+    
+    if newest_first:
+        url = set_query_params(url, NEWEST_SORT_PARAMS)
+    return url
+
+def create_http_session(pool_size=4):
+    """创建带连接池和重试的HTTP会话（所有列表页复用同一个keep-alive连接）"""
+    session = requests.Session()
+    session.headers.update(HTTP_HEADERS)
+    retry = Retry(total=2, backoff_factor=1, status_forcelist=(500, 502, 504), allowed_methods=("GET",))
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+def is_blocked_response(response):
+    """判断HTTP响应是否被反爬拦截（需要回退到Selenium）"""
+    if response.status_code in BLOCKED_STATUS_CODES:
+        return True
+    text = response.text[:5000]
+    title = TITLE_RE.search(text)
+    if title and any(marker in title.group(1) for marker in BLOCKED_TITLE_MARKERS):
+        return True
+    return bool(BLOCKED_PAGE_ELEMENT_RE.search(response.text))
+
+def _collect_text(node, parts):
+    """递归收集节点文本，块级元素前后插入换行"""
+    for child in node.children:
+        if isinstance(child, Comment):
+            continue
+        if isinstance(child, NavigableString):
+            # 与浏览器渲染一致：源码中的空白折叠为一个空格（保留全角空格）
+            parts.append(re.sub(r'[ \t\n\r\f]+', ' ', str(child)))
+            continue
+        if child.name in ('script', 'style', 'noscript'):
+            continue
+        if child.name == 'br':
+            parts.append('\n')
+            continue
+        if child.name in ('td', 'th'):
+            parts.append(' ')
+        is_block = child.name in BLOCK_TAGS
+        if is_block:
+            parts.append('\n')
+        _collect_text(child, parts)
+        if is_block:
+            parts.append('\n')
+
+def element_text(node):
+    """
+    近似Selenium的element.text
+    块级元素换行、行内元素直接拼接（如 m<sup>2</sup> -> m2），并去掉空行
+    """
+    parts = []
+    _collect_text(node, parts)
+    lines = [line.strip() for line in ''.join(parts).split('\n')]
+    return '\n'.join(line for line in lines if line)
+
+def parse_sale_item(item, base_url, idx=0):
+    """
+    从一个property_unit节点中提取买房信息
+    字段与Selenium版本保持一致
+    """
+    property_data = {}
+    
+    # 提取物件名称和链接
+    title_element = item.select_one(".property_unit-title a")
+    if title_element is not None:
+        building_name = element_text(title_element)
+        href = title_element.get("href")
+        property_url = urljoin(base_url, href) if href else "N/A"
+        property_data["building_name"] = building_name
+        property_data["url"] = property_url
+        print(f"  {idx + 1}. {building_name}", file=sys.stderr)
+        print(f"     链接: {property_url}", file=sys.stderr)
+    else:
+        property_data["building_name"] = "N/A"
+        property_data["url"] = "N/A"
+    
+    # 提取价格 - 按文档顺序查找第一个包含"万円"的短文本元素
+    price = "N/A"
+    for elem in item.find_all(True):
+        if '万円' not in elem.get_text():
+            continue
+        text = element_text(elem)
+        if '万円' in text and len(text) < 20:  # 价格通常很短
+            # 清理价格格式
+            price = text.replace('\n', ' ').replace('販売価格', '').strip()
+            print(f"     价格: {price}", file=sys.stderr)
+            break
+    property_data["price"] = price
+    
+    lines = element_text(item).split('\n')
+    
+    # 提取地址和交通信息 - 从文本中提取
+    address = "N/A"
+    access = "N/A"
+    access_lines = []  # 收集所有可能的交通信息
+    
+    for line in lines:
+        # 地址通常包含区名
+        if '墨田区' in line or '区' in line:
+            if len(line) < 50 and address == "N/A":  # 地址不会太长，取第一个
+                address = line
+        
+        # 交通信息 - 更宽松的匹配条件
+        # 1. 包含"駅"和距离信息（徒歩/分/バス等）
+        if '駅' in line and ('歩' in line or '徒' in line or '分' in line or 'バス' in line):
+            if len(line) < 100:  # 交通信息不会太长
+                access_lines.append(line)
+        # 2. 包含"駅"和"利用"或"沿線"
+        elif '駅' in line and ('利用' in line or '沿線' in line or '路線' in line):
+            if len(line) < 100:
+                access_lines.append(line)
+        # 3. 包含"アクセス"关键词
+        elif 'アクセス' in line or '交通' in line:
+            if len(line) < 100 and len(line) > 5:
+                access_lines.append(line)
+    
+    # 过滤并组合交通信息
+    if access_lines:
+        # 过滤掉无用的占位符文本
+        filtered_access = []
+        for acc in access_lines[:3]:
+            # 跳过无用的标准文本
+            if acc in ['沿線・駅', '交通', 'アクセス']:
+                continue
+            # 跳过太短的
+            if len(acc) < 8:
+                continue
+            # 跳过标题（通常包含特殊符号和很长）
+            if '【' in acc or '◇' in acc or '○' in acc or '■' in acc or '～' in acc:
+                # 但是如果包含明确的駅和距离信息，保留
+                if ('駅' in acc and '徒' in acc) or ('駅' in acc and '分' in acc and '歩' in acc):
+                    filtered_access.append(acc)
+                continue
+            filtered_access.append(acc)
+        
+        if filtered_access:
+            access = ' / '.join(filtered_access)
+    
+    property_data["address"] = address
+    property_data["access"] = access
+    
+    if address != "N/A":
+        print(f"     地址: {address}", file=sys.stderr)
+    if access != "N/A":
+        print(f"     交通: {access}", file=sys.stderr)
+    
+    # 提取建筑信息（面积、户型、建造年份等）
+    details = {}
+    area = "N/A"
+    age = "N/A"
+    layout = "N/A"
+    
+    for line in lines:
+        # 提取面积（通常是XX.XXm²或XX.XX㎡）
+        if 'm²' in line or '㎡' in line or 'ｍ²' in line or 'm2' in line:
+            if len(line) < 30 and area == "N/A":  # 面积信息通常很短
+                area = line
+                details['専有面積'] = line
+        # 也检查带有数字+平米的格式
+        area_match = re.search(r'\d+\.?\d*[m㎡ｍ]', line)
+        if area_match and len(line) < 30 and area == "N/A":
+            area = line
+            details['専有面積'] = line
+        
+        # 提取户型（1LDK, 2DK, 3LDK等）
+        layout_match = re.search(r'[0-9１-９][SLDK]+', line)
+        if layout_match and len(line) < 20:
+            layout = layout_match.group()
+            details['間取り'] = layout
+        
+        # 提取建造年份（築XX年 或 19XX年/20XX年）
+        if '築' in line and '年' in line:
+            age = line
+            details['築年数'] = line
+        elif re.search(r'(19|20)\d{2}年', line) and len(line) < 30:
+            age = line
+            details['築年月'] = line
+    
+    # 尝试从表格中提取（如果有）
+    detail_table = item.select_one(".dottable")
+    if detail_table is not None:
+        for row in detail_table.find_all("tr"):
+            th_elem = row.find("th")
+            td_elem = row.find("td")
+            if th_elem is None or td_elem is None:
+                continue
+            th = element_text(th_elem)
+            td = element_text(td_elem)
+            details[th] = td
+            
+            # 更新主要字段
+            if '面積' in th:
+                area = td
+            if '間取' in th:
+                layout = td
+            if '築' in th or '建築' in th:
+                age = td
+    
+    # 显示提取到的信息
+    if idx < 3:
+        if area != "N/A":
+            print(f"     面积: {area}", file=sys.stderr)
+        if layout != "N/A":
+            print(f"     户型: {layout}", file=sys.stderr)
+        if age != "N/A":
+            print(f"     年限: {age}", file=sys.stderr)
+    
+    property_data["details"] = details
+    property_data["area"] = area
+    property_data["layout"] = layout
+    property_data["age"] = age
+    property_data["rooms"] = []  # 买房页面通常是整套，不需要rooms数组
+    
+    return property_data
+
+def _lines(text):
+    """按行拆分element_text的结果"""
+    return text.split('\n') if text else []
+
+def parse_rental_item(item, base_url):
+    """
+    从一个cassetteitem节点中提取租房信息
+    字段与Selenium版本保持一致
+    """
+    property_data = {}
+    
+    # 提取建筑名称和链接
+    title_element = item.select_one(".cassetteitem_content-title")
+    if title_element is not None:
+        property_data["building_name"] = element_text(title_element)
+        
+        # 提取链接 - 尝试多种方式：标题中的链接 / 第一个租房链接 / 详细按钮
+        link_element = title_element.find("a", href=True) or \
+                       item.select_one("a[href*='/chintai/']") or \
+                       item.select_one(".js-cassette_link")
+        href = link_element.get("href") if link_element is not None else None
+        property_data["url"] = urljoin(base_url, href) if href else "N/A"
+    else:
+        property_data["building_name"] = "N/A"
+        property_data["url"] = "N/A"
+        print(f"    提取标题和链接失败: 未找到标题元素", file=sys.stderr)
+    
+    # 提取地址、交通信息、建筑年份和结构
+    for key, selector in (("address", ".cassetteitem_detail-col1"),
+                          ("access", ".cassetteitem_detail-text"),
+                          ("building_info", ".cassetteitem_detail-col3")):
+        elem = item.select_one(selector)
+        property_data[key] = element_text(elem) if elem is not None else "N/A"
+    
+    # 提取发布日期/新着标记
+    publish_info = []
+    for label in item.select(".cassetteitem_other-checkbox label"):
+        label_text = element_text(label)
+        if label_text:
+            publish_info.append(label_text)
+            print(f"    标签: {label_text}", file=sys.stderr)
+    for elem in item.select(".ui-pct"):
+        elem_text = element_text(elem)
+        if '/' in elem_text or '月' in elem_text or '新着' in elem_text:
+            publish_info.append(elem_text)
+            print(f"    日期信息: {elem_text}", file=sys.stderr)
+    property_data["publish_info"] = ", ".join(publish_info) if publish_info else "N/A"
+    
+    # 提取房间信息（限制每个建筑最多3个房间）
+    # 列映射：列3=楼层，列4=租金/管理费，列5=押金/礼金，列6=户型/面积
+    rooms = []
+    for room_idx, room in enumerate(item.select("tbody tr")[:3]):
+        room_data = {}
+        cols = [element_text(col) for col in room.find_all("td")]
+        print(f"    房间 {room_idx + 1}: 找到 {len(cols)} 列数据", file=sys.stderr)
+        
+        if len(cols) > 2:
+            room_data["floor"] = cols[2]
+        for col_idx, keys in ((3, ("rent", "admin_fee")),
+                              (4, ("deposit", "key_money")),
+                              (5, ("layout", "area"))):
+            if len(cols) > col_idx:
+                for key, line in zip(keys, _lines(cols[col_idx]) or [""]):
+                    room_data[key] = line
+        
+        # 尝试提取发布日期（查找包含"新着"或日期格式的列）
+        for col_text in cols:
+            if '新着' in col_text or '/' in col_text or '月' in col_text:
+                room_data["publish_info"] = col_text
+                print(f"      发布信息: {col_text}", file=sys.stderr)
+                break
+        
+        if room_data:
+            rooms.append(room_data)
+    
+    property_data["rooms"] = rooms
+    return property_data
+
+def find_list_items(soup):
+    """按Selenium版本相同的优先级查找列表页中的房源节点"""
+    return soup.select(".property_unit") or \
+           soup.select(".property_unit-content") or \
+           soup.select(".l-itemlist_item") or \
+           soup.select(".cassetteitem")
+
+def parse_properties_from_html(html, base_url):
+    """
+    解析一个列表页的HTML快照，返回 (房源列表, soup)
+    买房页面（property_unit）和租房页面（cassetteitem）都在本地解析
+    """
+    soup = BeautifulSoup(html, "html.parser")
+    properties = []
+    for idx, item in enumerate(find_list_items(soup)):
+        try:
+            # 判断是买房还是租房页面
+            if "property_unit" in " ".join(item.get("class", [])):
+                property_data = parse_sale_item(item, base_url, idx)
+            else:
+                property_data = parse_rental_item(item, base_url)
+                print(f"  {idx + 1}. {property_data.get('building_name', 'N/A')}", file=sys.stderr)
+            properties.append(property_data)
+        except Exception as e:
+            print(f"提取房产 {idx + 1} 信息时出错: {e}", file=sys.stderr)
+    return properties, soup
+
+def find_next_page_url(soup, base_url):
+    """查找下一页链接（rel=next 或 文本为"次へ"的链接）"""
+    next_link = soup.select_one("a[rel='next']")
+    if next_link is None:
+        next_link = soup.find("a", string=lambda text: text and text.strip() == "次へ")
+    if next_link is None or not next_link.get("href"):
+        return None
+    return urljoin(base_url, next_link["href"])
+
+class BlockedPageError(Exception):
+    """HTTP请求被反爬拦截"""
+
+def find_last_page_number(soup, per_page=0):
+    """
+    从第1页读取总页数
+    优先使用分页链接中的最大页码，其次用"共N件"除以每页条数；都没有时返回None
+    """
+    numbers = []
+    for link in soup.select(".pagination a, .pagination-parts a, .pagination_set-nav a"):
+        text = link.get_text(strip=True)
+        if text.isdigit():
+            numbers.append(int(text))
+        for key, value in parse_qsl(urlsplit(link.get("href", "")).query):
+            if key in PAGE_PARAMS and value.isdigit():
+                numbers.append(int(value))
+    if numbers:
+        return max(max(numbers), 1)
+    
+    hit = soup.select_one(".pagination_set-hit")
+    if hit is not None and per_page:
+        count_match = re.search(r'[\d,]+', hit.get_text())
+        if count_match:
+            total_count = int(count_match.group().replace(',', ''))
+            return max(math.ceil(total_count / per_page), 1)
+    return None
+
+def detect_page_param(soup):
+    """从分页链接中识别页码参数名（pn 或 page），默认pn"""
+    for link in soup.select(".pagination a, .pagination-parts a, .pagination_set-nav a, a[rel='next']"):
+        for key, _ in parse_qsl(urlsplit(link.get("href", "")).query):
+            if key in PAGE_PARAMS:
+                return key
+    return PAGE_PARAMS[0]
+
+def build_page_url(url, page, page_param="pn"):
+    """在列表页URL上设置页码参数，直接定位第page页"""
+    return set_query_params(url, {page_param: page})
+
+def take_new_properties(page_properties, seen_index, page_number):
+    """
+    增量模式：只保留新的或内容有变化的房源
+    返回 (保留的房源, 是否停止翻页)；整页都是已知房源时停止
+    """
+    if seen_index is None:
+        return page_properties, False
+    new_properties = seen_index.filter_new(page_properties)
+    print(f"📇 增量模式: 第 {page_number} 页 {len(new_properties)}/{len(page_properties)} 个新的或有变化的房源", file=sys.stderr)
+    if not new_properties:
+        print(f"📇 第 {page_number} 页没有新房源，停止翻页", file=sys.stderr)
+    return new_properties, not new_properties
+
+def fetch_list_page(session, url, rate_limiter=None, page_number=1):
+    """请求并解析一个列表页，返回 (房源列表, soup, 最终URL)；被拦截时抛出BlockedPageError"""
+    if rate_limiter:
+        rate_limiter.wait(url)
+    response = session.get(url, timeout=HTTP_TIMEOUT)
+    
+    if is_blocked_response(response):
+        print(f"⚠️  HTTP请求被拦截（状态码 {response.status_code}）", file=sys.stderr)
+        raise BlockedPageError(f"HTTP请求被拦截: {response.status_code}")
+    response.raise_for_status()
+    
+    page_properties, soup = parse_properties_from_html(response.text, response.url)
+    if not page_properties:
+        print(f"⚠️  第 {page_number} 页未找到房源列表", file=sys.stderr)
+    print(f"第 {page_number} 页找到 {len(page_properties)} 个房产信息", file=sys.stderr)
+    return page_properties, soup, response.url
+
+def scrape_suumo_sale_http(station="錦糸町", area_code="13107", property_type="mansion", max_pages=3, session=None, rate_limiter=None,
+                           seen_index=None):
+    """
+    使用HTTP会话抓取Suumo售房列表页（不启动浏览器）
+    
+    列表页是服务端渲染的，直接请求HTML并用BeautifulSoup解析即可。
+    从第1页读取总页数后，直接用页码参数构建第2页之后的URL并在限速下并发抓取。
+    传入seen_index时为增量模式：按新着顺逐页抓取，遇到整页都是已知房源时停止。
+    如果被反爬拦截，返回 {"success": False, "blocked": True}，由调用方回退到Selenium。
+    """
+    own_session = session is None
+    if own_session:
+        session = create_http_session(pool_size=HTTP_PAGE_WORKERS)
+    rate_limiter = rate_limiter or HostRateLimiter(min_interval=HTTP_PAGE_INTERVAL)
+    properties = []
+    
+    try:
+        area_name = AREA_NAME_MAP.get(area_code, f"区域{area_code}")
+        type_name = TYPE_NAME_MAP.get(property_type, "二手公寓")
+        url = build_search_url(area_code, property_type, newest_first=seen_index is not None)
+        
+        print(f"搜索条件: {area_name}（{station}附近）- {type_name}", file=sys.stderr)
+        print(f"正在请求Suumo列表页（HTTP）: {url}", file=sys.stderr)
+        
+        page_properties, soup, first_url = fetch_list_page(session, url, rate_limiter)
+        last_page = find_last_page_number(soup, len(page_properties))
+        page_properties, stop_paging = take_new_properties(page_properties, seen_index, 1)
+        properties.extend(page_properties)
+        
+        if stop_paging or max_pages <= 1:
+            pass
+        elif last_page:
+            target_page = min(last_page, max_pages)
+            page_param = detect_page_param(soup)
+            page_urls = [build_page_url(first_url, n, page_param) for n in range(2, target_page + 1)]
+            print(f"共 {last_page} 页，抓取前 {target_page} 页", file=sys.stderr)
+            
+            if seen_index is not None:
+                # 增量模式需要逐页判断是否还有新房源，按顺序抓取
+                for page_number, page_url in enumerate(page_urls, start=2):
+                    page_properties, _, _ = fetch_list_page(session, page_url, rate_limiter, page_number)
+                    page_properties, stop_paging = take_new_properties(page_properties, seen_index, page_number)
+                    properties.extend(page_properties)
+                    if stop_paging:
+                        break
+            elif page_urls:
+                def fetch_page(item):
+                    # 单页失败只跳过该页；被拦截时才整体回退到Selenium
+                    page_number, page_url = item
+                    try:
+                        page_properties, _, _ = fetch_list_page(session, page_url, rate_limiter, page_number)
+                        return page_properties
+                    except BlockedPageError:
+                        raise
+                    except Exception as e:
+                        print(f"⚠️  第 {page_number} 页抓取失败，跳过: {e}", file=sys.stderr)
+                        return []
+
+                with ThreadPoolExecutor(max_workers=min(HTTP_PAGE_WORKERS, len(page_urls))) as executor:
+                    for page_properties in executor.map(fetch_page, enumerate(page_urls, start=2)):
+                        properties.extend(page_properties)
+        else:
+            # 读不到分页信息时，回退到逐页跟随"下一页"链接
+            page_number = 1
+            next_url = find_next_page_url(soup, first_url)
+            while next_url and page_number < max_pages:
+                page_number += 1
+                page_properties, soup, page_url = fetch_list_page(session, next_url, rate_limiter, page_number)
+                page_properties, stop_paging = take_new_properties(page_properties, seen_index, page_number)
+                properties.extend(page_properties)
+                if stop_paging:
+                    break
+                next_url = find_next_page_url(soup, page_url)
+        
+        return {
+            "success": True,
+            "data": {
+                "total_properties": len(properties),
+                "properties": properties,
+                "timestamp": datetime.now().isoformat()
+            }
+        }
+    
+    except BlockedPageError as e:
+        return {
+            "success": False,
+            "blocked": True,
+            "error": str(e),
+            "timestamp": datetime.now().isoformat()
+        }
+    except Exception as e:
+        print(f"HTTP抓取过程出错: {e}", file=sys.stderr)
+        return {
+            "success": False,
+            "error": str(e),
+            "timestamp": datetime.now().isoformat()
+        }
+    
+    finally:
+        if own_session:
+            session.close()
+
+def scrape_suumo_sale(station="錦糸町", area_code="13107", property_type="mansion", max_pages=3, engine="auto",
+                      session=None, driver_pool=None, rate_limiter=None, seen_index=None):
     """
     抓取Suumo售房信息 - 指定区域的买房信息
     
@@ -71,473 +667,105 @@ def scrape_suumo_sale(station="錦糸町", area_code="13107", property_type="man
         area_code: 区域代码（13107=墨田区, 13108=江东区）
         property_type: 房屋类型（mansion=公寓, house=一户建）
         max_pages: 最大抓取页数
+        engine: 抓取引擎（auto=优先HTTP、失败时回退Selenium, http=仅HTTP, selenium=仅Selenium）
+        session: 共享的HTTP会话（可选）
+        driver_pool: 共享的浏览器池（可选，不传则单独启动一个Chrome）
+        rate_limiter: 共享的按主机限速器（可选）
+        seen_index: 已见房源索引（可选，传入时为增量模式，只返回新的或有变化的房源）
+    """
+    if engine in ("auto", "http"):
+        result = scrape_suumo_sale_http(station=station, area_code=area_code, property_type=property_type,
+                                        max_pages=max_pages, session=session, rate_limiter=rate_limiter,
+                                        seen_index=seen_index)
+        if result.get("success") or engine == "http":
+            return result
+        print("⚠️  HTTP抓取失败，回退到Selenium...", file=sys.stderr)
+    
+    if driver_pool:
+        with driver_pool.acquire() as driver:
+            if not driver:
+                return {"success": False, "error": "浏览器启动失败", "timestamp": datetime.now().isoformat()}
+            return scrape_suumo_sale_selenium(station=station, area_code=area_code, property_type=property_type,
+                                              max_pages=max_pages, driver=driver, rate_limiter=rate_limiter,
+                                              seen_index=seen_index)
+    
+    return scrape_suumo_sale_selenium(station=station, area_code=area_code, property_type=property_type, max_pages=max_pages,
+                                      seen_index=seen_index)
+
+def scrape_suumo_sale_selenium(station="錦糸町", area_code="13107", property_type="mansion", max_pages=3,
+                               driver=None, rate_limiter=None, seen_index=None):
+    """
+    使用Selenium抓取Suumo售房信息（HTTP被拦截时的回退方案）
+    传入driver时复用该浏览器且不关闭它（由浏览器池管理）
     """
-    driver = None
+    own_driver = driver is None
     properties = []
     
     try:
-        driver = setup_driver()
+        if own_driver:
+            driver = setup_driver()
         if not driver:
             return {"success": False, "error": "浏览器启动失败"}
         
-        # 构建URL
-        # 一户建和公寓使用完全不同的URL结构
-        
-        # 区域代码到URL路径映射
-        area_code_to_path = {
-            "13107": "sumida",    # 墨田区
-            "13108": "koto",      # 江东区
-            "13119": "itabashi",  # 板桥区
-            "13121": "adachi",    # 足立区
-            "13112": "setagaya",  # 世田谷区
-        }
-        
-        area_name_map = {
-            "13107": "墨田区",
-            "13108": "江东区",
-            "13119": "板桥区",
-            "13121": "足立区",
-            "13112": "世田谷区",
-        }
-        
-        type_name_map = {
-            "mansion": "二手公寓",
-            "house": "二手一户建"
-        }
-        
-        area_path = area_code_to_path.get(area_code, "koto")
-        area_name = area_name_map.get(area_code, f"区域{area_code}")
-        type_name = type_name_map.get(property_type, "二手公寓")
-        
-        if property_type == "house":
-            # 一户建使用不同的URL路径
-            url = f"https://suumo.jp/chukoikkodate/tokyo/sc_{area_path}/"
-        else:
-            # 公寓使用原有的URL
-            base_url = "https://suumo.jp/jj/bukken/ichiran/JJ012FC001/"
-            params = f"?ar=030&bs=011&ta=13&sc={area_code}&kb=1&kt=9999999&tb=0&tt=9999999&hb=0&ht=9999999&ekTjCd=&ekTjNm=&tj=0&cnb=0&cn=9999999"
-            url = base_url + params
+        area_name = AREA_NAME_MAP.get(area_code, f"区域{area_code}")
+        type_name = TYPE_NAME_MAP.get(property_type, "二手公寓")
+        url = build_search_url(area_code, property_type, newest_first=seen_index is not None)
         
         print(f"搜索条件: {area_name}（{station}附近）- {type_name}", file=sys.stderr)
         
-        print(f"正在访问Suumo网站: {url}", file=sys.stderr)
-        driver.get(url)
-        
-        # 模拟人类行为 - 等待页面加载
-        time.sleep(random.uniform(2, 4))
+        rate_limiter = rate_limiter or HostRateLimiter(min_interval=SELENIUM_PAGE_INTERVAL)
         
-        # 循环抓取多页
-        for page in range(max_pages):
-            print(f"正在抓取第 {page + 1} 页...", file=sys.stderr)
+        # 第1页读取总页数，之后直接用页码参数定位各页（不再逐页点击"下一页"）
+        # 读不到分页信息时，回退到跟随"下一页"链接
+        page_urls = [url]
+        direct_paging = False
+        page = 0
+        while page < len(page_urls) and page < max_pages:
+            page_url = page_urls[page]
+            print(f"正在抓取第 {page + 1} 页: {page_url}", file=sys.stderr)
             
             try:
-                # 等待页面完全加载
-                print(f"等待页面加载...", file=sys.stderr)
-                time.sleep(random.uniform(3, 5))
+                rate_limiter.wait(page_url)
+                timed_get(driver, page_url, label=f'第{page + 1}页')
                 
-                # 等待房产列表加载（增加等待时间）
-                # 不同类型的房产使用不同的class名称
-                items = []
+                # 等待房产列表加载（公寓/一户建/租房页面使用不同的class名称）
                 try:
-                    # 尝试1: 公寓列表页（property_unit）
                     WebDriverWait(driver, 15).until(
-                        EC.presence_of_element_located((By.CLASS_NAME, "property_unit"))
+                        EC.presence_of_element_located((By.CSS_SELECTOR, LIST_ITEM_SELECTOR))
                     )
-                    print(f"页面加载完成（公寓列表页）", file=sys.stderr)
-                    items = driver.find_elements(By.CLASS_NAME, "property_unit")
+                    print(f"页面加载完成", file=sys.stderr)
                 except:
-                    try:
-                        # 尝试2: 一户建列表页（property_unit-content或其他）
-                        WebDriverWait(driver, 10).until(
-                            EC.presence_of_element_located((By.CSS_SELECTOR, ".property_unit-content, .dottable-fix, .l-itemlist_item"))
-                        )
-                        print(f"页面加载完成（一户建/其他页面）", file=sys.stderr)
-                        # 一户建可能使用不同的容器
-                        items = driver.find_elements(By.CSS_SELECTOR, ".property_unit-content") or \
-                                driver.find_elements(By.CLASS_NAME, "property_unit") or \
-                                driver.find_elements(By.CSS_SELECTOR, ".l-itemlist_item")
-                    except:
-                        try:
-                            # 尝试3: 租房页面
-                            WebDriverWait(driver, 10).until(
-                                EC.presence_of_element_located((By.CLASS_NAME, "cassetteitem"))
-                            )
-                            print(f"页面加载完成（租房页面）", file=sys.stderr)
-                            items = driver.find_elements(By.CLASS_NAME, "cassetteitem")
-                        except:
-                            print(f"⚠️  未找到房源列表，可能该地区没有此类房源", file=sys.stderr)
-                            items = []
+                    print(f"⚠️  未找到房源列表，可能该地区没有此类房源", file=sys.stderr)
                 
-                print(f"找到 {len(items)} 个房产信息", file=sys.stderr)
+                # 一次性获取页面快照，所有字段在本地解析（避免逐字段的WebDriver往返）
+                page_properties, soup = parse_properties_from_html(driver.page_source, driver.current_url)
+                print(f"找到 {len(page_properties)} 个房产信息", file=sys.stderr)
+                item_count = len(page_properties)
+                page_properties, stop_paging = take_new_properties(page_properties, seen_index, page + 1)
+                properties.extend(page_properties)
+                if stop_paging:
+                    break
                 
-                for idx, item in enumerate(items):
-                    try:
-                        property_data = {}
-                        
-                        # 判断是买房还是租房页面
-                        is_sale_page = "property_unit" in item.get_attribute("class")
-                        
-                        if is_sale_page:
-                            # 买房页面的数据提取逻辑
-                            # 提取物件名称和链接
-                            try:
-                                title_element = item.find_element(By.CSS_SELECTOR, ".property_unit-title a")
-                                building_name = title_element.text.strip()
-                                property_url = title_element.get_attribute("href")
-                                property_data["building_name"] = building_name
-                                property_data["url"] = property_url
-                                print(f"  {idx + 1}. {building_name}", file=sys.stderr)
-                                print(f"     链接: {property_url}", file=sys.stderr)
-                            except:
-                                property_data["building_name"] = "N/A"
-                                property_data["url"] = "N/A"
-                            
-                            # 提取价格 - 尝试多种方式
-                            price = "N/A"
-                            try:
-                                # 方法1: 查找包含"万円"的元素
-                                price_elements = item.find_elements(By.CSS_SELECTOR, "*")
-                                for elem in price_elements:
-                                    text = elem.text.strip()
-                                    if '万円' in text and len(text) < 20:  # 价格通常很短
-                                        # 清理价格格式
-                                        price = text.replace('\n', ' ').replace('販売価格', '').strip()
-                                        print(f"     价格: {price}", file=sys.stderr)
-                                        break
-                            except:
-                                pass
-                            property_data["price"] = price
-                            
-                            # 提取地址和交通信息 - 从文本中提取
-                            try:
-                                item_text = item.text
-                                lines = [line.strip() for line in item_text.split('\n') if line.strip()]
-                                
-                                address = "N/A"
-                                access = "N/A"
-                                access_lines = []  # 收集所有可能的交通信息
-                                
-                                for line in lines:
-                                    # 地址通常包含区名
-                                    if '墨田区' in line or '区' in line:
-                                        if len(line) < 50 and address == "N/A":  # 地址不会太长，取第一个
-                                            address = line
-                                    
-                                    # 交通信息 - 更宽松的匹配条件
-                                    # 1. 包含"駅"和距离信息（徒歩/分/バス等）
-                                    if '駅' in line and ('歩' in line or '徒' in line or '分' in line or 'バス' in line):
-                                        if len(line) < 100:  # 交通信息不会太长
-                                            access_lines.append(line)
-                                    # 2. 包含"駅"和"利用"或"沿線"
-                                    elif '駅' in line and ('利用' in line or '沿線' in line or '路線' in line):
-                                        if len(line) < 100:
-                                            access_lines.append(line)
-                                    # 3. 包含"アクセス"关键词
-                                    elif 'アクセス' in line or '交通' in line:
-                                        if len(line) < 100 and len(line) > 5:
-                                            access_lines.append(line)
-                                
-                                # 过滤并组合交通信息
-                                if access_lines:
-                                    # 过滤掉无用的占位符文本
-                                    filtered_access = []
-                                    for acc in access_lines[:3]:
-                                        # 跳过无用的标准文本
-                                        if acc in ['沿線・駅', '交通', 'アクセス']:
-                                            continue
-                                        # 跳过太短的
-                                        if len(acc) < 8:
-                                            continue
-                                        # 跳过标题（通常包含特殊符号和很长）
-                                        if '【' in acc or '◇' in acc or '○' in acc or '■' in acc or '～' in acc:
-                                            # 但是如果包含明确的駅和距离信息，保留
-                                            if ('駅' in acc and '徒' in acc) or ('駅' in acc and '分' in acc and '歩' in acc):
-                                                filtered_access.append(acc)
-                                            continue
-                                        filtered_access.append(acc)
-                                    
-                                    if filtered_access:
-                                        access = ' / '.join(filtered_access)
-                                
-                                property_data["address"] = address
-                                property_data["access"] = access
-                                
-                                if address != "N/A":
-                                    print(f"     地址: {address}", file=sys.stderr)
-                                if access != "N/A":
-                                    print(f"     交通: {access}", file=sys.stderr)
-                            except:
-                                property_data["address"] = "N/A"
-                                property_data["access"] = "N/A"
-                            
-                            # 提取建筑信息（面积、户型、建造年份等）
-                            details = {}
-                            area = "N/A"
-                            age = "N/A"
-                            layout = "N/A"
-                            
-                            try:
-                                # 从整个item的文本中提取信息
-                                item_text = item.text
-                                lines = [line.strip() for line in item_text.split('\n') if line.strip()]
-                                
-                                for line in lines:
-                                    # 提取面积（通常是XX.XXm²或XX.XX㎡）
-                                    if 'm²' in line or '㎡' in line or 'ｍ²' in line or 'm2' in line:
-                                        if len(line) < 30 and area == "N/A":  # 面积信息通常很短
-                                            area = line
-                                            details['専有面積'] = line
-                                    # 也检查带有数字+平米的格式
-                                    import re
-                                    area_match = re.search(r'\d+\.?\d*[m㎡ｍ]', line)
-                                    if area_match and len(line) < 30 and area == "N/A":
-                                        area = line
-                                        details['専有面積'] = line
-                                    
-                                    # 提取户型（1LDK, 2DK, 3LDK等）
-                                    import re
-                                    layout_match = re.search(r'[0-9１-９][SLDK]+', line)
-                                    if layout_match and len(line) < 20:
-                                        layout = layout_match.group()
-                                        details['間取り'] = layout
-                                    
-                                    # 提取建造年份（築XX年 或 19XX年/20XX年）
-                                    if '築' in line and '年' in line:
-                                        age = line
-                                        details['築年数'] = line
-                                    elif re.search(r'(19|20)\d{2}年', line) and len(line) < 30:
-                                        age = line
-                                        details['築年月'] = line
-                                
-                                # 尝试从表格中提取（如果有）
-                                try:
-                                    detail_table = item.find_element(By.CSS_SELECTOR, ".dottable")
-                                    rows = detail_table.find_elements(By.TAG_NAME, "tr")
-                                    for row in rows:
-                                        try:
-                                            th = row.find_element(By.TAG_NAME, "th").text.strip()
-                                            td = row.find_element(By.TAG_NAME, "td").text.strip()
-                                            details[th] = td
-                                            
-                                            # 更新主要字段
-                                            if '面積' in th:
-                                                area = td
-                                            if '間取' in th:
-                                                layout = td
-                                            if '築' in th or '建築' in th:
-                                                age = td
-                                        except:
-                                            pass
-                                except:
-                                    pass
-                                
-                                # 显示提取到的信息
-                                if idx < 3:
-                                    if area != "N/A":
-                                        print(f"     面积: {area}", file=sys.stderr)
-                                    if layout != "N/A":
-                                        print(f"     户型: {layout}", file=sys.stderr)
-                                    if age != "N/A":
-                                        print(f"     年限: {age}", file=sys.stderr)
-                                
-                            except Exception as e:
-                                print(f"     提取详细信息出错: {e}", file=sys.stderr)
-                            
-                            property_data["details"] = details
-                            property_data["area"] = area
-                            property_data["layout"] = layout
-                            property_data["age"] = age
-                            property_data["rooms"] = []  # 买房页面通常是整套，不需要rooms数组
-                            
-                        else:
-                            # 租房页面的数据提取逻辑（原有逻辑）
-                            # 提取建筑名称和链接
-                            try:
-                                title_element = item.find_element(By.CLASS_NAME, "cassetteitem_content-title")
-                                building_name = title_element.text
-                                property_data["building_name"] = building_name
-                                
-                                # 提取链接 - 尝试多种方式
-                                property_url = "N/A"
-                                try:
-                                    # 方法1: 从标题中查找链接
-                                    link_element = title_element.find_element(By.TAG_NAME, "a")
-                                    property_url = link_element.get_attribute("href")
-                                except:
-                                    try:
-                                        # 方法2: 从整个item中查找第一个链接
-                                        link_element = item.find_element(By.CSS_SELECTOR, "a[href*='/chintai/']")
-                                        property_url = link_element.get_attribute("href")
-                                    except:
-                                        try:
-                                            # 方法3: 查找详细按钮的链接
-                                            link_element = item.find_element(By.CSS_SELECTOR, ".js-cassette_link")
-                                            property_url = link_element.get_attribute("href")
-                                        except:
-                                            pass
-                                
-                                property_data["url"] = property_url
-                                # if property_url != "N/A":
-                                #     print(f"    链接: {property_url}", file=sys.stderr)
-                            except Exception as e:
-                                property_data["building_name"] = "N/A"
-                                property_data["url"] = "N/A"
-                                print(f"    提取标题和链接失败: {e}", file=sys.stderr)
-                            
-                            # 提取地址
-                            try:
-                                address = item.find_element(By.CLASS_NAME, "cassetteitem_detail-col1").text
-                                property_data["address"] = address
-                            except:
-                                property_data["address"] = "N/A"
-                            
-                            # 提取交通信息
-                            try:
-                                access = item.find_element(By.CLASS_NAME, "cassetteitem_detail-text").text
-                                property_data["access"] = access
-                            except:
-                                property_data["access"] = "N/A"
-                            
-                            # 提取建筑年份和结构
-                            try:
-                                detail_col3 = item.find_element(By.CLASS_NAME, "cassetteitem_detail-col3").text
-                                property_data["building_info"] = detail_col3
-                            except:
-                                property_data["building_info"] = "N/A"
-                            
-                            # 提取发布日期/新着标记
-                            publish_info = []
-                            try:
-                                # 查找"新着"标签
-                                new_labels = item.find_elements(By.CSS_SELECTOR, ".cassetteitem_other-checkbox label")
-                                for label in new_labels:
-                                    label_text = label.text.strip()
-                                    if label_text:
-                                        publish_info.append(label_text)
-                                        print(f"    标签: {label_text}", file=sys.stderr)
-                            except:
-                                pass
-                            
-                            try:
-                                # 查找包含日期的元素
-                                date_elements = item.find_elements(By.CSS_SELECTOR, ".ui-pct")
-                                for elem in date_elements:
-                                    elem_text = elem.text.strip()
-                                    if '/' in elem_text or '月' in elem_text or '新着' in elem_text:
-                                        publish_info.append(elem_text)
-                                        print(f"    日期信息: {elem_text}", file=sys.stderr)
-                            except:
-                                pass
-                            
-                            property_data["publish_info"] = ", ".join(publish_info) if publish_info else "N/A"
-                            
-                            # 提取房间信息（可能有多个房间）
-                            rooms = []
-                            try:
-                                # 尝试多种方式查找房间信息
-                                room_items = item.find_elements(By.CSS_SELECTOR, "tbody tr")
-                            
-                                # print(f"    找到 {len(room_items)} 个房间", file=sys.stderr)
-                                
-                                for room_idx, room in enumerate(room_items[:3]):  # 限制每个建筑最多3个房间
-                                    room_data = {}
-                                    
-                                    # 获取所有td元素
-                                    try:
-                                        cols = room.find_elements(By.TAG_NAME, "td")
-                                        print(f"    房间 {room_idx + 1}: 找到 {len(cols)} 列数据", file=sys.stderr)
-                                        
-                                        # # 调试：显示所有列的内容
-                                        # if room_idx == 0:  # 只显示第一个房间
-                                        #     for i, col in enumerate(cols):
-                                        #         print(f"      列{i}: {col.text.strip()[:50]}", file=sys.stderr)
-                                        
-                                        # 根据实际输出，列的映射如下：
-                                        # 列3: 楼层
-                                        if len(cols) > 2:
-                                            floor = cols[2].text.strip()
-                                            room_data["floor"] = floor
-                                            # print(f"      楼层: {floor}", file=sys.stderr)
-                                        
-                                        # 列4: 租金和管理费（多行）
-                                        if len(cols) > 3:
-                                            price_text = cols[3].text.strip()
-                                            lines = price_text.split('\n')
-                                            if len(lines) >= 1:
-                                                room_data["rent"] = lines[0]
-                                                # print(f"      租金: {lines[0]}", file=sys.stderr)
-                                            if len(lines) >= 2:
-                                                room_data["admin_fee"] = lines[1]
-                                                # print(f"      管理费: {lines[1]}", file=sys.stderr)
-                                        
-                                        # 列5: 押金/礼金（多行）
-                                        if len(cols) > 4:
-                                            deposit_text = cols[4].text.strip()
-                                            lines = deposit_text.split('\n')
-                                            if len(lines) >= 1:
-                                                room_data["deposit"] = lines[0]
-                                                # print(f"      押金: {lines[0]}", file=sys.stderr)
-                                            if len(lines) >= 2:
-                                                room_data["key_money"] = lines[1]
-                                                # print(f"      礼金: {lines[1]}", file=sys.stderr)
-                                        
-                                        # 列6: 户型和面积（多行）
-                                        if len(cols) > 5:
-                                            layout_text = cols[5].text.strip()
-                                            lines = layout_text.split('\n')
-                                            if len(lines) >= 1:
-                                                room_data["layout"] = lines[0]
-                                                # print(f"      户型: {lines[0]}", file=sys.stderr)
-                                            if len(lines) >= 2:
-                                                room_data["area"] = lines[1]
-                                                # print(f"      面积: {lines[1]}", file=sys.stderr)
-                                        
-                                        # 尝试提取发布日期（通常在最后一列）
-                                        try:
-                                            # 查找包含日期的列
-                                            for col in cols:
-                                                col_text = col.text.strip()
-                                                # 查找包含"新着"或日期格式的文本
-                                                if '新着' in col_text or '/' in col_text or '月' in col_text:
-                                                    room_data["publish_info"] = col_text
-                                                    print(f"      发布信息: {col_text}", file=sys.stderr)
-                                                    break
-                                        except:
-                                            pass
-                                            
-                                    except Exception as e:
-                                        print(f"      提取房间列数据出错: {e}", file=sys.stderr)
-                                    
-                                    if room_data:
-                                        rooms.append(room_data)
-                                        
-                            except Exception as e:
-                                print(f"提取房间信息时出错: {e}", file=sys.stderr)
-                            
-                            property_data["rooms"] = rooms
-                        
-                        properties.append(property_data)
-                        
-                        if not is_sale_page:
-                            print(f"  {idx + 1}. {property_data.get('building_name', 'N/A')}", file=sys.stderr)
-                        
-                    except Exception as e:
-                        print(f"提取房产 {idx + 1} 信息时出错: {e}", file=sys.stderr)
-                        continue
-                
-                # 如果需要抓取多页，查找并点击下一页按钮
-                if page < max_pages - 1:
-                    try:
-                        next_button = driver.find_element(By.CSS_SELECTOR, "a[rel='next']")
-                        next_button.click()
-                        time.sleep(random.uniform(2, 4))
-                    except:
-                        print("没有找到下一页按钮，停止抓取", file=sys.stderr)
+                if page == 0 and max_pages > 1:
+                    last_page = find_last_page_number(soup, item_count)
+                    if last_page:
+                        direct_paging = True
+                        page_param = detect_page_param(soup)
+                        target_page = min(last_page, max_pages)
+                        page_urls.extend(build_page_url(driver.current_url, n, page_param) for n in range(2, target_page + 1))
+                        print(f"共 {last_page} 页，抓取前 {target_page} 页", file=sys.stderr)
+                if not direct_paging and page < max_pages - 1:
+                    next_url = find_next_page_url(soup, driver.current_url)
+                    if not next_url:
+                        print("没有找到下一页链接，停止抓取", file=sys.stderr)
                         break
+                    page_urls.append(next_url)
                 
             except Exception as e:
                 print(f"抓取第 {page + 1} 页时出错: {e}", file=sys.stderr)
                 break
+            
+            page += 1
         
         # 返回结果
         result = {
@@ -560,16 +788,352 @@ def scrape_suumo_sale(station="錦糸町", area_code="13107", property_type="man
         }
     
     finally:
-        if driver:
+        if own_driver and driver:
             driver.quit()
             print("浏览器已关闭", file=sys.stderr)
 
-def extract_number(text):
-    """从文本中提取数字"""
-    if not text or text == 'N/A':
-        return 0
-    match = re.search(r'(\d+\.?\d*)', str(text))
-    return float(match.group(1)) if match else 0
+def scrape_suumo_multi(area_codes, property_types, max_pages=3, engine="auto", workers=2, min_interval=2.0, seen_index=None):
+    """
+    在一个进程内并行抓取多个（区域, 类型）组合
+    
+    所有任务共享一个HTTP会话、一个最多workers个Chrome的浏览器池和一个按主机限速器，
+    结果合并为一个结果集，每条房源带上 area_code / area_name / property_type 标签。
+    """
+    jobs = [(area_code, property_type) for area_code in area_codes for property_type in property_types]
+    print(f"共 {len(jobs)} 个抓取任务，并发数 {workers}，同一主机请求间隔 {min_interval} 秒", file=sys.stderr)
+    
+    # 每个任务内第2页之后还有 HTTP_PAGE_WORKERS 个线程并发翻页，连接池按总并发数分配
+    session = create_http_session(pool_size=max(workers, 1) * HTTP_PAGE_WORKERS)
+    driver_pool = DriverPool(max_size=workers, factory=setup_driver)
+    rate_limiter = HostRateLimiter(min_interval=min_interval)
+    
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = [
+                executor.submit(
+                    scrape_suumo_sale,
+                    station=AREA_NAME_MAP.get(area_code, f"区域{area_code}"),
+                    area_code=area_code,
+                    property_type=property_type,
+                    max_pages=max_pages,
+                    engine=engine,
+                    session=session,
+                    driver_pool=driver_pool,
+                    rate_limiter=rate_limiter,
+                    seen_index=seen_index,
+                )
+                for area_code, property_type in jobs
+            ]
+            job_results = []
+            for future in futures:
+                try:
+                    job_results.append(future.result())
+                except Exception as e:
+                    job_results.append({"success": False, "error": str(e)})
+    finally:
+        driver_pool.close()
+        session.close()
+    
+    # 按任务顺序合并结果，并标注区域和类型
+    properties = []
+    job_summaries = []
+    for (area_code, property_type), job_result in zip(jobs, job_results):
+        area_name = AREA_NAME_MAP.get(area_code, f"区域{area_code}")
+        job_properties = job_result.get("data", {}).get("properties", []) if job_result.get("success") else []
+        for prop in job_properties:
+            prop["area_code"] = area_code
+            prop["area_name"] = area_name
+            prop["property_type"] = property_type
+        properties.extend(job_properties)
+        
+        summary = {
+            "area_code": area_code,
+            "area_name": area_name,
+            "property_type": property_type,
+            "success": bool(job_result.get("success")),
+            "total_properties": len(job_properties),
+        }
+        if not job_result.get("success"):
+            summary["error"] = job_result.get("error", "未知错误")
+        job_summaries.append(summary)
+        
+        status = "✅" if summary["success"] else "❌"
+        print(f"{status} {area_name} - {TYPE_NAME_MAP.get(property_type, property_type)}: {len(job_properties)} 个房源", file=sys.stderr)
+    
+    return {
+        "success": any(job["success"] for job in job_summaries),
+        "data": {
+            "total_properties": len(properties),
+            "properties": properties,
+            "jobs": job_summaries,
+            "timestamp": datetime.now().isoformat()
+        }
+    }
+
+class DedupIndex:
+    """
+    表格去重索引
+    复合键（地区|类型|名称|URL）和URL用集合精确查找；名称+地区检查保持旧的子串语义
+    （"地区|类型|名称" 出现在某个已有复合键中即重复，如 'パーク' 会命中 'パークタワー'），
+    用排序后的复合键列表做二分前缀查找，不再逐条扫描已有记录
+    """
+    
+    def __init__(self):
+        self.composite_keys = set()
+        self.urls = set()
+        self.regions = set()
+        self._sorted_keys = []
+        self._sorted = True  # 批量加载时先追加，第一次查找前再统一排序
+    
+    def __len__(self):
+        return len(self.composite_keys)
+    
+    def add(self, region, prop_type, name, url, from_sheet=False):
+        """加入一条记录（from_sheet: 从表格读取的已有记录，空URL不计入URL集合，与旧逻辑一致）"""
+        key = f"{region}|{prop_type}|{name}|{url}"
+        if from_sheet:
+            self._sorted = False
+        if key not in self.composite_keys:
+            self.composite_keys.add(key)
+            if self._sorted:
+                bisect.insort(self._sorted_keys, key)
+            else:
+                self._sorted_keys.append(key)
+        self.regions.add(region)
+        if url != 'N/A' and (url or not from_sheet):
+            self.urls.add(url)
+    
+    def _has_prefix(self, prefix):
+        """是否有已有复合键以prefix开头"""
+        if not self._sorted:
+            self._sorted_keys.sort()
+            self._sorted = True
+        i = bisect.bisect_left(self._sorted_keys, prefix)
+        return i < len(self._sorted_keys) and self._sorted_keys[i].startswith(prefix)
+    
+    def check(self, region, prop_type, name, url):
+        """返回重复原因；不重复时返回None"""
+        # 检查1: 复合键去重（最严格）
+        if f"{region}|{prop_type}|{name}|{url}" in self.composite_keys:
+            return "完全重复记录"
+        # 检查2: URL去重（如果URL有效）
+        if url != 'N/A' and url in self.urls:
+            return "URL重复"
+        # 检查3: 名称+地区去重（防止同一房源不同URL）
+        # 子串从已有地区的末尾开始匹配：已有地区以region结尾（含相同），后面紧接 "|类型|名称" 前缀
+        if name != 'N/A':
+            for existing_region in self.regions:
+                if existing_region.endswith(region) and self._has_prefix(f"{existing_region}|{prop_type}|{name}"):
+                    return "名称+地区重复"
+        return None
+
+# 表格格式版本（修改下面的格式定义时递增，已格式化的表格会重新格式化一次）
+SHEET_FORMAT_VERSION = 2
+SHEET_FORMAT_METADATA_KEY = 'suumo_sheet_format'
+SHEET_COLUMN_COUNT = 14  # A-N
+
+# 列宽设置（像素）
+SHEET_COLUMN_WIDTHS = [
+    100,  # A: 地区
+    80,   # B: 类型
+    80,   # C: 序号
+    250,  # D: 物件名称
+    120,  # E: 价格
+    140,  # F: 单价
+    100,  # G: 面积
+    100,  # H: 户型
+    110,  # I: 建造年份
+    100,  # J: 房龄
+    200,  # K: 地址
+    250,  # L: 交通
+    150,  # M: 链接
+    150,  # N: 更新时间
+]
+
+# 数据列格式：(起始列, 结束列(不含), 单元格格式)
+SHEET_COLUMN_FORMATS = [
+    (0, 3, {'horizontalAlignment': 'CENTER'}),  # A-C: 地区/类型/序号 - 居中
+    (4, 5, {'numberFormat': {'type': 'NUMBER', 'pattern': '#,##0'}, 'horizontalAlignment': 'RIGHT'}),  # E: 价格 - 千位分隔符
+    (5, 6, {'numberFormat': {'type': 'NUMBER', 'pattern': '#,##0.00'}, 'horizontalAlignment': 'RIGHT'}),  # F: 单价 - 保留2位小数
+    (6, 7, {'numberFormat': {'type': 'NUMBER', 'pattern': '#0.00'}, 'horizontalAlignment': 'RIGHT'}),  # G: 面积 - 保留2位小数
+    (8, 10, {'horizontalAlignment': 'CENTER'}),  # I-J: 建造年份/房龄 - 居中
+]
+
+SHEET_HEADER_FORMAT = {
+    'textFormat': {'bold': True, 'fontSize': 11},
+    'backgroundColor': {'red': 0.2, 'green': 0.6, 'blue': 0.86},
+    'horizontalAlignment': 'CENTER',
+    'verticalAlignment': 'MIDDLE',
+}
+
+def _grid_range(sheet_id, start_row, end_row, start_col, end_col):
+    """构建GridRange（行列均从0开始，结束位置不含；end_row为None时到工作表末尾）"""
+    grid_range = {
+        'sheetId': sheet_id,
+        'startRowIndex': start_row,
+        'startColumnIndex': start_col,
+        'endColumnIndex': end_col,
+    }
+    if end_row is not None:
+        grid_range['endRowIndex'] = end_row
+    return grid_range
+
+def _repeat_cell_request(grid_range, cell_format):
+    """构建repeatCell请求（只覆盖cell_format中给出的字段）"""
+    return {
+        'repeatCell': {
+            'range': grid_range,
+            'cell': {'userEnteredFormat': cell_format},
+            'fields': f"userEnteredFormat({','.join(cell_format)})",
+        }
+    }
+
+def build_sheet_format_requests(sheet_id):
+    """
+    构建表格格式化所需的全部请求
+    包括：冻结首行、表头样式、数据列格式、列宽、边框
+    数据列格式和边框作用于整列（不限行数），追加的新行同样带格式，不需要按行数重新格式化
+    """
+    format_requests = [{
+        'updateSheetProperties': {
+            'properties': {'sheetId': sheet_id, 'gridProperties': {'frozenRowCount': 1}},
+            'fields': 'gridProperties.frozenRowCount',
+        }
+    }]
+    format_requests.append(_repeat_cell_request(_grid_range(sheet_id, 0, 1, 0, SHEET_COLUMN_COUNT), SHEET_HEADER_FORMAT))
+
+    for start_col, end_col, cell_format in SHEET_COLUMN_FORMATS:
+        format_requests.append(_repeat_cell_request(_grid_range(sheet_id, 1, None, start_col, end_col), cell_format))
+
+    for col_idx, width in enumerate(SHEET_COLUMN_WIDTHS):
+        format_requests.append({
+            'updateDimensionProperties': {
+                'range': {'sheetId': sheet_id, 'dimension': 'COLUMNS', 'startIndex': col_idx, 'endIndex': col_idx + 1},
+                'properties': {'pixelSize': width},
+                'fields': 'pixelSize',
+            }
+        })
+
+    border = {'style': 'SOLID'}
+    format_requests.append({
+        'updateBorders': {
+            'range': _grid_range(sheet_id, 0, None, 0, SHEET_COLUMN_COUNT),
+            'top': border, 'bottom': border, 'left': border, 'right': border,
+            'innerHorizontal': border, 'innerVertical': border,
+        }
+    })
+    return format_requests
+
+def _read_format_signature(spreadsheet, sheet_id):
+    """读取工作表上记录的格式签名，返回 (metadataId, 值)；没有时返回 (None, None)"""
+    metadata = spreadsheet.fetch_sheet_metadata(params={
+        'includeGridData': 'false',
+        'fields': 'sheets(properties.sheetId,developerMetadata)',
+    })
+    for sheet in metadata.get('sheets', []):
+        if sheet.get('properties', {}).get('sheetId') != sheet_id:
+            continue
+        for item in sheet.get('developerMetadata', []):
+            if item.get('metadataKey') == SHEET_FORMAT_METADATA_KEY:
+                return item.get('metadataId'), item.get('metadataValue')
+    return None, None
+
+def format_worksheet(spreadsheet, worksheet):
+    """
+    格式化工作表：所有格式请求合并为一次batch_update
+    工作表上用developer metadata记录格式版本，与当前版本相同时直接跳过（不发送任何写请求）；
+    格式按整列设置，与行数无关，追加模式下也能命中
+    
+    返回: True=已发送格式化请求，False=格式已是最新而跳过
+    """
+    metadata_id, signature = _read_format_signature(spreadsheet, worksheet.id)
+    new_signature = str(SHEET_FORMAT_VERSION)
+    if signature == new_signature:
+        print(f"格式已是最新（版本 {signature}），跳过格式化", file=sys.stderr)
+        return False
+
+    print(f"正在格式化表格...", file=sys.stderr)
+    format_requests = build_sheet_format_requests(worksheet.id)
+
+    # 同一次请求中写入新的格式签名
+    if metadata_id is not None:
+        format_requests.append({
+            'updateDeveloperMetadata': {
+                'dataFilters': [{'developerMetadataLookup': {'metadataId': metadata_id}}],
+                'developerMetadata': {'metadataValue': new_signature},
+                'fields': 'metadataValue',
+            }
+        })
+    else:
+        format_requests.append({
+            'createDeveloperMetadata': {
+                'developerMetadata': {
+                    'metadataKey': SHEET_FORMAT_METADATA_KEY,
+                    'metadataValue': new_signature,
+                    'location': {'sheetId': worksheet.id},
+                    'visibility': 'DOCUMENT',
+                }
+            }
+        })
+
+    spreadsheet.batch_update({'requests': format_requests})
+    print(f"   已发送 {len(format_requests)} 个格式请求（1次API调用）", file=sys.stderr)
+    return True
+
+# 追加模式读取的范围：表头 + 去重需要的列（地区A、类型B、物件名称D、详情链接M）
+DEDUP_READ_RANGES = ['A1:N1', 'A2:B', 'D2:D', 'M2:M']
+
+def read_dedup_columns(worksheet):
+    """
+    只读取表头和去重需要的列（一次batch_get），不下载整张表
+    
+    返回: (表头列表, [(地区, 类型, 物件名称, URL), ...])；工作表为空时表头为空列表
+    """
+    header_range, region_type_range, name_range, url_range = worksheet.batch_get(DEDUP_READ_RANGES)
+    header = header_range[0] if header_range else []
+
+    # 各范围末尾的空行会被API省略，按最长的列补齐
+    row_count = max(len(region_type_range), len(name_range), len(url_range))
+
+    def cell(values, row_idx, col_idx=0):
+        if row_idx < len(values) and col_idx < len(values[row_idx]):
+            return values[row_idx][col_idx]
+        return ""
+
+    rows = [
+        (cell(region_type_range, i, 0), cell(region_type_range, i, 1), cell(name_range, i), cell(url_range, i))
+        for i in range(row_count)
+    ]
+    return header, rows
+
+def open_worksheet(sheet_id, worksheet_name, credentials_file):
+    """认证并打开工作表（不存在时创建），返回 (spreadsheet, worksheet)"""
+    print(f"目标表格ID: {sheet_id}", file=sys.stderr)
+    print(f"目标工作表: {worksheet_name}", file=sys.stderr)
+    
+    # 认证Google Sheets API
+    SCOPES = [
+        'https://www.googleapis.com/auth/spreadsheets',
+        'https://www.googleapis.com/auth/drive'
+    ]
+    
+    print(f"正在认证...", file=sys.stderr)
+    creds = Credentials.from_service_account_file(credentials_file, scopes=SCOPES)
+    client = gspread.authorize(creds)
+    
+    # 打开表格
+    print(f"正在打开表格...", file=sys.stderr)
+    spreadsheet = client.open_by_key(sheet_id)
+    print(f"表格名称: {spreadsheet.title}", file=sys.stderr)
+    
+    # 查找或创建工作表
+    try:
+        worksheet = spreadsheet.worksheet(worksheet_name)
+        print(f"找到工作表: {worksheet_name}", file=sys.stderr)
+    except:
+        worksheet = spreadsheet.add_worksheet(title=worksheet_name, rows=1000, cols=20)
+        print(f"创建新工作表: {worksheet_name}", file=sys.stderr)
+    return spreadsheet, worksheet
 
 def upload_to_google_sheets(properties, sheet_id, station_name="", property_type_name="公寓", worksheet_name='房地产池', credentials_file=os.path.expanduser('~/Desktop/workspace/skynet/config/credentials.json'), append_mode=False):
     """
@@ -590,90 +1154,36 @@ def upload_to_google_sheets(properties, sheet_id, station_name="", property_type
     
     try:
         print(f"\n正在准备上传到Google Sheets...", file=sys.stderr)
-        print(f"目标表格ID: {sheet_id}", file=sys.stderr)
-        print(f"目标工作表: {worksheet_name}", file=sys.stderr)
-        
-        # 认证Google Sheets API
-        SCOPES = [
-            'https://www.googleapis.com/auth/spreadsheets',
-            'https://www.googleapis.com/auth/drive'
-        ]
-        
-        print(f"正在认证...", file=sys.stderr)
-        creds = Credentials.from_service_account_file(credentials_file, scopes=SCOPES)
-        client = gspread.authorize(creds)
-        
-        # 打开表格
-        print(f"正在打开表格...", file=sys.stderr)
-        spreadsheet = client.open_by_key(sheet_id)
-        print(f"表格名称: {spreadsheet.title}", file=sys.stderr)
-        
-        # 查找或创建工作表
-        try:
-            worksheet = spreadsheet.worksheet(worksheet_name)
-            print(f"找到工作表: {worksheet_name}", file=sys.stderr)
-        except:
-            worksheet = spreadsheet.add_worksheet(title=worksheet_name, rows=1000, cols=20)
-            print(f"创建新工作表: {worksheet_name}", file=sys.stderr)
+        spreadsheet, worksheet = open_worksheet(sheet_id, worksheet_name, credentials_file)
         
         # 准备表头（中文+emoji，更美观）
-        headers = [
-            '🗺️ 地区',
-            '🏘️ 类型',
-            '🔢 序号',
-            '🏢 物件名称', 
-            '💰 价格(万円)', 
-            '📊 单价(万円/m²)',
-            '📏 面积(m²)',
-            '🏠 户型', 
-            '📅 建造年份',
-            '⏳ 房龄(年)',
-            '📍 地址',
-            '🚇 交通',
-            '🔗 详情链接',
-            '⏰ 更新时间'
-        ]
+        headers = list(SHEET_HEADERS)
         
         # 准备数据行
         rows = []
         
         # 如果是追加模式，读取现有数据并检查重复
         start_row_num = 1  # 默认从第1行开始（覆盖模式）
-        existing_records = set()  # 用于去重的记录集合
-        existing_urls = set()  # 用于去重的URL集合
+        dedup_index = DedupIndex()  # 用于去重的索引（复合键/URL/名称+地区）
         
         if append_mode:
             try:
-                existing_data = worksheet.get_all_values()
-                if existing_data:
+                existing_header, existing_rows = read_dedup_columns(worksheet)
+                if existing_header:
                     # 检查表头是否匹配
-                    if existing_data[0] != headers:
+                    if existing_header != headers:
                         print(f"⚠️  表头不匹配，将覆盖现有数据", file=sys.stderr)
                         append_mode = False
                     else:
-                        start_row_num = len(existing_data) + 1
+                        start_row_num = len(existing_rows) + 2  # 表头 + 已有数据之后
                         print(f"📝 追加模式：将从第 {start_row_num} 行开始添加数据", file=sys.stderr)
                         
-                        # 提取现有数据用于去重
-                        # 地区列(0), 类型列(1), 物件名称列(3), URL列(12)
-                        for row in existing_data[1:]:  # 跳过表头
-                            if len(row) >= 13:  # 确保有足够的列
-                                # 创建唯一标识：地区+类型+物件名称+URL
-                                region = row[0] if len(row) > 0 else ""
-                                prop_type = row[1] if len(row) > 1 else ""
-                                name = row[3] if len(row) > 3 else ""
-                                url = row[12] if len(row) > 12 else ""
-                                
-                                # 创建复合键用于去重
-                                composite_key = f"{region}|{prop_type}|{name}|{url}"
-                                existing_records.add(composite_key)
-                                
-                                # 也单独收集URL用于快速检查
-                                if url and url != 'N/A':
-                                    existing_urls.add(url)
+                        # 创建唯一标识：地区+类型+物件名称+URL
+                        for region, prop_type, name, url in existing_rows:
+                            dedup_index.add(region, prop_type, name, url, from_sheet=True)
                         
-                        print(f"📋 已有 {len(existing_records)} 个房源记录，将自动去重", file=sys.stderr)
-                        print(f"📋 其中 {len(existing_urls)} 个有有效URL", file=sys.stderr)
+                        print(f"📋 已有 {len(dedup_index)} 个房源记录，将自动去重", file=sys.stderr)
+                        print(f"📋 其中 {len(dedup_index.urls)} 个有有效URL", file=sys.stderr)
                 else:
                     print(f"📝 工作表为空，将创建新表头", file=sys.stderr)
                     rows.append(headers)
@@ -694,118 +1204,27 @@ def upload_to_google_sheets(properties, sheet_id, station_name="", property_type
         added_count = 0
         
         for prop in properties:
-            # 创建当前记录的复合键
             prop_url = prop.get('url', 'N/A')
             prop_name = prop.get('building_name', 'N/A')
-            composite_key = f"{station_name}|{property_type_name}|{prop_name}|{prop_url}"
-            
-            # 多重去重检查
-            is_duplicate = False
-            duplicate_reason = ""
             
-            # 检查1: 复合键去重（最严格）
-            if composite_key in existing_records:
-                is_duplicate = True
-                duplicate_reason = "完全重复记录"
-            
-            # 检查2: URL去重（如果URL有效）
-            elif prop_url != 'N/A' and prop_url in existing_urls:
-                is_duplicate = True
-                duplicate_reason = "URL重复"
-            
-            # 检查3: 名称+地区去重（防止同一房源不同URL）
-            elif prop_name != 'N/A':
-                name_region_key = f"{station_name}|{property_type_name}|{prop_name}"
-                for existing_key in existing_records:
-                    if name_region_key in existing_key:
-                        is_duplicate = True
-                        duplicate_reason = "名称+地区重复"
-                        break
+            # 多重去重检查（复合键 / URL为集合查找，名称+地区为二分前缀查找）
+            duplicate_reason = dedup_index.check(station_name, property_type_name, prop_name, prop_url)
+            is_duplicate = duplicate_reason is not None
             
             if is_duplicate:
                 skipped_count += 1
                 print(f"⏭️  跳过重复房源: {prop_name[:30]}... ({duplicate_reason})", file=sys.stderr)
                 continue  # 跳过重复的房源
             
-            # 提取并清理价格（万円）
-            price_text = prop.get('price', '0')
-            price = 0
-            
-            # 处理億万円格式（如：1億980万円）
-            if '億' in price_text:
-                oku_match = re.search(r'(\d+)億', price_text)
-                man_match = re.search(r'(\d+,?\d*)万円', price_text)
-                
-                oku_value = 0
-                man_value = 0
-                
-                if oku_match:
-                    oku_value = int(oku_match.group(1)) * 10000  # 1億 = 10000万
-                if man_match:
-                    man_value = int(man_match.group(1).replace(',', ''))
-                
-                price = oku_value + man_value
-            else:
-                # 普通格式（如：980万円）
-                price_match = re.search(r'(\d+,?\d*)万円', price_text)
-                if price_match:
-                    price = int(price_match.group(1).replace(',', ''))
-                else:
-                    price = 0
-            
-            # 提取并清理面积（m²）
-            area_text = prop.get('area', '0')
-            area = extract_number(area_text)
-            
-            # 计算单价（万円/m²）
-            price_per_sqm = round(price / area, 2) if area > 0 and price > 0 else 0
-            
-            # 提取建造年份和房龄
-            age_text = prop.get('age', '')
-            year_match = re.search(r'(19|20)(\d{2})', age_text)
-            if year_match:
-                year = int(year_match.group(0))
-                age_years = 2025 - year
-            else:
-                year = ''
-                age_years = ''
-            
-            # 提取交通信息
-            access = prop.get('access', 'N/A')
-            if access and access != 'N/A':
-                # 清理交通信息，提取核心部分
-                access = access.strip()
-            
-            # 清理地址
-            address = prop.get('address', 'N/A')
-            if address and address != 'N/A':
-                address = address.strip()
-            
             # 组装数据行（添加地区列和类型列）
             current_idx = start_idx + added_count
-            row = [
-                station_name if station_name else 'N/A',  # 地区
-                property_type_name,  # 类型（公寓/一户建）
-                current_idx,  # 序号
-                prop.get('building_name', 'N/A'),
-                price if price > 0 else '',
-                price_per_sqm if price_per_sqm > 0 else '',
-                f"{area:.2f}" if area > 0 else '',
-                prop.get('layout', 'N/A'),
-                year if year else '',
-                age_years if age_years else '',
-                address,
-                access,
-                prop.get('url', 'N/A'),
-                datetime.now().strftime('%Y-%m-%d %H:%M')
-            ]
+            row = build_sheet_row(prop, station_name, property_type_name, current_idx,
+                                  datetime.now().strftime('%Y-%m-%d %H:%M'))
             rows.append(row)
             added_count += 1
             
-            # 更新去重集合，防止本次批量添加中的重复
-            existing_records.add(composite_key)
-            if prop_url != 'N/A':
-                existing_urls.add(prop_url)
+            # 更新去重索引，防止本次批量添加中的重复
+            dedup_index.add(station_name, property_type_name, prop_name, prop_url)
         
         # 写入数据
         if added_count == 0 and append_mode:
@@ -814,10 +1233,10 @@ def upload_to_google_sheets(properties, sheet_id, station_name="", property_type
             return True
         
         if append_mode and start_row_num > 1:
-            # 追加模式：只写入新数据
+            # 追加模式：只写入新数据（values.append，由API插入到表格末尾）
             print(f"正在追加数据（从第{start_row_num}行开始，共{added_count}个新房源）...", file=sys.stderr)
-            range_name = f'A{start_row_num}'
-            worksheet.update(values=rows, range_name=range_name, value_input_option='USER_ENTERED')
+            worksheet.append_rows(rows, value_input_option='USER_ENTERED',
+                                  insert_data_option='INSERT_ROWS', table_range='A1')
         else:
             # 覆盖模式：清空并重写
             print(f"正在清空工作表...", file=sys.stderr)
@@ -825,121 +1244,13 @@ def upload_to_google_sheets(properties, sheet_id, station_name="", property_type
             print(f"正在写入数据...", file=sys.stderr)
             worksheet.update(values=rows, range_name='A1', value_input_option='USER_ENTERED')
         
-        # 格式化表格
-        print(f"正在格式化表格...", file=sys.stderr)
-        
-        # 1. 冻结首行（表头）
-        worksheet.freeze(rows=1)
-        
-        # 2. 设置表头样式（粗体、背景色）
-        worksheet.format('A1:N1', {
-            'textFormat': {
-                'bold': True,
-                'fontSize': 11
-            },
-            'backgroundColor': {
-                'red': 0.2,
-                'green': 0.6,
-                'blue': 0.86
-            },
-            'horizontalAlignment': 'CENTER',
-            'verticalAlignment': 'MIDDLE'
-        })
-        
-        # 3. 设置数字列格式
-        total_rows = start_row_num + len(rows) - 1 if append_mode else len(rows) + 1
-        if total_rows > 1:
-            # 地区列 - 居中
-            worksheet.format(f'A2:A{total_rows}', {
-                'horizontalAlignment': 'CENTER'
-            })
-            
-            # 类型列 - 居中
-            worksheet.format(f'B2:B{total_rows}', {
-                'horizontalAlignment': 'CENTER'
-            })
-            
-            # 序号列 - 居中
-            worksheet.format(f'C2:C{total_rows}', {
-                'horizontalAlignment': 'CENTER'
-            })
-            
-            # 价格列（万円）- 千位分隔符
-            worksheet.format(f'E2:E{total_rows}', {
-                'numberFormat': {'type': 'NUMBER', 'pattern': '#,##0'},
-                'horizontalAlignment': 'RIGHT'
-            })
-            
-            # 单价列（万円/m²）- 保留2位小数
-            worksheet.format(f'F2:F{total_rows}', {
-                'numberFormat': {'type': 'NUMBER', 'pattern': '#,##0.00'},
-                'horizontalAlignment': 'RIGHT'
-            })
-            
-            # 面积列 - 保留2位小数
-            worksheet.format(f'G2:G{total_rows}', {
-                'numberFormat': {'type': 'NUMBER', 'pattern': '#0.00'},
-                'horizontalAlignment': 'RIGHT'
-            })
-            
-            # 建造年份和房龄 - 整数
-            worksheet.format(f'I2:J{total_rows}', {
-                'horizontalAlignment': 'CENTER'
-            })
-        
-        # 4. 设置列宽（使用batch_update API）
+        # 格式化表格（所有格式合并为一次batch_update）
         try:
-            requests = []
-            # 列宽设置（像素）
-            column_widths = [
-                (0, 100),  # A: 地区
-                (1, 80),   # B: 类型
-                (2, 80),   # C: 序号
-                (3, 250),  # D: 物件名称
-                (4, 120),  # E: 价格
-                (5, 140),  # F: 单价
-                (6, 100),  # G: 面积
-                (7, 100),  # H: 户型
-                (8, 110),  # I: 建造年份
-                (9, 100),  # J: 房龄
-                (10, 200), # K: 地址
-                (11, 250), # L: 交通
-                (12, 150), # M: 链接
-                (13, 150), # N: 更新时间
-            ]
-            
-            for col_idx, width in column_widths:
-                requests.append({
-                    "updateDimensionProperties": {
-                        "range": {
-                            "sheetId": worksheet.id,
-                            "dimension": "COLUMNS",
-                            "startIndex": col_idx,
-                            "endIndex": col_idx + 1
-                        },
-                        "properties": {
-                            "pixelSize": width
-                        },
-                        "fields": "pixelSize"
-                    }
-                })
-            
-            spreadsheet.batch_update({"requests": requests})
+            format_worksheet(spreadsheet, worksheet)
         except Exception as e:
-            print(f"   ⚠️  设置列宽时出现警告: {e}", file=sys.stderr)
+            print(f"   ⚠️  格式化表格时出现警告: {e}", file=sys.stderr)
             print(f"   （不影响数据，表格仍可正常使用）", file=sys.stderr)
         
-        # 5. 添加边框（所有数据）
-        if total_rows > 1:
-            worksheet.format(f'A1:N{total_rows}', {
-                'borders': {
-                    'top': {'style': 'SOLID', 'width': 1},
-                    'bottom': {'style': 'SOLID', 'width': 1},
-                    'left': {'style': 'SOLID', 'width': 1},
-                    'right': {'style': 'SOLID', 'width': 1}
-                }
-            })
-        
         print(f"\n✅ 上传成功！", file=sys.stderr)
         print(f"📊 已添加 {added_count} 个新房源", file=sys.stderr)
         if skipped_count > 0:
@@ -964,6 +1275,44 @@ def upload_to_google_sheets(properties, sheet_id, station_name="", property_type
         traceback.print_exc(file=sys.stderr)
         return False
 
+def upload_store_projection(store, sheet_id, worksheet_name='房地产池', credentials_file=os.path.expanduser('~/Desktop/workspace/skynet/config/credentials.json')):
+    """
+    用本地房源库重写整张表格（表格只是房源库的投影）
+    每个房源只有一行（以URL为键），价格和更新时间为最近一次抓取的值
+    """
+    if not GSHEETS_AVAILABLE:
+        print("❌ 无法上传到Google Sheets: 缺少必要的库", file=sys.stderr)
+        return False
+    
+    try:
+        headers, data_rows = store.sheet_rows()
+        print(f"\n正在用房源库重写表格（{len(data_rows)} 个房源）...", file=sys.stderr)
+        spreadsheet, worksheet = open_worksheet(sheet_id, worksheet_name, credentials_file)
+        
+        rows = [headers] + data_rows
+        print(f"正在清空工作表...", file=sys.stderr)
+        worksheet.clear()
+        print(f"正在写入数据...", file=sys.stderr)
+        worksheet.update(values=rows, range_name='A1', value_input_option='USER_ENTERED')
+        
+        try:
+            format_worksheet(spreadsheet, worksheet)
+        except Exception as e:
+            print(f"   ⚠️  格式化表格时出现警告: {e}", file=sys.stderr)
+            print(f"   （不影响数据，表格仍可正常使用）", file=sys.stderr)
+        
+        print(f"\n✅ 上传成功！", file=sys.stderr)
+        print(f"🔗 表格链接: {spreadsheet.url}", file=sys.stderr)
+        return True
+    except FileNotFoundError:
+        print(f"\n❌ 找不到凭证文件: {credentials_file}", file=sys.stderr)
+        return False
+    except Exception as e:
+        print(f"\n❌ 上传到Google Sheets失败: {e}", file=sys.stderr)
+        import traceback
+        traceback.print_exc(file=sys.stderr)
+        return False
+
 def main():
     """主函数 - 抓取指定地区的买房信息"""
     parser = argparse.ArgumentParser(description='抓取Suumo房产信息并上传到Google Sheets')
@@ -985,22 +1334,77 @@ def main():
                        help='Google API凭证文件路径（默认：config/credentials.json）')
     parser.add_argument('--max-pages', type=int, default=3,
                        help='最大抓取页数（默认：3）')
+    parser.add_argument('--engine', default='auto', choices=['auto', 'http', 'selenium'],
+                       help='抓取引擎（auto=优先HTTP、被拦截时回退Selenium，默认：auto）')
+    parser.add_argument('--area-codes',
+                       help='多区域模式：逗号分隔的区域代码（如：13107,13108,13119）')
+    parser.add_argument('--types',
+                       help='多区域模式：逗号分隔的房屋类型（如：mansion,house）')
+    parser.add_argument('--workers', type=int, default=2,
+                       help='多区域模式：并发任务数/浏览器池大小（默认：2）')
+    parser.add_argument('--min-interval', type=float, default=2.0,
+                       help='多区域模式：同一主机两次请求的最小间隔秒数（默认：2.0）')
+    parser.add_argument('--incremental', action='store_true',
+                       help='增量模式：按新着顺抓取，整页都是已知房源时停止，只输出新的或有变化的房源')
+    parser.add_argument('--seen-db', default=DEFAULT_DB_PATH,
+                       help='增量模式使用的SQLite房源索引（默认：data/suumo.db）')
+    parser.add_argument('--store-db', default=DEFAULT_DB_PATH,
+                       help='本地房源库（房源主数据+价格历史，默认：data/suumo.db）')
+    parser.add_argument('--no-store', action='store_true',
+                       help='不写入本地房源库')
+    parser.add_argument('--sheet-from-store', action='store_true',
+                       help='上传时用本地房源库重写整张表格（代替按本次结果追加/覆盖）')
     parser.add_argument('--output', '-o',
                        help='保存JSON到文件（可选）')
     
     args = parser.parse_args()
+    if args.sheet_from_store and args.no_store:
+        parser.error("--sheet-from-store 需要本地房源库，不能与 --no-store 同时使用")
     
-    # 房屋类型名称映射
-    type_display_names = {
-        'mansion': '公寓',
-        'house': '一户建'
-    }
-    property_type_display = type_display_names.get(args.type, '公寓')
+    property_type_display = TYPE_DISPLAY_NAMES.get(args.type, '公寓')
+    multi_mode = bool(args.area_codes or args.types)
+    seen_index = SeenIndex(args.seen_db) if args.incremental else None
+    if args.incremental and args.upload and not args.append:
+        # 增量结果只包含新房源，覆盖写入会清掉表格中的旧数据
+        print("📇 增量模式下上传自动使用追加模式", file=sys.stderr)
+        args.append = True
+    upload_failed = False
     
-    print(f"开始抓取{args.station}附近的买房信息（{property_type_display}）...", file=sys.stderr)
+    if multi_mode:
+        area_codes = [code.strip() for code in (args.area_codes or args.area_code).split(',') if code.strip()]
+        property_types = [t.strip() for t in (args.types or args.type).split(',') if t.strip()]
+        invalid_types = [t for t in property_types if t not in TYPE_DISPLAY_NAMES]
+        if invalid_types:
+            parser.error(f"不支持的房屋类型: {', '.join(invalid_types)}（可选：mansion, house）")
+        
+        print(f"开始多区域抓取: 区域 {', '.join(area_codes)} × 类型 {', '.join(property_types)}", file=sys.stderr)
+        result = scrape_suumo_multi(area_codes, property_types, max_pages=args.max_pages, engine=args.engine,
+                                    workers=max(args.workers, 1), min_interval=args.min_interval, seen_index=seen_index)
+    else:
+        print(f"开始抓取{args.station}附近的买房信息（{property_type_display}）...", file=sys.stderr)
+        
+        # 抓取指定车站附近的售房信息
+        result = scrape_suumo_sale(station=args.station, area_code=args.area_code, property_type=args.type, max_pages=args.max_pages, engine=args.engine,
+                                   seen_index=seen_index)
     
-    # 抓取指定车站附近的售房信息
-    result = scrape_suumo_sale(station=args.station, area_code=args.area_code, property_type=args.type, max_pages=args.max_pages)
+    # 写入本地房源库（系统记录；表格由它投影生成）
+    listing_store = None
+    if not args.no_store and result.get("success"):
+        listing_store = ListingStore(args.store_db)
+        properties = result['data']['properties']
+        if multi_mode:
+            for job in result['data']['jobs']:
+                if job['success']:
+                    listing_store.record(
+                        [p for p in properties
+                         if p.get('area_code') == job['area_code'] and p.get('property_type') == job['property_type']],
+                        region=job['area_name'], type_name=TYPE_DISPLAY_NAMES.get(job['property_type'], '公寓'),
+                        area_code=job['area_code'], property_type=job['property_type'])
+        else:
+            # 与多区域模式一致，区域记录区名而不是车站名
+            listing_store.record(properties, region=AREA_NAME_MAP.get(args.area_code, f"区域{args.area_code}"),
+                                 type_name=property_type_display,
+                                 area_code=args.area_code, property_type=args.type)
     
     # 保存JSON到文件（如果指定）
     if args.output:
@@ -1053,16 +1457,40 @@ def main():
         if args.upload:
             print("\n" + "="*60, file=sys.stderr)
             properties = result['data']['properties']
-            upload_success = upload_to_google_sheets(
-                properties=properties,
-                sheet_id=args.sheet_id,
-                station_name=args.station,
-                property_type_name=property_type_display,
-                worksheet_name=args.worksheet,
-                credentials_file=args.credentials,
-                append_mode=args.append
-            )
+            if args.sheet_from_store:
+                upload_success = upload_store_projection(
+                    listing_store,
+                    sheet_id=args.sheet_id,
+                    worksheet_name=args.worksheet,
+                    credentials_file=args.credentials
+                )
+            elif multi_mode:
+                # 按（区域, 类型）分组上传；第一组遵循--append，之后的组一律追加
+                upload_success = True
+                for job_idx, job in enumerate(job for job in result['data']['jobs'] if job['success']):
+                    job_properties = [p for p in properties
+                                      if p.get('area_code') == job['area_code'] and p.get('property_type') == job['property_type']]
+                    upload_success = upload_to_google_sheets(
+                        properties=job_properties,
+                        sheet_id=args.sheet_id,
+                        station_name=job['area_name'],
+                        property_type_name=TYPE_DISPLAY_NAMES.get(job['property_type'], '公寓'),
+                        worksheet_name=args.worksheet,
+                        credentials_file=args.credentials,
+                        append_mode=args.append or job_idx > 0
+                    ) and upload_success
+            else:
+                upload_success = upload_to_google_sheets(
+                    properties=properties,
+                    sheet_id=args.sheet_id,
+                    station_name=args.station,
+                    property_type_name=property_type_display,
+                    worksheet_name=args.worksheet,
+                    credentials_file=args.credentials,
+                    append_mode=args.append
+                )
             
+            upload_failed = not upload_success
             if not upload_success:
                 print("\n⚠️  数据已抓取但未能上传到Google Sheets", file=sys.stderr)
                 print("   可以使用以下命令重试上传:", file=sys.stderr)
@@ -1074,6 +1502,15 @@ def main():
     # 输出JSON格式结果到stdout（如果没有指定输出文件）
     if not args.output:
         print(json.dumps(result, ensure_ascii=False, indent=2))
+    
+    if listing_store:
+        listing_store.close()
+    
+    # 增量模式：下游处理完成后再把本次房源记入索引（上传失败时不记录，下次会重新输出）
+    if seen_index:
+        if result.get("success") and not upload_failed:
+            seen_index.mark_seen(result['data']['properties'], area_code=args.area_code, property_type=args.type)
+        seen_index.close()
 
 if __name__ == "__main__":
     main()
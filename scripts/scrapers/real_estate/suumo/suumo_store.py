@@ -0,0 +1,434 @@
+#!/usr/bin/env python3
+"""
+Suumo房源本地存储
+- SeenIndex: 记录已见过的房源URL和内容哈希，用于增量抓取
+- ListingStore: 房源主数据 + 价格历史（以URL为键），Google Sheets表格由它投影生成
+
+用法（本地查询）:
+    python3 suumo_store.py price-drops --region 墨田区 --days 7
+    python3 suumo_store.py history https://suumo.jp/ms/chuko/tokyo/sc_sumida/nc_12345678/
+    python3 suumo_store.py stats
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import sys
+import threading
+from datetime import datetime, timedelta
+
+# 默认数据库位置：项目根目录下的 data/suumo.db
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', '..', '..'))
+DEFAULT_DB_PATH = os.path.join(PROJECT_ROOT, 'data', 'suumo.db')
+
+# 参与内容哈希的字段（任一字段变化即视为房源有更新）
+HASH_FIELDS = ('building_name', 'price', 'area', 'layout', 'age', 'address', 'access')
+
+
+def content_hash(prop):
+    """计算房源内容哈希"""
+    payload = json.dumps([prop.get(field, 'N/A') for field in HASH_FIELDS], ensure_ascii=False)
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+
+class SeenIndex:
+    """
+    已见房源索引（SQLite）
+    线程安全，多区域并行抓取时可以共享同一个实例
+    """
+
+    def __init__(self, db_path=DEFAULT_DB_PATH):
+        self.db_path = db_path
+        os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS seen_listings (
+                url TEXT PRIMARY KEY,
+                content_hash TEXT NOT NULL,
+                area_code TEXT,
+                property_type TEXT,
+                first_seen TEXT NOT NULL,
+                last_seen TEXT NOT NULL
+            )
+        """)
+        self.conn.commit()
+
+    def filter_new(self, properties):
+        """返回新的或内容有变化的房源（不写入索引）"""
+        urls = [p.get('url') for p in properties if p.get('url') and p.get('url') != 'N/A']
+        known = {}
+        with self._lock:
+            # SQLite单条语句的参数个数有限，分批查询
+            for i in range(0, len(urls), 500):
+                chunk = urls[i:i + 500]
+                placeholders = ','.join('?' * len(chunk))
+                rows = self.conn.execute(
+                    f"SELECT url, content_hash FROM seen_listings WHERE url IN ({placeholders})", chunk
+                ).fetchall()
+                known.update(rows)
+
+        new_properties = []
+        for prop in properties:
+            url = prop.get('url')
+            if not url or url == 'N/A' or known.get(url) != content_hash(prop):
+                new_properties.append(prop)
+        return new_properties
+
+    def mark_seen(self, properties, area_code=None, property_type=None):
+        """把房源写入索引（已存在的更新哈希和最后见到时间）"""
+        now = datetime.now().isoformat(timespec='seconds')
+        rows = [
+            (p['url'], content_hash(p), p.get('area_code', area_code), p.get('property_type', property_type), now, now)
+            for p in properties if p.get('url') and p.get('url') != 'N/A'
+        ]
+        with self._lock:
+            self.conn.executemany("""
+                INSERT INTO seen_listings (url, content_hash, area_code, property_type, first_seen, last_seen)
+                VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT(url) DO UPDATE SET
+                    content_hash = excluded.content_hash,
+                    last_seen = excluded.last_seen
+            """, rows)
+            self.conn.commit()
+        print(f"📇 已更新房源索引: {len(rows)} 条（{self.db_path}）", file=sys.stderr)
+        return len(rows)
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
+
+
+# Google Sheets表格的表头（中文+emoji）
+SHEET_HEADERS = [
+    '🗺️ 地区',
+    '🏘️ 类型',
+    '🔢 序号',
+    '🏢 物件名称',
+    '💰 价格(万円)',
+    '📊 单价(万円/m²)',
+    '📏 面积(m²)',
+    '🏠 户型',
+    '📅 建造年份',
+    '⏳ 房龄(年)',
+    '📍 地址',
+    '🚇 交通',
+    '🔗 详情链接',
+    '⏰ 更新时间'
+]
+
+
+def parse_price_man(price_text):
+    """把价格文本解析为万円整数（如：1億980万円 -> 10980，980万円 -> 980），无法解析时返回0"""
+    price_text = price_text or ''
+    # 处理億万円格式（如：1億980万円）
+    if '億' in price_text:
+        oku_match = re.search(r'(\d+)億', price_text)
+        man_match = re.search(r'(\d+,?\d*)万円', price_text)
+        oku_value = int(oku_match.group(1)) * 10000 if oku_match else 0  # 1億 = 10000万
+        man_value = int(man_match.group(1).replace(',', '')) if man_match else 0
+        return oku_value + man_value
+    # 普通格式（如：980万円）
+    price_match = re.search(r'(\d+,?\d*)万円', price_text)
+    return int(price_match.group(1).replace(',', '')) if price_match else 0
+
+
+def parse_area_sqm(area_text):
+    """从面积文本中提取数字（m²），无法解析时返回0"""
+    if not area_text or area_text == 'N/A':
+        return 0
+    match = re.search(r'(\d+\.?\d*)', str(area_text))
+    return float(match.group(1)) if match else 0
+
+
+def build_sheet_row(prop, region, type_name, idx, updated_at):
+    """把一个房源转换为表格的一行（列顺序与SHEET_HEADERS一致）"""
+    price = parse_price_man(prop.get('price', '0'))
+    area = parse_area_sqm(prop.get('area', '0'))
+
+    # 计算单价（万円/m²）
+    price_per_sqm = round(price / area, 2) if area > 0 and price > 0 else 0
+
+    # 提取建造年份和房龄
+    year_match = re.search(r'(19|20)(\d{2})', prop.get('age', '') or '')
+    if year_match:
+        year = int(year_match.group(0))
+        age_years = 2025 - year
+    else:
+        year = ''
+        age_years = ''
+
+    access = prop.get('access', 'N/A')
+    if access and access != 'N/A':
+        access = access.strip()
+    address = prop.get('address', 'N/A')
+    if address and address != 'N/A':
+        address = address.strip()
+
+    return [
+        region if region else 'N/A',  # 地区
+        type_name,  # 类型（公寓/一户建）
+        idx,  # 序号
+        prop.get('building_name', 'N/A'),
+        price if price > 0 else '',
+        price_per_sqm if price_per_sqm > 0 else '',
+        f"{area:.2f}" if area > 0 else '',
+        prop.get('layout', 'N/A'),
+        year if year else '',
+        age_years if age_years else '',
+        address,
+        access,
+        prop.get('url', 'N/A'),
+        updated_at
+    ]
+
+
+class ListingStore:
+    """
+    房源主数据存储（SQLite，与SeenIndex共用data/suumo.db）
+    - listings: 每个房源一行，以详情URL为键，保存最新字段
+    - price_history: 首次见到以及每次价格变化时记录一条观测
+    线程安全
+    """
+
+    def __init__(self, db_path=DEFAULT_DB_PATH):
+        self.db_path = db_path
+        os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS listings (
+                url TEXT PRIMARY KEY,
+                region TEXT,
+                type_name TEXT,
+                area_code TEXT,
+                property_type TEXT,
+                building_name TEXT,
+                price TEXT,
+                price_man INTEGER,
+                area TEXT,
+                layout TEXT,
+                age TEXT,
+                address TEXT,
+                access TEXT,
+                first_seen TEXT NOT NULL,
+                last_seen TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_listings_region ON listings(region, type_name);
+            CREATE INDEX IF NOT EXISTS idx_listings_area_code ON listings(area_code);
+            CREATE TABLE IF NOT EXISTS price_history (
+                url TEXT NOT NULL,
+                observed_at TEXT NOT NULL,
+                price TEXT,
+                price_man INTEGER,
+                PRIMARY KEY (url, observed_at)
+            );
+        """)
+        self.conn.commit()
+
+    def record(self, properties, region, type_name, area_code=None, property_type=None):
+        """
+        写入一批抓取结果：更新房源主数据，新房源和价格变化的房源追加价格历史
+        
+        返回: {'new': 新房源数, 'price_changed': 价格变化数, 'total': 写入总数}
+        """
+        now = datetime.now().isoformat(timespec='seconds')
+        props = [p for p in properties if p.get('url') and p.get('url') != 'N/A']
+        stats = {'new': 0, 'price_changed': 0, 'total': len(props)}
+
+        with self._lock:
+            # 读取已有价格（分批查询）
+            known = {}
+            urls = [p['url'] for p in props]
+            for i in range(0, len(urls), 500):
+                chunk = urls[i:i + 500]
+                placeholders = ','.join('?' * len(chunk))
+                known.update(self.conn.execute(
+                    f"SELECT url, price_man FROM listings WHERE url IN ({placeholders})", chunk
+                ).fetchall())
+
+            listing_rows = []
+            history_rows = []
+            for prop in props:
+                price_man = parse_price_man(prop.get('price', ''))
+                if prop['url'] not in known:
+                    stats['new'] += 1
+                    history_rows.append((prop['url'], now, prop.get('price', 'N/A'), price_man))
+                elif known[prop['url']] != price_man:
+                    stats['price_changed'] += 1
+                    history_rows.append((prop['url'], now, prop.get('price', 'N/A'), price_man))
+                known[prop['url']] = price_man  # 同一批中重复出现的URL只记一次
+
+                listing_rows.append((
+                    prop['url'], prop.get('region', region), prop.get('type_name', type_name),
+                    prop.get('area_code', area_code), prop.get('property_type', property_type),
+                    prop.get('building_name', 'N/A'), prop.get('price', 'N/A'), price_man,
+                    prop.get('area', 'N/A'), prop.get('layout', 'N/A'), prop.get('age', 'N/A'),
+                    prop.get('address', 'N/A'), prop.get('access', 'N/A'),
+                    now, now
+                ))
+
+            self.conn.executemany("""
+                INSERT INTO listings (url, region, type_name, area_code, property_type,
+                                      building_name, price, price_man, area, layout, age, address, access,
+                                      first_seen, last_seen)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(url) DO UPDATE SET
+                    region = excluded.region,
+                    type_name = excluded.type_name,
+                    area_code = COALESCE(excluded.area_code, listings.area_code),
+                    property_type = COALESCE(excluded.property_type, listings.property_type),
+                    building_name = excluded.building_name,
+                    price = excluded.price,
+                    price_man = excluded.price_man,
+                    area = excluded.area,
+                    layout = excluded.layout,
+                    age = excluded.age,
+                    address = excluded.address,
+                    access = excluded.access,
+                    last_seen = excluded.last_seen
+            """, listing_rows)
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO price_history (url, observed_at, price, price_man) VALUES (?, ?, ?, ?)",
+                history_rows
+            )
+            self.conn.commit()
+
+        print(f"🗄️  已写入房源库: {stats['total']} 条（新房源 {stats['new']}，价格变化 {stats['price_changed']}）",
+              file=sys.stderr)
+        return stats
+
+    def _where(self, region=None, type_name=None, area_code=None, prefix=''):
+        """构建筛选条件"""
+        clauses, params = [], []
+        for column, value in (('region', region), ('type_name', type_name), ('area_code', area_code)):
+            if value:
+                clauses.append(f"{prefix}{column} = ?")
+                params.append(value)
+        return (' WHERE ' + ' AND '.join(clauses)) if clauses else '', params
+
+    def load_properties(self, region=None, type_name=None, area_code=None):
+        """读取房源（字段与抓取结果一致，另含region/type_name/first_seen/last_seen）"""
+        where, params = self._where(region, type_name, area_code)
+        with self._lock:
+            cursor = self.conn.execute(f"""
+                SELECT url, region, type_name, area_code, property_type,
+                       building_name, price, area, layout, age, address, access, first_seen, last_seen
+                FROM listings{where}
+                ORDER BY region, type_name, first_seen, url
+            """, params)
+            columns = [d[0] for d in cursor.description]
+            return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+    def sheet_rows(self, region=None, type_name=None, area_code=None):
+        """生成表格投影：返回 (表头, 数据行)，每个地区+类型内序号从1开始"""
+        rows = []
+        counters = {}
+        for prop in self.load_properties(region, type_name, area_code):
+            group = (prop['region'], prop['type_name'])
+            counters[group] = counters.get(group, 0) + 1
+            updated_at = datetime.fromisoformat(prop['last_seen']).strftime('%Y-%m-%d %H:%M')
+            rows.append(build_sheet_row(prop, prop['region'], prop['type_name'], counters[group], updated_at))
+        return list(SHEET_HEADERS), rows
+
+    def price_drops(self, region=None, area_code=None, days=7):
+        """最近days天内价格下降的房源（与上一次观测相比）"""
+        since = (datetime.now() - timedelta(days=days)).isoformat(timespec='seconds')
+        where, params = self._where(region=region, area_code=area_code, prefix='l.')
+        where = (where + ' AND' if where else ' WHERE') + ' h.prev_price_man IS NOT NULL AND h.price_man < h.prev_price_man AND h.observed_at >= ?'
+        with self._lock:
+            cursor = self.conn.execute(f"""
+                WITH h AS (
+                    SELECT url, observed_at, price, price_man,
+                           LAG(price_man) OVER (PARTITION BY url ORDER BY observed_at) AS prev_price_man
+                    FROM price_history
+                )
+                SELECT l.region, l.type_name, l.building_name, h.prev_price_man, h.price_man,
+                       h.price_man - h.prev_price_man AS change_man, h.observed_at, l.url
+                FROM h JOIN listings l ON l.url = h.url{where}
+                ORDER BY change_man, h.observed_at DESC
+            """, params + [since])
+            columns = [d[0] for d in cursor.description]
+            return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+    def history(self, url):
+        """单个房源的价格历史"""
+        with self._lock:
+            return self.conn.execute(
+                "SELECT observed_at, price, price_man FROM price_history WHERE url = ? ORDER BY observed_at", (url,)
+            ).fetchall()
+
+    def stats(self):
+        """按地区+类型统计房源数和平均价格"""
+        with self._lock:
+            return self.conn.execute("""
+                SELECT region, type_name, COUNT(*), CAST(AVG(NULLIF(price_man, 0)) AS INTEGER), MAX(last_seen)
+                FROM listings GROUP BY region, type_name ORDER BY region, type_name
+            """).fetchall()
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
+
+
+def load_sheet_rows(db_path=None):
+    """
+    读取房源库的表格投影（导出脚本用）：返回 (表头, 数据行)
+    与表格读取结果保持一致，所有值都是字符串；房源库不存在时抛出FileNotFoundError
+    """
+    db_path = db_path or DEFAULT_DB_PATH
+    if not os.path.exists(db_path):
+        raise FileNotFoundError(f"找不到房源库: {db_path}")
+    store = ListingStore(db_path)
+    try:
+        headers, rows = store.sheet_rows()
+    finally:
+        store.close()
+    return headers, [[str(value) for value in row] for row in rows]
+
+
+def main():
+    """本地查询房源库"""
+    parser = argparse.ArgumentParser(description='查询本地Suumo房源库（data/suumo.db）')
+    parser.add_argument('--db', default=DEFAULT_DB_PATH, help='SQLite数据库路径（默认：data/suumo.db）')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    drops_parser = subparsers.add_parser('price-drops', help='最近降价的房源')
+    drops_parser.add_argument('--region', help='地区名称（如：墨田区、錦糸町）')
+    drops_parser.add_argument('--area-code', help='区域代码（如：13107）')
+    drops_parser.add_argument('--days', type=int, default=7, help='统计最近多少天（默认：7）')
+
+    history_parser = subparsers.add_parser('history', help='单个房源的价格历史')
+    history_parser.add_argument('url', help='房源详情链接')
+
+    subparsers.add_parser('stats', help='按地区和类型统计')
+
+    args = parser.parse_args()
+    store = ListingStore(args.db)
+    try:
+        if args.command == 'price-drops':
+            drops = store.price_drops(region=args.region, area_code=args.area_code, days=args.days)
+            print(f"📉 最近{args.days}天降价房源: {len(drops)} 个")
+            for item in drops:
+                print(f"{item['observed_at'][:10]}  {item['region']}/{item['type_name']}  {item['building_name']}  "
+                      f"{item['prev_price_man']}万円 → {item['price_man']}万円（{item['change_man']}万円）  {item['url']}")
+        elif args.command == 'history':
+            rows = store.history(args.url)
+            if not rows:
+                print("❌ 房源库中没有这个链接")
+                return 1
+            for observed_at, price, price_man in rows:
+                print(f"{observed_at}  {price}（{price_man}万円）")
+        else:
+            for region, type_name, count, avg_price, last_seen in store.stats():
+                print(f"{region}/{type_name}: {count} 个房源，平均 {avg_price or 0}万円，最后更新 {last_seen}")
+    finally:
+        store.close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
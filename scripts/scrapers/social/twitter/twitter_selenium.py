@@ -14,9 +14,6 @@ import os
 import re
 
 try:
-    from selenium import webdriver
-    from selenium.webdriver.chrome.service import Service
-    from selenium.webdriver.chrome.options import Options
     from selenium.webdriver.common.by import By
     from selenium.webdriver.common.keys import Keys
     from selenium.webdriver.support.ui import WebDriverWait
@@ -26,28 +23,23 @@ except ImportError:
     print("❌ 请先安装selenium: pip install selenium", file=sys.stderr)
     sys.exit(1)
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', '..', 'utils'))
+from driver_factory import create_driver, timed_get
+
+# Twitter的图片和视频走CDN且URL不带扩展名，单独拦截
+TWITTER_MEDIA_PATTERNS = ['*pbs.twimg.com/media/*', '*pbs.twimg.com/profile_images/*',
+                          '*pbs.twimg.com/profile_banners/*', '*video.twimg.com/*']
+
 
 def setup_driver(headless=True):
-    """配置并启动Chrome浏览器"""
-    chrome_options = Options()
-    if headless:
-        chrome_options.add_argument('--headless')  # 无头模式
-    chrome_options.add_argument('--no-sandbox')
-    chrome_options.add_argument('--disable-dev-shm-usage')
-    chrome_options.add_argument('--disable-gpu')
-    chrome_options.add_argument('--window-size=1920,1080')
-    chrome_options.add_argument('--user-agent=Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36')
-    chrome_options.add_argument('--disable-blink-features=AutomationControlled')
-    
-    # 禁用自动化检测
-    chrome_options.add_experimental_option('excludeSwitches', ['enable-automation'])
-    chrome_options.add_experimental_option('useAutomationExtension', False)
-    
-    # 添加语言设置
-    chrome_options.add_argument('--lang=en-US')
-    
+    """配置并启动Chrome浏览器（拦截图片/视频/字体/统计脚本，只加载推文文本）"""
     try:
-        driver = webdriver.Chrome(options=chrome_options)
+        driver = create_driver(
+            headless=headless,
+            lang='en-US',  # 添加语言设置
+            extra_block_patterns=TWITTER_MEDIA_PATTERNS,
+            label='Twitter浏览器'
+        )
         return driver
     except Exception as e:
         print(f"❌ 启动浏览器失败: {e}", file=sys.stderr)
@@ -190,7 +182,7 @@ def scrape_tweets(username, num_tweets=10, twitter_user=None, twitter_pass=None,
         # 访问用户主页
         url = f"https://twitter.com/{username}"
         print(f"📱 访问: {url}", file=sys.stderr)
-        driver.get(url)
+        timed_get(driver, url, label='用户主页')
         
         # 等待页面加载
         print("⏳ 等待页面加载...", file=sys.stderr)
@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+雪球cookies共享存储
+requests版（xueqiu_api.py）和Selenium版（xueqiu_with_login.py、xueqiu_scraper.py）读写同一个
+config/xueqiu_cookies.json（Selenium get_cookies() 的格式），按每个cookie的expiry判断是否过期，
+只有 xq_a_token 过期或被接口拒绝时才重新访问首页/登录获取
+
+用法:
+    python3 cookie_store.py              # 查看保存的cookies和有效期
+    python3 cookie_store.py --clear      # 删除保存的cookies
+"""
+
+import sys
+import json
+import time
+import argparse
+import os
+from datetime import datetime
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', '..', '..'))
+COOKIES_FILE = os.path.join(PROJECT_ROOT, 'config', 'xueqiu_cookies.json')
+
+BASE_URL = "https://xueqiu.com"
+# 接口访问必须的token
+TOKEN_COOKIE = 'xq_a_token'
+# 离过期不足这么多秒时按已过期处理
+EXPIRY_MARGIN = 300
+# 没有expiry的会话cookie（如WAF的acw_tc）从保存时起按这个时长有效
+SESSION_COOKIE_TTL = 30 * 60
+
+# 阿里云WAF的cookie前缀（acw_tc、acw_sc__v2），token被拒绝时没有expiry的一并丢弃
+WAF_COOKIE_PREFIX = 'acw_'
+
+# Selenium add_cookie 接受的字段
+SELENIUM_FIELDS = ('name', 'value', 'domain', 'path', 'expiry', 'secure', 'httpOnly', 'sameSite')
+
+
+def _cookie_key(cookie):
+    """同名同域的cookie视为同一个（.xueqiu.com 和 xueqiu.com 相同）"""
+    return cookie['name'], (cookie.get('domain') or '').lstrip('.')
+
+
+def _expires_at(cookie):
+    """cookie的过期时间戳（秒）"""
+    if cookie.get('expiry'):
+        return cookie['expiry']
+    return cookie.get('saved_at', 0) + SESSION_COOKIE_TTL
+
+
+class CookieStore:
+    """
+    雪球cookies的JSON文件存储
+    保存时与文件中已有的cookies按（名称, 域）合并，写临时文件后替换，多个进程同时写也不会读到半个文件
+    """
+
+    def __init__(self, path=COOKIES_FILE):
+        self.path = path
+
+    def load(self, now=None):
+        """读取未过期的cookies；文件不存在或损坏时返回空列表"""
+        if not os.path.exists(self.path):
+            return []
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                cookies = json.load(f)
+        except Exception as e:
+            print(f"⚠️  读取cookies失败: {e}", file=sys.stderr)
+            return []
+        now = now or time.time()
+        return [c for c in cookies if c.get('name') and _expires_at(c) > now]
+
+    def token_valid(self, cookies=None, now=None):
+        """xq_a_token 是否存在且离过期还有 EXPIRY_MARGIN 秒以上"""
+        now = now or time.time()
+        cookies = self.load(now) if cookies is None else cookies
+        return any(c['name'] == TOKEN_COOKIE and _expires_at(c) > now + EXPIRY_MARGIN for c in cookies)
+
+    def token_expiry(self, cookies=None):
+        """xq_a_token 的过期时间（datetime），没有时返回None"""
+        cookies = self.load() if cookies is None else cookies
+        expiries = [_expires_at(c) for c in cookies if c['name'] == TOKEN_COOKIE]
+        return datetime.fromtimestamp(max(expiries)) if expiries else None
+
+    def save(self, cookies):
+        """合并保存cookies（Selenium格式的字典列表）"""
+        try:
+            now = time.time()
+            merged = {_cookie_key(c): c for c in self.load(now)}
+            for cookie in cookies:
+                cookie = dict(cookie)
+                cookie['saved_at'] = int(now)
+                merged[_cookie_key(cookie)] = cookie
+            self._write(list(merged.values()))
+            return True
+        except Exception as e:
+            print(f"❌ 保存cookies失败: {e}", file=sys.stderr)
+            return False
+
+    def _write(self, cookies):
+        """写临时文件后原子替换"""
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(cookies, f, ensure_ascii=False, indent=2)
+        os.chmod(tmp_path, 0o600)
+        os.replace(tmp_path, self.path)
+
+    def invalidate(self):
+        """
+        token被服务器拒绝：去掉 xq_a_token 和没有expiry的WAF cookie，其他进程也会重新获取
+        其余cookie保留原来的saved_at，不延长会话cookie的有效期
+        """
+        cookies = [
+            c for c in self.load()
+            if c['name'] != TOKEN_COOKIE and not (c['name'].startswith(WAF_COOKIE_PREFIX) and not c.get('expiry'))
+        ]
+        try:
+            self._write(cookies)
+        except Exception as e:
+            print(f"⚠️  更新cookies失败: {e}", file=sys.stderr)
+
+    # ---- requests ----
+
+    def apply_to_session(self, session, cookies=None):
+        """把cookies加到requests会话"""
+        cookies = self.load() if cookies is None else cookies
+        for c in cookies:
+            session.cookies.set(
+                c['name'], c['value'],
+                domain=c.get('domain') or '.xueqiu.com',
+                path=c.get('path') or '/',
+                expires=c.get('expiry'),
+                secure=c.get('secure', False)
+            )
+        return len(cookies)
+
+    def save_session(self, session):
+        """保存requests会话中雪球域名下的cookies"""
+        cookies = []
+        for c in session.cookies:
+            if 'xueqiu.com' not in (c.domain or ''):
+                continue
+            cookie = {
+                'name': c.name,
+                'value': c.value,
+                'domain': c.domain,
+                'path': c.path or '/',
+                'secure': bool(c.secure),
+                'httpOnly': bool(c.has_nonstandard_attr('HttpOnly')),
+            }
+            if c.expires:
+                cookie['expiry'] = int(c.expires)
+            cookies.append(cookie)
+        return self.save(cookies) if cookies else False
+
+    # ---- Selenium ----
+
+    def apply_to_driver(self, driver, cookies=None):
+        """
+        把cookies加到浏览器
+        Chrome用CDP直接写入，不需要先打开页面；其他浏览器先打开雪球首页再add_cookie
+        """
+        cookies = self.load() if cookies is None else cookies
+        if not cookies:
+            return False
+
+        try:
+            driver.execute_cdp_cmd('Network.setCookies', {'cookies': [
+                {
+                    'name': c['name'],
+                    'value': c['value'],
+                    'domain': c.get('domain') or '.xueqiu.com',
+                    'path': c.get('path') or '/',
+                    'secure': c.get('secure', False),
+                    'httpOnly': c.get('httpOnly', False),
+                    **({'expires': c['expiry']} if c.get('expiry') else {}),
+                }
+                for c in cookies
+            ]})
+        except Exception:
+            if 'xueqiu.com' not in (driver.current_url or ''):
+                driver.get(BASE_URL)
+            for c in cookies:
+                try:
+                    driver.add_cookie({k: c[k] for k in SELENIUM_FIELDS if k in c})
+                except:
+                    pass
+        return True
+
+    def save_driver(self, driver):
+        """保存浏览器当前的雪球cookies"""
+        try:
+            cookies = [c for c in driver.get_cookies() if 'xueqiu.com' in (c.get('domain') or '')]
+        except Exception as e:
+            print(f"⚠️  读取浏览器cookies失败: {e}", file=sys.stderr)
+            return False
+        return self.save(cookies) if cookies else False
+
+
+def main():
+    parser = argparse.ArgumentParser(description='雪球cookies共享存储')
+    parser.add_argument('--path', type=str, default=COOKIES_FILE, help='cookies文件路径')
+    parser.add_argument('--clear', action='store_true', help='删除保存的cookies')
+    args = parser.parse_args()
+
+    store = CookieStore(args.path)
+    if args.clear:
+        if os.path.exists(store.path):
+            os.remove(store.path)
+        print(f"🗑️  已删除: {store.path}")
+        return
+
+    cookies = store.load()
+    print(f"📂 {store.path}: {len(cookies)} 个未过期的cookie")
+    for c in sorted(cookies, key=lambda c: c['name']):
+        print(f"  {c['name']:<20} {c.get('domain', ''):<16} 过期: {datetime.fromtimestamp(_expires_at(c)):%Y-%m-%d %H:%M}")
+    expiry = store.token_expiry(cookies)
+    status = "有效" if store.token_valid(cookies) else "无效/即将过期"
+    print(f"🔑 {TOKEN_COOKIE}: {status}" + (f"（至 {expiry:%Y-%m-%d %H:%M}）" if expiry else ""))
+
+
+if __name__ == '__main__':
+    main()
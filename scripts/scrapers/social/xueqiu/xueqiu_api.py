@@ -3,31 +3,153 @@
 """
 雪球API爬虫（推荐）
 使用雪球公开API获取用户发文，比Selenium更稳定快速
+第1页返回总页数（maxPage）后，其余页在令牌桶限速下并发获取
+--since-last 增量模式：按用户记录已同步的最新发文（水位），逐页获取到已知发文即停止，
+新发文追加到按用户划分的归档文件（JSON Lines，只追加不覆盖）
+--user-ids 批量模式：多个用户共用一个会话、一次cookie初始化和同一个令牌桶，在小线程池中并发同步
+cookies保存在 config/xueqiu_cookies.json（与Selenium版共用，见 cookie_store.py），
+xq_a_token 未过期时直接复用，不再每次访问首页；token过期或被接口拒绝时才刷新
 """
 
 import sys
 import json
+import math
 import time
 import argparse
 import os
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
 try:
     import requests
+    from requests.adapters import HTTPAdapter
 except ImportError:
     print("❌ 请先安装requests: pip install requests", file=sys.stderr)
     sys.exit(1)
 
+from cookie_store import COOKIES_FILE, TOKEN_COOKIE, CookieStore
+
 
 # 段永平的雪球ID
 DEFAULT_USER_ID = "9528875558"
 
+TIMELINE_URL = "https://xueqiu.com/statuses/original/timeline.json"
+DEFAULT_PAGE_SIZE = 20  # 时间线每页20条
+# 并发获取时间线分页的线程数
+PAGE_WORKERS = 4
+# 令牌桶：平均每秒请求数和允许的突发请求数（所有线程共享）
+REQUEST_RATE = 2.0
+REQUEST_BURST = 4
+# 这些状态码表示token失效（雪球返回400并带 error_code 400016 "遇到错误，请刷新页面"）
+TOKEN_REJECTED_STATUS = (400, 401, 403)
+# 批量模式同时处理的用户数（共用同一个会话和令牌桶）
+USER_WORKERS = 3
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', '..', '..'))
+# 每个用户的同步水位（最新发文的id和created_at）
+STATE_DB_PATH = os.path.join(PROJECT_ROOT, 'data', 'xueqiu.db')
+# 增量模式的归档目录，每个用户一个 <user_id>.jsonl
+DEFAULT_ARCHIVE_DIR = os.path.join(PROJECT_ROOT, 'output', 'xueqiu_archive')
+
+
+def _post_key(post):
+    """发文的先后顺序：(created_at毫秒, id)，id相同时间内单调递增"""
+    try:
+        return int(post.get('created_at') or 0), int(post.get('id') or 0)
+    except (TypeError, ValueError):
+        return 0, 0
+
+
+class TokenBucket:
+    """
+    令牌桶限速器（线程安全）
+    平均每秒 rate 个请求，最多允许 capacity 个突发请求，多个线程共享同一个桶
+    """
+    
+    def __init__(self, rate=REQUEST_RATE, capacity=REQUEST_BURST):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+    
+    def acquire(self):
+        """取一个令牌，没有令牌时阻塞到下一个令牌生成"""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+class SyncState:
+    """
+    增量同步水位（SQLite）
+    每个用户记录已归档的最新一条发文，只有新发文成功写入归档之后才更新
+    """
+    
+    def __init__(self, db_path=STATE_DB_PATH):
+        os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS xueqiu_watermarks (
+                user_id TEXT PRIMARY KEY,
+                last_id TEXT NOT NULL,
+                last_created_at INTEGER NOT NULL,
+                updated_at TEXT NOT NULL
+            )
+        """)
+        self.conn.commit()
+    
+    def get(self, user_id):
+        """返回 {'id', 'created_at'}；没有同步过时返回None"""
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT last_id, last_created_at FROM xueqiu_watermarks WHERE user_id = ?", (str(user_id),)
+            ).fetchone()
+        if not row:
+            return None
+        return {'id': row[0], 'created_at': row[1]}
+    
+    def update(self, user_id, post):
+        """把水位推进到post（只前进不后退）"""
+        current = self.get(user_id)
+        if current and _post_key(current) >= _post_key(post):
+            return
+        with self._lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO xueqiu_watermarks (user_id, last_id, last_created_at, updated_at) VALUES (?, ?, ?, ?)",
+                (str(user_id), str(post['id']), int(post['created_at'] or 0), datetime.now().isoformat())
+            )
+            self.conn.commit()
+    
+    def close(self):
+        self.conn.close()
+
 
 class XueqiuAPI:
     """雪球API客户端"""
     
-    def __init__(self):
+    def __init__(self, rate_limiter=None, page_workers=PAGE_WORKERS, user_workers=1, cookie_store=None):
+        self.rate_limiter = rate_limiter or TokenBucket()
+        self.cookie_store = cookie_store
+        self.cookies_reused = False
+        # 多个线程同时遇到token被拒绝时只刷新一次
+        self._cookie_lock = threading.Lock()
+        self._cookie_generation = 0
+        self.page_workers = page_workers
         self.session = requests.Session()
+        # 批量模式下多个用户同时翻页，连接池按总并发数分配
+        adapter = HTTPAdapter(pool_connections=2, pool_maxsize=max(page_workers, 1) * max(user_workers, 1))
+        self.session.mount("https://", adapter)
         self.session.headers.update({
             'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
             'Accept': 'application/json',
@@ -36,13 +158,28 @@ class XueqiuAPI:
         })
         self.base_url = "https://xueqiu.com"
     
-    def init_cookies(self):
-        """初始化cookies - 访问首页获取必要的cookies"""
+    def init_cookies(self, force=False):
+        """
+        初始化cookies
+        cookie_store中的 xq_a_token 未过期时直接复用；否则（或force时）访问首页获取并保存
+        """
+        if not force and self.cookie_store:
+            cookies = self.cookie_store.load()
+            if self.cookie_store.token_valid(cookies):
+                self.cookie_store.apply_to_session(self.session, cookies)
+                self.cookies_reused = True
+                expiry = self.cookie_store.token_expiry(cookies)
+                print(f"♻️  复用已保存的cookies（{TOKEN_COOKIE} 有效至 {expiry:%Y-%m-%d %H:%M}）", file=sys.stderr)
+                return True
+        
+        self.cookies_reused = False
         try:
             print("🔐 初始化cookies...", file=sys.stderr)
-            response = self.session.get(self.base_url)
+            response = self.session.get(self.base_url, timeout=15)
             if response.status_code == 200:
                 print("✅ Cookies初始化成功", file=sys.stderr)
+                if self.cookie_store and self.cookie_store.save_session(self.session):
+                    print(f"💾 Cookies已保存到: {self.cookie_store.path}", file=sys.stderr)
                 return True
             else:
                 print(f"⚠️  初始化cookies失败: {response.status_code}", file=sys.stderr)
@@ -51,6 +188,18 @@ class XueqiuAPI:
             print(f"❌ 初始化失败: {e}", file=sys.stderr)
             return False
     
+    def _refresh_cookies(self, generation):
+        """token被拒绝时刷新cookies；generation已变化说明其他线程刚刷新过，直接重试"""
+        with self._cookie_lock:
+            if generation != self._cookie_generation:
+                return
+            print("🔄 token被拒绝，重新获取cookies...", file=sys.stderr)
+            if self.cookie_store:
+                self.cookie_store.invalidate()
+            self.session.cookies.clear()
+            self.init_cookies(force=True)
+            self._cookie_generation += 1
+    
     def get_user_info(self, user_id):
         """获取用户信息"""
         try:
@@ -72,90 +221,135 @@ class XueqiuAPI:
             print(f"❌ 获取用户信息失败: {e}", file=sys.stderr)
             return None
     
-    def get_user_posts(self, user_id, max_posts=20):
+    def _fetch_timeline_page(self, user_id, page):
+        """
+        获取时间线的一页（经过令牌桶限速，token被拒绝时自动刷新cookies重试一次）
+        
+        Returns:
+            dict: API返回的数据；请求失败或格式异常时抛出异常
+        """
+        params = {
+            'user_id': user_id,
+            'page': page,
+            'type': 0,  # 0=全部, 2=原创
+        }
+        # token被拒绝时刷新cookies后重试一次
+        for attempt in range(2):
+            generation = self._cookie_generation
+            self.rate_limiter.acquire()
+            response = self.session.get(TIMELINE_URL, params=params, timeout=15)
+            if response.status_code in TOKEN_REJECTED_STATUS and attempt == 0:
+                self._refresh_cookies(generation)
+                continue
+            break
+        if response.status_code != 200:
+            raise RuntimeError(f"API请求失败: {response.status_code} {response.text[:200]}")
+        data = response.json()
+        if 'list' not in data:
+            raise RuntimeError(f"返回数据格式异常: {list(data.keys())}")
+        return data
+    
+    def get_user_posts(self, user_id, max_posts=20, since=None):
         """
         获取用户发文列表
+        先取第1页，从 maxPage（或 total）得到总页数，其余页在令牌桶限速下并发获取
         
         Args:
             user_id: 雪球用户ID
-            max_posts: 最多获取的发文数
+            max_posts: 最多获取的发文数（<=0 表示全部历史）
+            since: 同步水位 {'id', 'created_at'}，给出时只获取比它新的发文（忽略max_posts）
         
         Returns:
-            list: 发文列表
+            list: 发文列表（按时间线顺序，从新到旧）；增量模式下获取失败返回None
         """
-        posts = []
-        page = 1
-        page_size = 20  # 每页20条
+        print(f"👤 用户ID: {user_id}", file=sys.stderr)
+        if since:
+            return self._get_posts_since(user_id, since)
+        print(f"📝 开始获取发文...", file=sys.stderr)
         
         try:
-            # 访问用户主页获取用户名
-            print(f"📖 正在访问用户主页...", file=sys.stderr)
-            user_page_url = f"{self.base_url}/u/{user_id}"
-            user_response = self.session.get(user_page_url)
-            
-            # 尝试从页面提取用户名（可选）
-            username = f"User_{user_id}"
+            first = self._fetch_timeline_page(user_id, 1)
+        except Exception as e:
+            print(f"❌ 获取发文失败: {e}", file=sys.stderr)
+            return []
+        
+        first_posts = first.get('list', [])
+        page_size = len(first_posts) or DEFAULT_PAGE_SIZE
+        max_page = first.get('maxPage')
+        if not max_page and first.get('total'):
+            max_page = math.ceil(first['total'] / page_size)
+        max_page = max_page or 1
+        wanted_pages = max_page if max_posts <= 0 else min(max_page, math.ceil(max_posts / page_size))
+        print(f"📄 共 {max_page} 页，需要获取 {wanted_pages} 页", file=sys.stderr)
+        
+        pages = {1: first_posts}
+        failed_pages = []
+        if wanted_pages > 1:
+            def fetch(page):
+                try:
+                    posts = self._fetch_timeline_page(user_id, page).get('list', [])
+                    print(f"📄 第 {page}/{wanted_pages} 页: {len(posts)} 条", file=sys.stderr)
+                    return page, posts
+                except Exception as e:
+                    print(f"⚠️  第 {page} 页获取失败: {e}", file=sys.stderr)
+                    return page, None
             
-            print(f"👤 用户ID: {user_id}", file=sys.stderr)
-            print(f"📝 开始获取发文...", file=sys.stderr)
+            with ThreadPoolExecutor(max_workers=self.page_workers) as executor:
+                for page, posts in executor.map(fetch, range(2, wanted_pages + 1)):
+                    if posts is None:
+                        failed_pages.append(page)
+                    else:
+                        pages[page] = posts
+        
+        # 按页码顺序合并（翻页期间有新发文时相邻页可能重复，按id去重）
+        posts = []
+        seen_ids = set()
+        for page in sorted(pages):
+            for post in pages[page]:
+                post_id = post.get('id')
+                if post_id in seen_ids:
+                    continue
+                seen_ids.add(post_id)
+                posts.append(self._extract_post_data(post, user_id))
+        if max_posts > 0:
+            posts = posts[:max_posts]
+        
+        if failed_pages:
+            print(f"⚠️  以下页获取失败: {failed_pages}", file=sys.stderr)
+        print(f"\n✅ 共获取 {len(posts)} 条发文", file=sys.stderr)
+        return posts
+    
+    def _get_posts_since(self, user_id, since):
+        """
+        增量获取：从第1页开始逐页获取，某页最后一条（最旧的一条）不比水位新时停止
+        置顶的旧发文在页首，不会提前结束翻页；中途失败时返回None，避免水位越过没取到的发文
+        """
+        since_key = _post_key(since)
+        print(f"📝 增量获取（水位: {since['id']}）...", file=sys.stderr)
+        
+        posts = []
+        seen_ids = set()
+        page = 1
+        while True:
+            try:
+                data = self._fetch_timeline_page(user_id, page)
+            except Exception as e:
+                print(f"❌ 第 {page} 页获取失败，本次不更新水位: {e}", file=sys.stderr)
+                return None
             
-            while len(posts) < max_posts:
-                # 雪球用户动态API
-                api_url = f"https://xueqiu.com/statuses/original/timeline.json"
-                params = {
-                    'user_id': user_id,
-                    'page': page,
-                    'type': 0,  # 0=全部, 2=原创
-                }
-                
-                print(f"📄 正在获取第 {page} 页...", file=sys.stderr)
-                response = self.session.get(api_url, params=params)
-                
-                if response.status_code != 200:
-                    print(f"⚠️  API请求失败: {response.status_code}", file=sys.stderr)
-                    # 打印响应内容供调试
-                    print(f"响应: {response.text[:200]}", file=sys.stderr)
-                    break
-                
-                try:
-                    data = response.json()
-                except json.JSONDecodeError:
-                    print(f"❌ JSON解析失败", file=sys.stderr)
-                    break
-                
-                # 检查返回的数据结构
-                if 'list' not in data:
-                    print(f"⚠️  返回数据格式异常: {list(data.keys())}", file=sys.stderr)
-                    break
-                
-                page_posts = data.get('list', [])
-                
-                if not page_posts:
-                    print(f"📭 没有更多发文了", file=sys.stderr)
-                    break
-                
-                for post in page_posts:
-                    if len(posts) >= max_posts:
-                        break
-                    
-                    # 提取发文数据
-                    post_data = self._extract_post_data(post, user_id)
-                    posts.append(post_data)
-                    
-                    title = post_data.get('title', '')[:50]
-                    print(f"✅ [{len(posts)}/{max_posts}] {title}...", file=sys.stderr)
-                
-                page += 1
-                time.sleep(1)  # 避免请求过快
+            page_posts = data.get('list', [])
+            for post in page_posts:
+                if _post_key(post) > since_key and post.get('id') not in seen_ids:
+                    seen_ids.add(post.get('id'))
+                    posts.append(self._extract_post_data(post, user_id))
             
-            print(f"\n✅ 共获取 {len(posts)} 条发文", file=sys.stderr)
-            return posts
+            max_page = data.get('maxPage') or 1
+            if not page_posts or _post_key(page_posts[-1]) <= since_key or page >= max_page:
+                break
+            page += 1
         
-        except Exception as e:
-            print(f"❌ 获取发文失败: {e}", file=sys.stderr)
-            import traceback
-            traceback.print_exc()
-            return posts
+        print(f"\n✅ 获取 {page} 页，新发文 {len(posts)} 条", file=sys.stderr)
+        return posts
     
     def _extract_post_data(self, post, user_id):
         """提取发文数据"""
@@ -208,6 +402,105 @@ def save_to_file(posts, output_file):
         return False
 
 
+def append_to_archive(posts, archive_dir, user_id):
+    """
+    把新发文按从旧到新的顺序追加到 <archive_dir>/<user_id>.jsonl（每行一条，只追加不覆盖）
+    
+    Returns:
+        str: 归档文件路径；失败时返回None
+    """
+    try:
+        os.makedirs(archive_dir, exist_ok=True)
+        archive_file = os.path.join(archive_dir, f"{user_id}.jsonl")
+        with open(archive_file, 'a', encoding='utf-8') as f:
+            for post in sorted(posts, key=_post_key):
+                f.write(json.dumps(post, ensure_ascii=False) + '\n')
+        print(f"🗃️  {len(posts)} 条新发文已追加到: {archive_file}", file=sys.stderr)
+        return archive_file
+    
+    except Exception as e:
+        print(f"❌ 写入归档失败: {e}", file=sys.stderr)
+        return None
+
+
+def sync_user(api, user_id, max_posts, state=None, archive_dir=DEFAULT_ARCHIVE_DIR):
+    """
+    获取一个用户的发文；给出state时为增量模式（新发文追加到归档，成功后推进水位）
+    
+    Returns:
+        list: 获取到的（新）发文；增量模式下获取或归档失败返回None
+    """
+    if state is None:
+        return api.get_user_posts(user_id, max_posts)
+    
+    posts = api.get_user_posts(user_id, max_posts, since=state.get(user_id))
+    if posts:
+        if not append_to_archive(posts, archive_dir, user_id):
+            return None
+        state.update(user_id, max(posts, key=_post_key))
+    return posts
+
+
+def write_outputs(posts, output_file, output_format, user_id):
+    """按输出格式一次写入JSON和/或Markdown文件"""
+    if output_format in ['json', 'both']:
+        save_to_file(posts, output_file)
+    
+    if output_format in ['markdown', 'both']:
+        markdown_file = output_file.replace('.json', '.md')
+        markdown_content = format_to_markdown(posts, user_id)
+        with open(markdown_file, 'w', encoding='utf-8') as f:
+            f.write(markdown_content)
+        print(f"📝 Markdown已保存到: {markdown_file}", file=sys.stderr)
+
+
+def load_user_ids(value):
+    """
+    解析 --user-ids：文件路径（每行一个ID，#开头为注释）或逗号分隔的ID列表
+    """
+    if os.path.isfile(value):
+        with open(value, 'r', encoding='utf-8') as f:
+            lines = [line.split('#', 1)[0].strip() for line in f]
+    else:
+        lines = [part.strip() for part in value.split(',')]
+    
+    # 去重并保持顺序
+    return list(dict.fromkeys(line for line in lines if line))
+
+
+def sync_users(api, user_ids, args, state=None):
+    """
+    批量同步：用户在小线程池中并发处理，所有请求共用api的会话和令牌桶
+    每个用户的发文写入 <output所在目录>/xueqiu_<用户ID>.json（.md）
+    
+    Returns:
+        dict: {用户ID: 结果}，顺序与user_ids一致
+    """
+    output_dir = os.path.dirname(args.output)
+    
+    def run(user_id):
+        start = time.perf_counter()
+        try:
+            posts = sync_user(api, user_id, args.max_posts, state, args.archive_dir)
+        except Exception as e:
+            print(f"❌ 用户 {user_id} 同步失败: {e}", file=sys.stderr)
+            posts = None
+        result = {
+            'success': posts is not None,
+            'count': len(posts or []),
+            'output': None,
+            'elapsed': round(time.perf_counter() - start, 2),
+        }
+        if posts:
+            output_file = os.path.join(output_dir, f"xueqiu_{user_id}.json")
+            write_outputs(posts, output_file, args.format, user_id)
+            result['output'] = output_file
+        return user_id, result
+    
+    with ThreadPoolExecutor(max_workers=max(args.user_workers, 1)) as executor:
+        return dict(executor.map(run, user_ids))
+
+
 def format_to_markdown(posts, user_id=""):
     """将发文格式化为Markdown"""
     username = posts[0].get('username', f'User_{user_id}') if posts else ''
@@ -270,35 +563,98 @@ def main():
     parser = argparse.ArgumentParser(description='雪球API爬虫（推荐使用）')
     parser.add_argument('--user-id', type=str, default=DEFAULT_USER_ID,
                         help=f'雪球用户ID (默认: {DEFAULT_USER_ID} - 段永平)')
+    parser.add_argument('--user-ids', type=str, default=None,
+                        help='批量模式：逗号分隔的用户ID，或每行一个ID的文件路径（覆盖 --user-id）')
+    parser.add_argument('--user-workers', type=int, default=USER_WORKERS,
+                        help=f'批量模式同时处理的用户数，共用同一个限速器 (默认: {USER_WORKERS})')
     parser.add_argument('--max-posts', type=int, default=20,
-                        help='最多获取的发文数量 (默认: 20)')
+                        help='最多获取的发文数量，0表示全部历史 (默认: 20)')
+    parser.add_argument('--rate', type=float, default=REQUEST_RATE,
+                        help=f'平均每秒请求数 (默认: {REQUEST_RATE})')
+    parser.add_argument('--workers', type=int, default=PAGE_WORKERS,
+                        help=f'并发获取分页的线程数 (默认: {PAGE_WORKERS})')
     parser.add_argument('--output', type=str, default='../output/xueqiu_posts.json',
                         help='输出文件路径')
     parser.add_argument('--format', type=str, choices=['json', 'markdown', 'both'], default='both',
                         help='输出格式 (默认: both)')
+    parser.add_argument('--cookies', type=str, default=COOKIES_FILE,
+                        help='共享cookies文件 (默认: config/xueqiu_cookies.json)')
+    parser.add_argument('--refresh-cookies', action='store_true',
+                        help='忽略保存的cookies，重新访问首页获取')
+    parser.add_argument('--since-last', action='store_true',
+                        help='增量模式：只获取上次同步之后的新发文并追加到归档（首次运行按 --max-posts 获取）')
+    parser.add_argument('--state-db', type=str, default=STATE_DB_PATH,
+                        help='同步水位数据库路径 (默认: data/xueqiu.db)')
+    parser.add_argument('--archive-dir', type=str, default=DEFAULT_ARCHIVE_DIR,
+                        help='增量模式的归档目录 (默认: output/xueqiu_archive)')
     
     args = parser.parse_args()
     
+    user_ids = load_user_ids(args.user_ids) if args.user_ids else [args.user_id]
+    if not user_ids:
+        print(f"❌ --user-ids 中没有用户ID: {args.user_ids}", file=sys.stderr)
+        sys.exit(1)
+    batch = args.user_ids is not None
+    
     print("=" * 60, file=sys.stderr)
     print("📊 雪球API爬虫", file=sys.stderr)
     print("=" * 60, file=sys.stderr)
-    print(f"👤 用户ID: {args.user_id}", file=sys.stderr)
-    print(f"📝 最多获取: {args.max_posts}条", file=sys.stderr)
+    if batch:
+        print(f"👥 批量模式: {len(user_ids)} 个用户，{args.user_workers} 个并发", file=sys.stderr)
+    else:
+        print(f"👤 用户ID: {args.user_id}", file=sys.stderr)
+    print(f"📝 最多获取: {args.max_posts if args.max_posts > 0 else '全部'}条", file=sys.stderr)
     print(f"💾 输出格式: {args.format}", file=sys.stderr)
+    if args.since_last:
+        print(f"🔁 增量模式，归档目录: {args.archive_dir}", file=sys.stderr)
     print("=" * 60, file=sys.stderr)
     print("", file=sys.stderr)
     
-    # 创建API客户端
-    api = XueqiuAPI()
+    # 创建API客户端（批量模式下所有用户共用一个会话和令牌桶）
+    api = XueqiuAPI(
+        rate_limiter=TokenBucket(rate=args.rate),
+        page_workers=args.workers,
+        user_workers=args.user_workers if batch else 1,
+        cookie_store=CookieStore(args.cookies)
+    )
     
-    # 初始化cookies
-    if not api.init_cookies():
+    # 初始化cookies（保存的token有效时不访问首页）
+    if not api.init_cookies(force=args.refresh_cookies):
         print("⚠️  Cookies初始化失败，继续尝试...", file=sys.stderr)
     
-    time.sleep(1)
+    if not api.cookies_reused:
+        time.sleep(1)
+    
+    state = SyncState(args.state_db) if args.since_last else None
+    try:
+        if batch:
+            start = time.perf_counter()
+            results = sync_users(api, user_ids, args, state)
+            failed = [user_id for user_id, result in results.items() if not result['success']]
+            print(f"\n⏱️  {len(results)} 个用户同步完成（失败 {len(failed)} 个），"
+                  f"共 {sum(r['count'] for r in results.values())} 条，总耗时 {time.perf_counter() - start:.2f}s",
+                  file=sys.stderr)
+            print(json.dumps({
+                "success": not failed,
+                "data": results,
+                "timestamp": datetime.now().isoformat()
+            }, ensure_ascii=False, indent=2))
+            if failed:
+                sys.exit(1)
+            return
+        
+        # 获取发文
+        posts = sync_user(api, args.user_id, args.max_posts, state, args.archive_dir)
+    finally:
+        if state:
+            state.close()
     
-    # 获取发文
-    posts = api.get_user_posts(args.user_id, args.max_posts)
+    if posts is None:
+        sys.exit(1)
+    if not posts and args.since_last:
+        print("💤 没有新发文", file=sys.stderr)
+        print(json.dumps([], ensure_ascii=False))
+        return
     
     if not posts:
         print("❌ 没有获取到任何发文", file=sys.stderr)
@@ -310,15 +666,7 @@ def main():
         return
     
     # 保存数据
-    if args.format in ['json', 'both']:
-        save_to_file(posts, args.output)
-    
-    if args.format in ['markdown', 'both']:
-        markdown_file = args.output.replace('.json', '.md')
-        markdown_content = format_to_markdown(posts, args.user_id)
-        with open(markdown_file, 'w', encoding='utf-8') as f:
-            f.write(markdown_content)
-        print(f"📝 Markdown已保存到: {markdown_file}", file=sys.stderr)
+    write_outputs(posts, args.output, args.format, args.user_id)
     
     # 输出到stdout
     if args.format == 'markdown':
@@ -331,4 +679,3 @@ def main():
 
 if __name__ == '__main__':
     main()
-
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+雪球页面的Selenium辅助函数（xueqiu_scraper.py 和 xueqiu_scraper_v2.py 共用）
+- STEALTH_JS: 每个新文档加载前注入，隐藏webdriver特征
+- wait_for_page_ready: 轮询到离开WAF验证页、时间线容器渲染出来
+- scroll_and_wait: 滚动后用MutationObserver等待新节点出现（有上限），不固定等待
+"""
+
+import sys
+import time
+
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.common.exceptions import TimeoutException
+
+# 注入JavaScript隐藏webdriver（每个新文档加载前执行）
+STEALTH_JS = '''
+    Object.defineProperty(navigator, 'webdriver', {
+        get: () => undefined
+    });
+    Object.defineProperty(navigator, 'plugins', {
+        get: () => [1, 2, 3, 4, 5]
+    });
+    Object.defineProperty(navigator, 'languages', {
+        get: () => ['zh-CN', 'zh', 'en']
+    });
+    window.chrome = {
+        runtime: {}
+    };
+'''
+
+# 页面就绪（WAF验证 + 时间线渲染）的最长等待秒数；一半时间仍停在WAF验证页时刷新一次
+READY_TIMEOUT = 40
+# 滚动后等待新节点出现的上限；新节点出现后再安静这么多毫秒才认为这一批加载完
+SCROLL_TIMEOUT = 5
+SCROLL_QUIET_MS = 300
+POLL_INTERVAL = 0.3
+TIMELINE_SELECTOR = "article, .timeline__item, .status-item, div[class*='timeline']"
+
+# 统计document.body下新增的节点数和最后一次变化的时间（重复执行不会重复注册）
+MUTATION_OBSERVER_JS = '''
+    if (!window.__xqMutations) {
+        window.__xqMutations = {count: 0, last: Date.now()};
+        new MutationObserver(function (records) {
+            for (var i = 0; i < records.length; i++) {
+                window.__xqMutations.count += records[i].addedNodes.length;
+            }
+            window.__xqMutations.last = Date.now();
+        }).observe(document.body, {childList: true, subtree: true});
+    }
+    return window.__xqMutations.count;
+'''
+MUTATION_STATE_JS = '''
+    var m = window.__xqMutations;
+    return m ? [m.count, Date.now() - m.last] : [0, 0];
+'''
+
+
+def is_waf_challenge(driver):
+    """是否仍停在WAF验证页"""
+    page_source = driver.page_source
+    return '_waf_' in page_source and 'renderData' in page_source
+
+
+def page_ready(driver):
+    """
+    不在WAF验证页并且时间线容器已经渲染（没有下发WAF cookie也算就绪）
+    仍显示验证页时（等待WAF cookie下发后跳转）不会就绪
+    """
+    if is_waf_challenge(driver):
+        return False
+    return bool(driver.find_elements(By.CSS_SELECTOR, TIMELINE_SELECTOR))
+
+
+def wait_for_page_ready(driver, timeout=READY_TIMEOUT):
+    """
+    轮询直到页面就绪；前一半时间仍停在WAF验证页时刷新一次再等
+    
+    Returns:
+        bool: 是否在timeout内就绪（未就绪时调用方仍会尝试解析）
+    """
+    start = time.perf_counter()
+    try:
+        WebDriverWait(driver, timeout / 2, poll_frequency=POLL_INTERVAL).until(page_ready)
+    except TimeoutException:
+        if is_waf_challenge(driver):
+            print("⚠️  检测到WAF保护，刷新后继续等待...", file=sys.stderr)
+            driver.refresh()
+        try:
+            WebDriverWait(driver, timeout / 2, poll_frequency=POLL_INTERVAL).until(page_ready)
+        except TimeoutException:
+            print(f"⚠️  {timeout}秒内页面未就绪，继续尝试解析", file=sys.stderr)
+            return False
+    print(f"✅ 页面就绪，等待 {time.perf_counter() - start:.1f}s", file=sys.stderr)
+    return True
+
+
+def scroll_and_wait(driver, timeout=SCROLL_TIMEOUT):
+    """
+    滚动到底部，等待MutationObserver报告新节点并安静 SCROLL_QUIET_MS 毫秒
+    
+    Returns:
+        bool: 是否加载出了新节点（False通常表示已经到底）
+    """
+    before = driver.execute_script(MUTATION_OBSERVER_JS)
+    driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
+    
+    def settled(d):
+        count, idle_ms = d.execute_script(MUTATION_STATE_JS)
+        return count > before and idle_ms >= SCROLL_QUIET_MS
+    
+    try:
+        WebDriverWait(driver, timeout, poll_frequency=POLL_INTERVAL / 3).until(settled)
+        return True
+    except TimeoutException:
+        return False
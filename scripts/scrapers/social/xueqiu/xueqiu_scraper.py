@@ -3,6 +3,8 @@
 """
 雪球用户发文爬虫 - 改进版
 增强反检测能力
+页面就绪按条件判断：轮询到离开WAF验证页、时间线容器渲染出来即开始解析；
+每次滚动后用MutationObserver等待新节点出现（有上限），不再固定等待
 """
 
 import sys
@@ -13,8 +15,6 @@ import os
 from datetime import datetime
 
 try:
-    from selenium import webdriver
-    from selenium.webdriver.chrome.options import Options
     from selenium.webdriver.common.by import By
     from selenium.webdriver.support.ui import WebDriverWait
     from selenium.webdriver.support import expected_conditions as EC
@@ -22,33 +22,14 @@ except ImportError:
     print("❌ 请先安装selenium: pip install selenium", file=sys.stderr)
     sys.exit(1)
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', '..', 'utils'))
+from driver_factory import create_driver, timed_get
+from cookie_store import CookieStore
+from xueqiu_page import STEALTH_JS, READY_TIMEOUT, SCROLL_TIMEOUT, wait_for_page_ready, scroll_and_wait
+
 
 def setup_driver(headless=True):
-    """配置浏览器 - 增强反检测"""
-    chrome_options = Options()
-    
-    if headless:
-        chrome_options.add_argument('--headless=new')
-    
-    # 基础设置
-    chrome_options.add_argument('--no-sandbox')
-    chrome_options.add_argument('--disable-dev-shm-usage')
-    chrome_options.add_argument('--disable-gpu')
-    chrome_options.add_argument('--window-size=1920,1080')
-    
-    # 更真实的User-Agent
-    chrome_options.add_argument('--user-agent=Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36')
-    
-    # 禁用自动化特征
-    chrome_options.add_argument('--disable-blink-features=AutomationControlled')
-    chrome_options.add_experimental_option('excludeSwitches', ['enable-automation'])
-    chrome_options.add_experimental_option('useAutomationExtension', False)
-    
-    # 添加更多参数
-    chrome_options.add_argument('--lang=zh-CN,zh;q=0.9')
-    chrome_options.add_argument('--disable-infobars')
-    chrome_options.add_argument('--start-maximized')
-    
+    """配置浏览器 - 增强反检测（拦截图片/字体/媒体/统计脚本，只保留页面和接口请求）"""
     # 设置更多prefs
     prefs = {
         'credentials_enable_service': False,
@@ -57,29 +38,14 @@ def setup_driver(headless=True):
             'notifications': 2
         }
     }
-    chrome_options.add_experimental_option('prefs', prefs)
-    
-    driver = webdriver.Chrome(options=chrome_options)
-    
-    # 注入JavaScript隐藏webdriver
-    driver.execute_cdp_cmd('Page.addScriptToEvaluateOnNewDocument', {
-        'source': '''
-            Object.defineProperty(navigator, 'webdriver', {
-                get: () => undefined
-            });
-            Object.defineProperty(navigator, 'plugins', {
-                get: () => [1, 2, 3, 4, 5]
-            });
-            Object.defineProperty(navigator, 'languages', {
-                get: () => ['zh-CN', 'zh', 'en']
-            });
-            window.chrome = {
-                runtime: {}
-            };
-        '''
-    })
-    
-    return driver
+    return create_driver(
+        headless=headless,
+        lang='zh-CN,zh;q=0.9',
+        extra_arguments=['--disable-infobars', '--start-maximized'],
+        prefs=prefs,
+        init_script=STEALTH_JS,
+        label='雪球浏览器'
+    )
 
 
 def get_user_posts(driver, user_id, max_posts=20):
@@ -90,19 +56,16 @@ def get_user_posts(driver, user_id, max_posts=20):
         url = f"https://xueqiu.com/u/{user_id}"
         print(f"📖 访问: {url}", file=sys.stderr)
         
-        driver.get(url)
+        # 先写入共享存储中未过期的cookies（WAF和token），减少被拦截的机会
+        cookie_store = CookieStore()
+        if cookie_store.apply_to_driver(driver):
+            print("♻️  已加载保存的cookies", file=sys.stderr)
         
-        # 等待更长时间让WAF验证完成
-        print("⏳ 等待页面加载（15秒）...", file=sys.stderr)
-        time.sleep(15)
+        timed_get(driver, url, label='雪球主页')
         
-        # 检查是否被WAF拦截
-        page_source = driver.page_source
-        if '_waf_' in page_source and 'renderData' in page_source:
-            print("⚠️  检测到WAF保护，再等待10秒...", file=sys.stderr)
-            time.sleep(10)
-            driver.refresh()
-            time.sleep(10)
+        # 等待WAF验证完成、时间线渲染
+        print(f"⏳ 等待页面就绪（最多{READY_TIMEOUT}秒）...", file=sys.stderr)
+        wait_for_page_ready(driver)
         
         # 尝试获取用户名
         username = "未知用户"
@@ -115,6 +78,9 @@ def get_user_posts(driver, user_id, max_posts=20):
         except:
             print(f"⚠️  无法获取用户名", file=sys.stderr)
         
+        # 通过WAF后的cookies保存到共享存储，供下次运行和API版使用
+        cookie_store.save_driver(driver)
+        
         # 滚动加载
         scroll_count = 0
         max_scrolls = 10
@@ -183,10 +149,11 @@ def get_user_posts(driver, user_id, max_posts=20):
                     except:
                         continue
             
-            # 滚动
-            driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
-            time.sleep(3)
+            # 滚动并等待新内容
             scroll_count += 1
+            if len(posts) < max_posts and not scroll_and_wait(driver):
+                print(f"📭 滚动后{SCROLL_TIMEOUT}秒内没有新内容，停止滚动", file=sys.stderr)
+                break
         
         print(f"\n✅ 共获取 {len(posts)} 条发文", file=sys.stderr)
         return posts
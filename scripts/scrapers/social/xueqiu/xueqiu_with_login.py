@@ -13,8 +13,6 @@ import os
 from datetime import datetime
 
 try:
-    from selenium import webdriver
-    from selenium.webdriver.chrome.options import Options
     from selenium.webdriver.common.by import By
     from selenium.webdriver.common.keys import Keys
     from selenium.webdriver.support.ui import WebDriverWait
@@ -24,72 +22,50 @@ except ImportError:
     print("❌ 请先安装selenium: pip install selenium", file=sys.stderr)
     sys.exit(1)
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', '..', 'utils'))
+from driver_factory import create_driver
+from cookie_store import COOKIES_FILE, CookieStore
 
-# 配置文件路径
-CONFIG_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'config')
-COOKIES_FILE = os.path.join(CONFIG_DIR, 'xueqiu_cookies.json')
+# 配置文件路径（cookies与 xueqiu_api.py 共用，见 cookie_store.py）
+CONFIG_DIR = os.path.dirname(COOKIES_FILE)
 LOGIN_CONFIG = os.path.join(CONFIG_DIR, 'xueqiu_login.json')
+# 旧版本的登录配置位置（scripts/scrapers/social/config），新位置不存在时仍然读取
+LEGACY_LOGIN_CONFIG = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'config', 'xueqiu_login.json')
+if not os.path.exists(LOGIN_CONFIG) and os.path.exists(LEGACY_LOGIN_CONFIG):
+    print(f"⚠️  登录配置已迁移到 {LOGIN_CONFIG}，暂时读取旧位置: {LEGACY_LOGIN_CONFIG}", file=sys.stderr)
+    LOGIN_CONFIG = LEGACY_LOGIN_CONFIG
 
 # 段永平的雪球ID
 DEFAULT_USER_ID = "9528875558"
 
 
 def setup_driver(headless=True):
-    """配置并启动Chrome浏览器"""
-    chrome_options = Options()
-    if headless:
-        chrome_options.add_argument('--headless=new')
-    chrome_options.add_argument('--no-sandbox')
-    chrome_options.add_argument('--disable-dev-shm-usage')
-    chrome_options.add_argument('--disable-gpu')
-    chrome_options.add_argument('--window-size=1920,1080')
-    chrome_options.add_argument('--user-agent=Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36')
-    chrome_options.add_argument('--disable-blink-features=AutomationControlled')
-    
-    # 禁用自动化检测
-    chrome_options.add_experimental_option('excludeSwitches', ['enable-automation'])
-    chrome_options.add_experimental_option('useAutomationExtension', False)
-    
-    # 添加语言设置
-    chrome_options.add_argument('--lang=zh-CN')
-    
+    """配置并启动Chrome浏览器（登录页可能有图片验证码，不拦截图片）"""
     try:
-        driver = webdriver.Chrome(options=chrome_options)
-        # 执行CDP命令来隐藏webdriver属性
-        driver.execute_cdp_cmd('Page.addScriptToEvaluateOnNewDocument', {
-            'source': '''
-                Object.defineProperty(navigator, 'webdriver', {
-                    get: () => undefined
-                })
-            '''
-        })
-        return driver
+        return create_driver(
+            headless=headless,
+            lang='zh-CN',
+            block_types=('fonts', 'media', 'trackers'),
+            label='雪球浏览器'
+        )
     except Exception as e:
         print(f"❌ 启动浏览器失败: {e}", file=sys.stderr)
         sys.exit(1)
 
 
 def load_cookies(driver):
-    """从文件加载cookies"""
-    if not os.path.exists(COOKIES_FILE):
+    """从共享存储加载cookies（xq_a_token 已过期时不加载，直接重新登录）"""
+    store = CookieStore(COOKIES_FILE)
+    cookies = store.load()
+    if not cookies:
+        return False
+    if not store.token_valid(cookies):
+        print("⚠️  保存的cookies已过期", file=sys.stderr)
         return False
     
     try:
-        with open(COOKIES_FILE, 'r') as f:
-            cookies = json.load(f)
-        
-        # 先访问雪球首页
-        driver.get("https://xueqiu.com")
-        time.sleep(2)
-        
-        # 添加cookies
-        for cookie in cookies:
-            try:
-                driver.add_cookie(cookie)
-            except:
-                pass
-        
-        print("✅ 已加载保存的cookies", file=sys.stderr)
+        store.apply_to_driver(driver, cookies)
+        print(f"✅ 已加载保存的cookies（有效至 {store.token_expiry(cookies):%Y-%m-%d %H:%M}）", file=sys.stderr)
         return True
     
     except Exception as e:
@@ -98,20 +74,11 @@ def load_cookies(driver):
 
 
 def save_cookies(driver):
-    """保存cookies到文件"""
-    try:
-        cookies = driver.get_cookies()
-        
-        os.makedirs(CONFIG_DIR, exist_ok=True)
-        with open(COOKIES_FILE, 'w') as f:
-            json.dump(cookies, f, indent=2)
-        
+    """保存cookies到共享存储（与文件中已有的cookies合并）"""
+    if CookieStore(COOKIES_FILE).save_driver(driver):
         print(f"✅ Cookies已保存到: {COOKIES_FILE}", file=sys.stderr)
         return True
-    
-    except Exception as e:
-        print(f"❌ 保存cookies失败: {e}", file=sys.stderr)
-        return False
+    return False
 
 
 def login_xueqiu(driver, phone=None, password=None):
@@ -469,6 +436,7 @@ def main():
                 # 检查是否仍然登录
                 if "login" in driver.current_url.lower():
                     print("⚠️  Cookies已失效，需要重新登录", file=sys.stderr)
+                    CookieStore(COOKIES_FILE).invalidate()
                     cookies_loaded = False
         
         # 如果cookies无效或强制登录，进行登录
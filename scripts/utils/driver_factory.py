@@ -0,0 +1,363 @@
+#!/usr/bin/env python3
+"""
+公共Chrome WebDriver工厂
+- 缓存chromedriver路径（不再每次运行都通过ChromeDriverManager联网检查版本）
+- 通过CDP按URL模式拦截图片、字体、媒体和第三方统计脚本
+- 有上限的浏览器池，可以复用已经启动的浏览器
+- 打印浏览器启动和页面加载耗时，便于对比拦截前后的效果
+
+用法:
+    import sys, os
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', '..', 'utils'))
+    from driver_factory import create_driver, timed_get, DriverPool
+
+    driver = create_driver(headless=True, block_resources=True)
+    timed_get(driver, "https://example.com")
+
+环境变量:
+    DRIVER_BLOCK_RESOURCES=0  关闭资源拦截（用于对比耗时）
+
+对比拦截前后的启动和页面加载耗时:
+    python3 driver_factory.py https://suumo.jp/ms/chuko/tokyo/sc_sumida/ --repeat 3
+"""
+
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+from selenium import webdriver
+from selenium.common.exceptions import SessionNotCreatedException
+from selenium.webdriver.chrome.options import Options
+from selenium.webdriver.chrome.service import Service
+
+try:
+    from webdriver_manager.chrome import ChromeDriverManager
+    WEBDRIVER_MANAGER_AVAILABLE = True
+except ImportError:
+    WEBDRIVER_MANAGER_AVAILABLE = False
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+DRIVER_CACHE_FILE = os.path.join(PROJECT_ROOT, 'data', 'chromedriver_path.json')
+DRIVER_CACHE_MAX_AGE = 7 * 24 * 3600  # 一周后重新解析一次，跟上Chrome升级
+
+DEFAULT_USER_AGENT = 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
+
+# 隐藏navigator.webdriver（在每个新文档加载前注入）
+HIDE_WEBDRIVER_JS = "Object.defineProperty(navigator, 'webdriver', {get: () => undefined})"
+
+# 按扩展名拦截的资源类型
+BLOCK_EXTENSIONS = {
+    'images': ('png', 'jpg', 'jpeg', 'gif', 'webp', 'svg', 'ico', 'bmp', 'avif'),
+    'fonts': ('woff', 'woff2', 'ttf', 'otf', 'eot'),
+    'media': ('mp4', 'webm', 'mp3', 'm4a', 'm3u8'),
+}
+
+# 按类型划分的拦截URL模式（Network.setBlockedURLs，支持*通配符）
+# 模式要匹配整个URL，*.png 匹配不到 logo.png?v=3 这类带查询参数的地址，每个扩展名再加一个 *.png?* 模式
+BLOCK_PATTERNS = {
+    **{
+        block_type: [pattern for ext in extensions for pattern in (f'*.{ext}', f'*.{ext}?*')]
+        for block_type, extensions in BLOCK_EXTENSIONS.items()
+    },
+    'trackers': [
+        '*google-analytics.com*', '*googletagmanager.com*', '*doubleclick.net*',
+        '*googlesyndication.com*', '*adservice.google.*', '*facebook.net*',
+        '*connect.facebook.com*', '*scorecardresearch.com*', '*hotjar.com*',
+        '*criteo.com*', '*criteo.net*', '*taboola.com*', '*outbrain.com*',
+        '*amazon-adsystem.com*', '*adsrvr.org*',
+        '*hm.baidu.com*', '*cnzz.com*',
+    ],
+}
+DEFAULT_BLOCK_TYPES = ('images', 'fonts', 'media', 'trackers')
+
+_driver_path_lock = threading.Lock()
+_driver_path = None
+
+
+def _read_driver_cache():
+    """读取缓存的chromedriver路径（不存在、过期或文件已删除时返回None）"""
+    try:
+        with open(DRIVER_CACHE_FILE, encoding='utf-8') as f:
+            cached = json.load(f)
+    except (OSError, ValueError):
+        return None
+    path = cached.get('path')
+    if not path or not os.path.exists(path):
+        return None
+    if time.time() - cached.get('resolved_at', 0) > DRIVER_CACHE_MAX_AGE:
+        return None
+    return path
+
+
+def _write_driver_cache(path):
+    try:
+        os.makedirs(os.path.dirname(DRIVER_CACHE_FILE), exist_ok=True)
+        with open(DRIVER_CACHE_FILE, 'w', encoding='utf-8') as f:
+            json.dump({'path': path, 'resolved_at': time.time()}, f)
+    except OSError as e:
+        print(f"⚠️  无法写入chromedriver路径缓存: {e}", file=sys.stderr)
+
+
+def get_chromedriver_path(refresh=False):
+    """
+    返回chromedriver路径：先用进程内缓存，再用磁盘缓存，最后才调用ChromeDriverManager
+    没有安装webdriver_manager时返回None（交给Selenium Manager自行解析）
+    """
+    global _driver_path
+    with _driver_path_lock:
+        if _driver_path and not refresh:
+            return _driver_path
+        path = None if refresh else _read_driver_cache()
+        if not path and WEBDRIVER_MANAGER_AVAILABLE:
+            start = time.perf_counter()
+            path = ChromeDriverManager().install()
+            print(f"🔧 已解析chromedriver: {path}（{time.perf_counter() - start:.1f}s）", file=sys.stderr)
+            _write_driver_cache(path)
+        _driver_path = path
+        return path
+
+
+def block_resources_enabled(default=True):
+    """是否拦截资源（DRIVER_BLOCK_RESOURCES=0 时关闭）"""
+    value = os.environ.get('DRIVER_BLOCK_RESOURCES')
+    if value is None:
+        return default
+    return value.strip().lower() not in ('0', 'false', 'no', 'off')
+
+
+def block_urls(driver, block_types=DEFAULT_BLOCK_TYPES, extra_patterns=None):
+    """通过CDP拦截匹配的URL，返回实际使用的模式列表"""
+    patterns = []
+    for block_type in block_types:
+        patterns.extend(BLOCK_PATTERNS[block_type])
+    patterns.extend(extra_patterns or [])
+    driver.execute_cdp_cmd('Network.enable', {})
+    driver.execute_cdp_cmd('Network.setBlockedURLs', {'urls': patterns})
+    return patterns
+
+
+def build_options(headless=True, user_agent=DEFAULT_USER_AGENT, lang=None, window_size='1920,1080',
+                  extra_arguments=None, prefs=None):
+    """构建Chrome选项（各爬虫通用的反检测设置）"""
+    chrome_options = Options()
+    if headless:
+        chrome_options.add_argument('--headless=new')
+    chrome_options.add_argument('--no-sandbox')
+    chrome_options.add_argument('--disable-dev-shm-usage')
+    chrome_options.add_argument('--disable-gpu')
+    chrome_options.add_argument(f'--window-size={window_size}')
+    chrome_options.add_argument('--disable-blink-features=AutomationControlled')
+    chrome_options.add_experimental_option('excludeSwitches', ['enable-automation'])
+    chrome_options.add_experimental_option('useAutomationExtension', False)
+    if user_agent:
+        chrome_options.add_argument(f'--user-agent={user_agent}')
+    if lang:
+        chrome_options.add_argument(f'--lang={lang}')
+    for argument in extra_arguments or []:
+        chrome_options.add_argument(argument)
+    if prefs:
+        chrome_options.add_experimental_option('prefs', prefs)
+    return chrome_options
+
+
+def create_driver(headless=True, user_agent=DEFAULT_USER_AGENT, lang=None, window_size='1920,1080',
+                  extra_arguments=None, prefs=None, init_script=HIDE_WEBDRIVER_JS,
+                  block_resources=True, block_types=DEFAULT_BLOCK_TYPES, extra_block_patterns=None,
+                  label='浏览器'):
+    """
+    启动Chrome并完成通用设置
+
+    参数:
+        init_script: 每个新文档加载前注入的脚本（默认隐藏navigator.webdriver）
+        block_resources: 是否拦截资源（环境变量 DRIVER_BLOCK_RESOURCES=0 可全局关闭）
+        block_types: 拦截的资源类型（images/fonts/media/trackers）
+        extra_block_patterns: 额外拦截的URL模式
+        label: 日志中显示的名称
+
+    启动失败时抛出异常
+    """
+    start = time.perf_counter()
+    chrome_options = build_options(headless, user_agent, lang, window_size, extra_arguments, prefs)
+
+    driver_path = get_chromedriver_path()
+    try:
+        driver = webdriver.Chrome(service=Service(driver_path), options=chrome_options)
+    except SessionNotCreatedException:
+        if not driver_path:
+            raise
+        # 缓存的chromedriver与已升级的Chrome不匹配：重新解析一次
+        print("⚠️  chromedriver与Chrome版本不匹配，重新解析...", file=sys.stderr)
+        driver = webdriver.Chrome(service=Service(get_chromedriver_path(refresh=True)), options=chrome_options)
+
+    if init_script:
+        driver.execute_cdp_cmd('Page.addScriptToEvaluateOnNewDocument', {'source': init_script})
+
+    blocked = ''
+    if block_resources and block_resources_enabled():
+        patterns = block_urls(driver, block_types, extra_block_patterns)
+        blocked = f"，拦截 {'/'.join(block_types)}（{len(patterns)} 个模式）"
+    print(f"⏱️  {label}启动耗时: {time.perf_counter() - start:.2f}s{blocked}", file=sys.stderr)
+    return driver
+
+
+def timed_get(driver, url, label='页面'):
+    """打开URL并打印加载耗时，返回耗时（秒）"""
+    start = time.perf_counter()
+    driver.get(url)
+    elapsed = time.perf_counter() - start
+    print(f"⏱️  {label}加载耗时: {elapsed:.2f}s", file=sys.stderr)
+    return elapsed
+
+
+class DriverPool:
+    """
+    有上限的浏览器池
+    最多启动 max_size 个Chrome，按需创建，用完归还给下一个任务复用
+    factory 为无参函数，返回新的driver（失败时返回None或抛出异常）
+    启动失败或用完后已经崩溃的浏览器不放回池中，释放名额并唤醒等待的任务
+    """
+
+    def __init__(self, max_size=2, factory=None, **driver_kwargs):
+        self.max_size = max_size
+        self.factory = factory or (lambda: create_driver(**driver_kwargs))
+        self._idle = []
+        self._drivers = []
+        self._slots = 0  # 已创建和正在创建的浏览器数
+        self._cond = threading.Condition()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def _create(self):
+        try:
+            return self.factory()
+        except Exception as e:
+            print(f"❌ 启动浏览器失败: {e}", file=sys.stderr)
+            return None
+
+    @staticmethod
+    def _is_alive(driver):
+        """浏览器会话是否仍可用"""
+        try:
+            driver.window_handles
+            return True
+        except Exception:
+            return False
+
+    def _discard(self, driver):
+        """关闭并丢弃一个driver，释放名额"""
+        if driver:
+            try:
+                driver.quit()
+            except Exception:
+                pass
+        with self._cond:
+            if driver in self._drivers:
+                self._drivers.remove(driver)
+            self._slots -= 1
+            self._cond.notify()
+
+    @contextmanager
+    def acquire(self, timeout=None):
+        """
+        借出一个driver：有空闲的直接用，未达上限时新建，否则等待归还或名额释放
+        timeout秒内拿不到（或启动失败）时借出None
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        driver = None
+        create = False
+        with self._cond:
+            while True:
+                if self._idle:
+                    driver = self._idle.pop()
+                    break
+                if self._slots < self.max_size:
+                    self._slots += 1  # 先占名额，避免并发超额创建
+                    create = True
+                    break
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    print(f"⚠️  {timeout}秒内没有可用的浏览器", file=sys.stderr)
+                    break
+                self._cond.wait(remaining)
+
+        if create:
+            driver = self._create()
+            if driver:
+                with self._cond:
+                    self._drivers.append(driver)
+            else:
+                self._discard(None)
+
+        failed = False
+        try:
+            yield driver
+        except BaseException:
+            failed = True
+            raise
+        finally:
+            if driver:
+                if failed or not self._is_alive(driver):
+                    print("⚠️  浏览器出错或已崩溃，关闭后不再复用", file=sys.stderr)
+                    self._discard(driver)
+                else:
+                    with self._cond:
+                        self._idle.append(driver)
+                        self._cond.notify()
+
+    def close(self):
+        """关闭池中所有浏览器"""
+        with self._cond:
+            drivers = list(self._drivers)
+            self._drivers = []
+            self._idle = []
+            self._slots = 0
+            self._cond.notify_all()
+        for driver in drivers:
+            try:
+                driver.quit()
+            except Exception:
+                pass
+        if drivers:
+            print(f"已关闭 {len(drivers)} 个浏览器", file=sys.stderr)
+
+
+def main():
+    """对比资源拦截开启/关闭时的浏览器启动和页面加载耗时"""
+    parser = argparse.ArgumentParser(description='测量浏览器启动和页面加载耗时（拦截 vs 不拦截）')
+    parser.add_argument('urls', nargs='+', help='要加载的页面')
+    parser.add_argument('--repeat', type=int, default=3, help='每种模式重复次数（默认：3）')
+    parser.add_argument('--visible', action='store_true', help='显示浏览器')
+    args = parser.parse_args()
+
+    results = {}
+    for block in (False, True):
+        mode = '拦截' if block else '不拦截'
+        startups, loads = [], []
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            driver = create_driver(headless=not args.visible, block_resources=block, label=f'[{mode}]浏览器')
+            startups.append(time.perf_counter() - start)
+            try:
+                for url in args.urls:
+                    loads.append(timed_get(driver, url, label=f'[{mode}]页面'))
+            finally:
+                driver.quit()
+        results[mode] = (sum(startups) / len(startups), sum(loads) / len(loads))
+
+    print("\n模式      平均启动    平均页面加载")
+    for mode, (startup, load) in results.items():
+        print(f"{mode:<6} {startup:>8.2f}s {load:>12.2f}s")
+    if results['拦截'][1] > 0:
+        print(f"页面加载加速比: {results['不拦截'][1] / results['拦截'][1]:.2f}x")
+
+
+if __name__ == '__main__':
+    main()